@@ -20,6 +20,20 @@ class CityAgent:
         self.GEMINI_API_ENABLED = False  # Set to True when using real API
         self.GEMINI_API_URL = "https://api.gemini.com/v1/advisory"  # Placeholder
         
+        self.CPS_WEIGHTS = {
+            'disease': 0.40,
+            'capacity': 0.30,
+            'medicine': 0.20,
+            'zone': 0.10
+        }
+        
+        # Minimum CPS per severity (below MEDIUM is LOW)
+        self.CPS_THRESHOLDS = {
+            'CRITICAL': 70,
+            'ELEVATED': 50,
+            'MEDIUM': 30
+        }
+        
     def predict_crisis(
         self,
         disease_stats: Dict[str, int],  # Active cases per disease
@@ -40,17 +54,19 @@ class CityAgent:
         """
         
         # Calculate individual scores (0-100)
-        disease_score = self._calculate_disease_score(disease_stats)
-        capacity_score = self._calculate_capacity_score(hospital_capacity)
-        medicine_score = self._calculate_medicine_score(medicine_stock)
-        zone_score = self._calculate_zone_score(zone_risks)
+        scores = self.component_scores(disease_stats, hospital_capacity, medicine_stock, zone_risks)
+        disease_score = scores['disease']
+        capacity_score = scores['capacity']
+        medicine_score = scores['medicine']
+        zone_score = scores['zone']
         
         # Calculate weighted CPS
+        weights = self.CPS_WEIGHTS
         cps = (
-            disease_score * 0.40 +
-            capacity_score * 0.30 +
-            medicine_score * 0.20 +
-            zone_score * 0.10
+            disease_score * weights['disease'] +
+            capacity_score * weights['capacity'] +
+            medicine_score * weights['medicine'] +
+            zone_score * weights['zone']
         )
         
         # Determine severity level
@@ -58,15 +74,15 @@ class CityAgent:
         advisory = "City health status is stable. Continue monitoring."
         trigger_alert = False
         
-        if cps >= 70:
+        if cps >= self.CPS_THRESHOLDS['CRITICAL']:
             severity = "CRITICAL"
             trigger_alert = True
             advisory = self._get_gemini_advisory(cps, disease_stats, "CRITICAL")
-        elif cps >= 50:
+        elif cps >= self.CPS_THRESHOLDS['ELEVATED']:
             severity = "ELEVATED"
             trigger_alert = True
             advisory = self._get_gemini_advisory(cps, disease_stats, "ELEVATED")
-        elif cps >= 30:
+        elif cps >= self.CPS_THRESHOLDS['MEDIUM']:
             severity = "MEDIUM"
             advisory = "Moderate risk detected. Prepare response measures."
         
@@ -84,6 +100,21 @@ class CityAgent:
             "recommendations": self._get_recommendations(severity, cps)
         }
     
+    def component_scores(
+        self,
+        disease_stats: Dict[str, int],
+        hospital_capacity: Dict[str, any],
+        medicine_stock: Dict[str, int],
+        zone_risks: Dict[str, str]
+    ) -> Dict[str, float]:
+        """The four CPS inputs (0-100), keyed like CPS_WEIGHTS"""
+        return {
+            'disease': self._calculate_disease_score(disease_stats),
+            'capacity': self._calculate_capacity_score(hospital_capacity),
+            'medicine': self._calculate_medicine_score(medicine_stock),
+            'zone': self._calculate_zone_score(zone_risks)
+        }
+    
     def _calculate_disease_score(self, disease_stats: Dict[str, int]) -> float:
         """Calculate disease risk score (0-100)"""
         if not disease_stats:
@@ -8,7 +8,9 @@ Implementation Mandate: Hybrid Logic
 - Rule: If HSI is ELEVATED, autonomously send a resource request to the Supplier Agent
 """
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+import numpy as np
 
 
 class HospitalAgent:
@@ -22,6 +24,13 @@ class HospitalAgent:
             'MEDIUM': 35,
             'LOW': 0
         }
+        
+        # (min value, score) tiers, highest first; below the last tier the
+        # score scales linearly
+        self.UTILIZATION_SCORES = [(95, 100), (90, 90), (85, 80), (75, 65), (65, 50), (50, 35)]
+        self.UTILIZATION_LINEAR = 0.6
+        self.WAIT_TIME_SCORES = [(180, 100), (120, 85), (90, 70), (60, 55), (45, 40), (30, 25)]
+        self.WAIT_TIME_LINEAR = 0.5
     
     def calculate_hospital_strain(
         self,
@@ -57,6 +66,78 @@ class HospitalAgent:
         # Calculate weighted HSI
         hsi = (bed_score * 0.4) + (icu_score * 0.3) + (er_score * 0.3)
         
+        return self._build_result(
+            hsi, total_beds, available_beds, icu_total, icu_available, er_wait_time,
+            incoming_patients, bed_utilization, bed_score, icu_utilization, icu_score, er_score
+        )
+    
+    def calculate_hospital_strain_batch(self, hospitals: List[Dict]) -> List[Dict]:
+        """
+        Calculate HSI for many hospitals in one vectorized pass
+        
+        Args:
+            hospitals: List of calculate_hospital_strain keyword arguments
+            
+        Returns:
+            One result per hospital, identical to calculate_hospital_strain
+        """
+        if not hospitals:
+            return []
+        
+        total = np.array([h["total_beds"] for h in hospitals], dtype=np.float64)
+        available = np.array([h["available_beds"] for h in hospitals], dtype=np.float64)
+        icu_total = np.array([h["icu_total"] for h in hospitals], dtype=np.float64)
+        icu_available = np.array([h["icu_available"] for h in hospitals], dtype=np.float64)
+        er_wait = np.array([h["er_wait_time"] for h in hospitals], dtype=np.float64)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bed_utilization = np.where(total > 0, (total - available) / total * 100, 0.0)
+            icu_utilization = np.where(icu_total > 0, (icu_total - icu_available) / icu_total * 100, 0.0)
+        
+        bed_score, bed_tiered = self._score_tiers(bed_utilization, self.UTILIZATION_SCORES, self.UTILIZATION_LINEAR)
+        icu_score, icu_tiered = self._score_tiers(icu_utilization, self.UTILIZATION_SCORES, self.UTILIZATION_LINEAR)
+        er_score, er_tiered = self._score_tiers(er_wait, self.WAIT_TIME_SCORES, self.WAIT_TIME_LINEAR)
+        
+        hsi = (bed_score * 0.4) + (icu_score * 0.3) + (er_score * 0.3)
+        
+        # Tier scores are ints and empty wards report 0, as in the scalar path
+        def as_number(values, is_int, i):
+            return int(values[i]) if is_int[i] else float(values[i])
+        
+        return [
+            self._build_result(
+                float(hsi[i]),
+                h["total_beds"],
+                h["available_beds"],
+                h["icu_total"],
+                h["icu_available"],
+                h["er_wait_time"],
+                h.get("incoming_patients", 0) or 0,
+                float(bed_utilization[i]) if h["total_beds"] > 0 else 0,
+                as_number(bed_score, bed_tiered, i),
+                float(icu_utilization[i]) if h["icu_total"] > 0 else 0,
+                as_number(icu_score, icu_tiered, i),
+                as_number(er_score, er_tiered, i)
+            )
+            for i, h in enumerate(hospitals)
+        ]
+    
+    def _build_result(
+        self,
+        hsi: float,
+        total_beds: int,
+        available_beds: int,
+        icu_total: int,
+        icu_available: int,
+        er_wait_time: int,
+        incoming_patients: int,
+        bed_utilization: float,
+        bed_score: float,
+        icu_utilization: float,
+        icu_score: float,
+        er_score: float
+    ) -> Dict:
+        """Strain level, capacity forecast and recommendations for one HSI"""
         # Determine strain level
         strain_level = self._determine_strain_level(hsi)
         
@@ -95,37 +176,28 @@ class HospitalAgent:
     
     def _score_utilization(self, utilization: float) -> float:
         """Convert utilization percentage to risk score (0-100)"""
-        if utilization >= 95:
-            return 100
-        elif utilization >= 90:
-            return 90
-        elif utilization >= 85:
-            return 80
-        elif utilization >= 75:
-            return 65
-        elif utilization >= 65:
-            return 50
-        elif utilization >= 50:
-            return 35
-        else:
-            return utilization * 0.6  # Linear scaling below 50%
+        for threshold, score in self.UTILIZATION_SCORES:
+            if utilization >= threshold:
+                return score
+        return utilization * self.UTILIZATION_LINEAR  # Linear scaling below 50%
     
     def _score_wait_time(self, wait_minutes: int) -> float:
         """Convert ER wait time to risk score (0-100)"""
-        if wait_minutes >= 180:  # 3+ hours
-            return 100
-        elif wait_minutes >= 120:  # 2+ hours
-            return 85
-        elif wait_minutes >= 90:  # 1.5+ hours
-            return 70
-        elif wait_minutes >= 60:  # 1+ hour
-            return 55
-        elif wait_minutes >= 45:
-            return 40
-        elif wait_minutes >= 30:
-            return 25
-        else:
-            return wait_minutes * 0.5  # Linear scaling below 30 min
+        for threshold, score in self.WAIT_TIME_SCORES:
+            if wait_minutes >= threshold:
+                return score
+        return wait_minutes * self.WAIT_TIME_LINEAR  # Linear scaling below 30 min
+    
+    def _score_tiers(self, values: np.ndarray, tiers: List, linear: float):
+        """Vectorized tier scoring; returns (scores, tiered mask)"""
+        thresholds = np.array([t for t, _ in tiers], dtype=np.float64)
+        scores = np.array([s for _, s in tiers], dtype=np.float64)
+        
+        # Tiers are descending, so the count of thresholds met picks the tier
+        met = (values[:, None] >= thresholds[None, :]).sum(axis=1)
+        tiered = met > 0
+        tier_score = scores[np.clip(len(tiers) - met, 0, len(tiers) - 1)]
+        return np.where(tiered, tier_score, values * linear), tiered
     
     def _determine_strain_level(self, hsi: float) -> str:
         """Determine strain level based on HSI score"""
@@ -8,12 +8,19 @@ Implementation Mandate: Hybrid Logic
   
 - Rule: If Q_future exceeds 2x baseline AND positive cases spike, 
   trigger "OUTBREAK DETECTED"
+
+- Uncertainty (optional): Resample test counts from a negative-binomial
+  (Gamma-Poisson) model and positives by binomial thinning, then apply the
+  same rule to every draw to get a prediction interval and P(outbreak)
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 import requests
+import threading
 from datetime import datetime
 
+import numpy as np
+
 
 class LabAgent:
     """Lab Agent for early disease outbreak detection"""
@@ -23,11 +30,22 @@ class LabAgent:
         # Time horizon for prediction (24 hours)
         self.prediction_horizon = 24
         
+        # Bootstrap settings for uncertainty bands
+        self.UNCERTAINTY_DRAWS = 128
+        self.INTERVAL_LEVEL = 0.90
+        self.DISPERSION = 10.0  # NB shape k; None = pure Poisson
+        self.MAX_DRAWS = 2048
+        self.MAX_BANK_CELLS = 1 << 21  # Per bank array; larger counts are drawn directly
+        self._rng = np.random.default_rng()
+        self._bank = None
+        self._lock = threading.Lock()  # Guards the RNG and bank rebuilds (threadpool callers)
+        
     def predict_outbreak(
         self, 
         current_tests: Dict[str, int],
         baseline_tests: Dict[str, int],
-        positive_tests: Dict[str, int]
+        positive_tests: Dict[str, int],
+        include_uncertainty: bool = False
     ) -> List[dict]:
         """
         Predict disease outbreaks using Linear Regression
@@ -36,10 +54,21 @@ class LabAgent:
             current_tests: Current test counts per disease
             baseline_tests: Historical baseline test counts
             positive_tests: Current positive test counts
+            include_uncertainty: Attach prediction interval and P(outbreak)
             
         Returns:
             List of predictions for each disease
         """
+        if include_uncertainty:
+            return self.predict_outbreak_batch(
+                [{
+                    "current_tests": current_tests,
+                    "baseline_tests": baseline_tests,
+                    "positive_tests": positive_tests
+                }],
+                include_uncertainty=True
+            )[0]
+        
         predictions = []
         
         for disease in self.diseases:
@@ -100,6 +129,166 @@ class LabAgent:
         
         return predictions
     
+    def predict_outbreak_batch(
+        self,
+        labs: List[Dict],
+        include_uncertainty: bool = False,
+        n_draws: Optional[int] = None
+    ) -> List[List[dict]]:
+        """
+        Predict outbreaks for many labs at once
+        
+        Point predictions use the same rule as predict_outbreak. When
+        include_uncertainty is set, all labs x diseases are simulated in a
+        single (labs, diseases, draws) array pass.
+        
+        Args:
+            labs: List of {"current_tests", "baseline_tests", "positive_tests"}
+            include_uncertainty: Attach prediction interval and P(outbreak)
+            n_draws: Number of bootstrap draws (default UNCERTAINTY_DRAWS)
+            
+        Returns:
+            One prediction list per lab, in input order
+        """
+        results = [
+            self.predict_outbreak(
+                current_tests=lab.get("current_tests") or {},
+                baseline_tests=lab.get("baseline_tests") or {},
+                positive_tests=lab.get("positive_tests") or {}
+            )
+            for lab in labs
+        ]
+        
+        if not include_uncertainty or not labs:
+            return results
+        
+        n_draws = self.UNCERTAINTY_DRAWS if n_draws is None else n_draws
+        if not 1 <= n_draws <= self.MAX_DRAWS:
+            raise ValueError(f"n_draws must be between 1 and {self.MAX_DRAWS}")
+        current, baseline, positive = self._to_arrays(labs)
+        low, high, p_outbreak = self._simulate_outbreak(current, baseline, positive, n_draws)
+        
+        disease_index = {d: i for i, d in enumerate(self.diseases)}
+        for lab_idx, predictions in enumerate(results):
+            for prediction in predictions:
+                j = disease_index[prediction["disease"]]
+                prediction["predicted_cases_interval"] = [
+                    int(low[lab_idx, j]), int(high[lab_idx, j])
+                ]
+                prediction["interval_level"] = self.INTERVAL_LEVEL
+                prediction["outbreak_probability"] = round(float(p_outbreak[lab_idx, j]), 3)
+        
+        return results
+    
+    def _to_arrays(self, labs: List[Dict]):
+        """Pack per-lab test dicts into (labs, diseases) count arrays"""
+        shape = (len(labs), len(self.diseases))
+        current = np.zeros(shape, dtype=np.float64)
+        baseline = np.ones(shape, dtype=np.float64)  # Same default as predict_outbreak
+        positive = np.zeros(shape, dtype=np.float64)
+        
+        for i, lab in enumerate(labs):
+            cur = lab.get("current_tests") or {}
+            base = lab.get("baseline_tests") or {}
+            pos = lab.get("positive_tests") or {}
+            for j, disease in enumerate(self.diseases):
+                current[i, j] = cur.get(disease, 0)
+                baseline[i, j] = base.get(disease, 1)
+                positive[i, j] = pos.get(disease, 0)
+        
+        return current, baseline, positive
+    
+    def _simulate_outbreak(
+        self,
+        current: np.ndarray,
+        baseline: np.ndarray,
+        positive: np.ndarray,
+        n_draws: int
+    ):
+        """
+        Vectorized bootstrap of the outbreak rule
+        
+        Q_current* ~ NegBin(mean=Q_current, shape=DISPERSION), split by
+        Poisson thinning into positives* and negatives* (exact given the
+        shared gamma factor of each draw). Applying the rule per draw:
+        Q_future* = 2 * Q_current* - Q_baseline >= 2 * Q_baseline
+                    <=> Q_current* >= 1.5 * Q_baseline
+        
+        Counts beyond the bank rows are drawn directly with the bank's gamma
+        factors, so they follow the same model
+        
+        Returns:
+            (interval_low, interval_high, P(outbreak)) arrays of shape (labs, diseases)
+        """
+        current = np.maximum(current, 0)
+        pos = np.clip(positive, 0, current).astype(np.intp)
+        neg = (current - pos).astype(np.intp)
+        cur = pos + neg
+        positives_bank, negatives_bank, sorted_bank, gamma = self._draw_bank(
+            int(cur.max(initial=0)), n_draws
+        )
+        direct = cur >= len(positives_bank)
+        
+        # (labs, diseases, draws) - one gather per bank, no per-call sampling
+        positives = positives_bank[np.where(direct, 0, pos)]
+        draws = negatives_bank[np.where(direct, 0, neg)]
+        if direct.any():
+            with self._lock:
+                direct_positives = self._rng.poisson(pos[direct][:, None] * gamma[None, :])
+                direct_negatives = self._rng.poisson(neg[direct][:, None] * gamma[None, :])
+            positives[direct] = direct_positives
+            draws[direct] = direct_negatives
+        draws += positives
+        
+        outbreak = draws >= (1.5 * baseline)[..., None]
+        outbreak &= positives > 0.15 * draws  # positive_rate > 15%
+        p_outbreak = np.count_nonzero(outbreak, axis=-1) / n_draws
+        
+        # Marginal of Q_current* is NegBin(Q_current), so interval ends are
+        # read straight from the pre-sorted bank and mapped through the rule
+        tail = (1 - self.INTERVAL_LEVEL) / 2
+        lo_idx = int(np.floor(tail * (n_draws - 1)))
+        hi_idx = int(np.ceil((1 - tail) * (n_draws - 1)))
+        q_low = sorted_bank[np.where(direct, 0, cur), lo_idx]
+        q_high = sorted_bank[np.where(direct, 0, cur), hi_idx]
+        if direct.any():
+            direct_sorted = np.sort(draws[direct], axis=-1)
+            q_low[direct] = direct_sorted[:, lo_idx]
+            q_high[direct] = direct_sorted[:, hi_idx]
+        low = np.maximum(0, 2 * q_low - baseline)
+        high = np.maximum(0, 2 * q_high - baseline)
+        
+        return np.floor(low), np.floor(high), p_outbreak
+    
+    def _draw_bank(self, max_count: int, n_draws: int):
+        """
+        Return cached (positives, negatives, sorted, gamma) draw banks of
+        shape (counts, draws), indexed by integer mean count.
+        
+        Draw s of every row shares the gamma factor G_s, so
+        positives[a, s] + negatives[b, s] ~ NegBin(a + b) exactly. Banks are
+        grown lazily (up to MAX_BANK_CELLS per array) and reused, so
+        identical inputs give identical bands from one tick to the next.
+        """
+        cap = 1 << ((self.MAX_BANK_CELLS // n_draws).bit_length() - 1)  # Largest power of two that fits
+        rows = min(max(64, 1 << int(max_count).bit_length()), cap)  # Grow in powers of two
+        with self._lock:
+            bank = self._bank
+            if bank is not None and bank[0].shape[1] == n_draws and bank[0].shape[0] >= rows:
+                return bank
+            
+            if self.DISPERSION:
+                k = self.DISPERSION
+                gamma = self._rng.gamma(k, 1.0 / k, size=n_draws)
+            else:
+                gamma = np.ones(n_draws)
+            rates = np.arange(rows)[:, None] * gamma[None, :]
+            
+            positives = self._rng.poisson(rates).astype(np.float32)
+            negatives = self._rng.poisson(rates).astype(np.float32)
+            self._bank = (positives, negatives, np.sort(positives, axis=1), gamma)
+            return self._bank
+    
     def simulate_with_gemini_api(self, test_data: Dict) -> Dict:
         """
         Optional: Call Gemini API for advisory (simulation only)
@@ -7,8 +7,38 @@ Implementation Mandate: Hybrid Logic
   to the Supplier Agent
 """
 
+from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+import numpy as np
+
+
+@dataclass(slots=True)
+class MedicineRecord:
+    """Internal per-medicine classification; converted to a dict for the response"""
+    medicine: str
+    current_stock: int
+    daily_consumption: int
+    consumption_rate: float
+    demand_level: str
+    days_remaining: float
+    reorder_point: int
+    needs_order: bool
+    outbreak_affected: bool
+    
+    def as_dict(self) -> Dict:
+        return {
+            "medicine": self.medicine,
+            "current_stock": self.current_stock,
+            "daily_consumption": self.daily_consumption,
+            "consumption_rate": self.consumption_rate,
+            "demand_level": self.demand_level,
+            "days_remaining": self.days_remaining,
+            "reorder_point": self.reorder_point,
+            "needs_order": self.needs_order,
+            "outbreak_affected": self.outbreak_affected
+        }
+
 
 class PharmacyAgent:
     """Pharmacy Agent for medicine inventory optimization"""
@@ -27,6 +57,15 @@ class PharmacyAgent:
             'MEDIUM': 100,      # Reorder when below 100 units
             'LOW': 50           # Reorder when below 50 units
         }
+        
+        # Medicine-to-disease mapping for outbreak adjustment
+        self.DISEASE_MEDICINE_MAP = {
+            'dengue': ['dengue_medicine', 'paracetamol', 'iv_fluids'],
+            'malaria': ['malaria_medicine', 'antimalarial', 'iv_fluids'],
+            'covid': ['covid_medicine', 'oxygen', 'antibiotics', 'paracetamol'],
+            'typhoid': ['typhoid_medicine', 'antibiotics', 'iv_fluids'],
+            'influenza': ['flu_medicine', 'antivirals', 'paracetamol']
+        }
     
     def classify_medicine_demand(
         self,
@@ -45,17 +84,12 @@ class PharmacyAgent:
         """
         
         outbreak_alerts = outbreak_alerts or []
-        classifications = []
-        preemptive_orders = []
+        records = []
         
-        # Medicine-to-disease mapping for outbreak adjustment
-        disease_medicine_map = {
-            'dengue': ['dengue_medicine', 'paracetamol', 'iv_fluids'],
-            'malaria': ['malaria_medicine', 'antimalarial', 'iv_fluids'],
-            'covid': ['covid_medicine', 'oxygen', 'antibiotics', 'paracetamol'],
-            'typhoid': ['typhoid_medicine', 'antibiotics', 'iv_fluids'],
-            'influenza': ['flu_medicine', 'antivirals', 'paracetamol']
-        }
+        # Medicines whose demand doubles under the active outbreaks
+        outbreak_medicines = set()
+        for outbreak in outbreak_alerts:
+            outbreak_medicines.update(self.DISEASE_MEDICINE_MAP.get(outbreak.lower(), []))
         
         for medicine, stock in medicine_stocks.items():
             consumption = consumption_rates.get(medicine, 0)
@@ -66,12 +100,8 @@ class PharmacyAgent:
             else:
                 consumption_rate = 1.0  # Out of stock = max urgency
             
-            # Apply outbreak multiplier
-            outbreak_multiplier = 1.0
-            for outbreak in outbreak_alerts:
-                if medicine in disease_medicine_map.get(outbreak.lower(), []):
-                    outbreak_multiplier = 2.0  # 2x demand during outbreak
-                    break
+            # Apply outbreak multiplier (2x demand during outbreak)
+            outbreak_multiplier = 2.0 if medicine in outbreak_medicines else 1.0
             
             adjusted_rate = min(1.0, consumption_rate * outbreak_multiplier)
             
@@ -83,44 +113,108 @@ class PharmacyAgent:
             
             # Determine if order needed
             reorder_point = self.REORDER_POINTS[demand_level]
-            needs_order = stock < reorder_point
             
-            classification = {
-                "medicine": medicine,
-                "current_stock": stock,
-                "daily_consumption": consumption,
-                "consumption_rate": round(adjusted_rate, 3),
-                "demand_level": demand_level,
-                "days_remaining": round(days_remaining, 1),
-                "reorder_point": reorder_point,
-                "needs_order": needs_order,
-                "outbreak_affected": outbreak_multiplier > 1.0
-            }
+            records.append(MedicineRecord(
+                medicine=medicine,
+                current_stock=stock,
+                daily_consumption=consumption,
+                consumption_rate=round(adjusted_rate, 3),
+                demand_level=demand_level,
+                days_remaining=round(days_remaining, 1),
+                reorder_point=reorder_point,
+                needs_order=stock < reorder_point,
+                outbreak_affected=outbreak_multiplier > 1.0
+            ))
+        
+        return self._summarize(records)
+    
+    def classify_medicine_demand_batch(self, pharmacies: List[Dict]) -> List[Dict]:
+        """
+        Classify demand for many pharmacies in one vectorized pass
+        
+        All medicines of all pharmacies are flattened into one array, so the
+        rate/level/days math runs once per batch instead of once per SKU.
+        
+        Args:
+            pharmacies: List of classify_medicine_demand keyword arguments
             
-            classifications.append(classification)
+        Returns:
+            One result per pharmacy, identical to classify_medicine_demand
+        """
+        names, stocks, consumptions, multipliers, bounds = [], [], [], [], []
+        for pharmacy in pharmacies:
+            medicine_stocks = pharmacy.get("medicine_stocks") or {}
+            consumption_rates = pharmacy.get("consumption_rates") or {}
+            outbreak_medicines = set()
+            for outbreak in pharmacy.get("outbreak_alerts") or []:
+                outbreak_medicines.update(self.DISEASE_MEDICINE_MAP.get(outbreak.lower(), []))
             
-            # Generate pre-emptive order for SURGE demand
-            if demand_level == "SURGE":
-                order = self._generate_order(
-                    medicine, 
-                    stock, 
-                    consumption, 
-                    demand_level,
-                    outbreak_multiplier > 1.0
-                )
-                preemptive_orders.append(order)
+            start = len(names)
+            for medicine, stock in medicine_stocks.items():
+                names.append(medicine)
+                stocks.append(stock)
+                consumptions.append(consumption_rates.get(medicine, 0))
+                multipliers.append(2.0 if medicine in outbreak_medicines else 1.0)
+            bounds.append((start, len(names)))
+        
+        stock = np.array(stocks, dtype=np.float64)
+        consumption = np.array(consumptions, dtype=np.float64)
+        multiplier = np.array(multipliers, dtype=np.float64)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(stock > 0, consumption / stock, 1.0)
+            days = np.where(consumption > 0, stock / consumption, 999)
+        adjusted = np.minimum(1.0, rate * multiplier)
+        
+        levels = np.full(len(names), "LOW", dtype=object)
+        for level in ("MEDIUM", "HIGH", "SURGE"):
+            levels[adjusted >= self.DEMAND_THRESHOLDS[level]] = level
+        
+        results = []
+        for start, end in bounds:
+            records = []
+            for i in range(start, end):
+                demand_level = levels[i]
+                reorder_point = self.REORDER_POINTS[demand_level]
+                records.append(MedicineRecord(
+                    medicine=names[i],
+                    current_stock=stocks[i],
+                    daily_consumption=consumptions[i],
+                    consumption_rate=round(float(adjusted[i]), 3),
+                    demand_level=demand_level,
+                    days_remaining=round(float(days[i]), 1) if consumptions[i] > 0 else 999,
+                    reorder_point=reorder_point,
+                    needs_order=stocks[i] < reorder_point,
+                    outbreak_affected=multipliers[i] > 1.0
+                ))
+            results.append(self._summarize(records))
+        return results
+    
+    def _summarize(self, records: List[MedicineRecord]) -> Dict:
+        """Pre-emptive orders, inventory health and recommendations"""
+        # Generate pre-emptive order for SURGE demand
+        preemptive_orders = [
+            self._generate_order(
+                r.medicine,
+                r.current_stock,
+                r.daily_consumption,
+                r.demand_level,
+                r.outbreak_affected
+            )
+            for r in records if r.demand_level == "SURGE"
+        ]
         
         # Calculate overall inventory health
-        inventory_health = self._calculate_inventory_health(classifications)
+        inventory_health = self._calculate_inventory_health(records)
         
         return {
-            "classifications": classifications,
+            "classifications": [r.as_dict() for r in records],
             "preemptive_orders": preemptive_orders,
             "inventory_health": inventory_health,
-            "critical_medicines": [c["medicine"] for c in classifications if c["demand_level"] in ["SURGE", "HIGH"]],
-            "total_medicines": len(classifications),
-            "medicines_needing_order": len([c for c in classifications if c["needs_order"]]),
-            "recommendations": self._get_recommendations(classifications, preemptive_orders)
+            "critical_medicines": [r.medicine for r in records if r.demand_level in ("SURGE", "HIGH")],
+            "total_medicines": len(records),
+            "medicines_needing_order": sum(1 for r in records if r.needs_order),
+            "recommendations": self._get_recommendations(records, preemptive_orders)
         }
     
     def _classify_demand(self, consumption_rate: float) -> str:
@@ -164,15 +258,20 @@ class PharmacyAgent:
             "estimated_stockout_days": round(current_stock / daily_consumption, 1) if daily_consumption > 0 else 999
         }
     
-    def _calculate_inventory_health(self, classifications: List[Dict]) -> Dict:
+    def _calculate_inventory_health(self, records: List[MedicineRecord]) -> Dict:
         """Calculate overall inventory health metrics"""
-        if not classifications:
+        if not records:
             return {"status": "UNKNOWN", "score": 0}
         
-        total = len(classifications)
-        surge_count = sum(1 for c in classifications if c["demand_level"] == "SURGE")
-        high_count = sum(1 for c in classifications if c["demand_level"] == "HIGH")
-        low_stock_count = sum(1 for c in classifications if c["days_remaining"] < 7)
+        total = len(records)
+        surge_count = high_count = low_stock_count = 0
+        for r in records:
+            if r.demand_level == "SURGE":
+                surge_count += 1
+            elif r.demand_level == "HIGH":
+                high_count += 1
+            if r.days_remaining < 7:
+                low_stock_count += 1
         
         # Calculate health score (0-100)
         surge_penalty = (surge_count / total) * 50
@@ -201,24 +300,32 @@ class PharmacyAgent:
             "low_stock_items": low_stock_count
         }
     
-    def _get_recommendations(self, classifications: List[Dict], orders: List[Dict]) -> List[str]:
+    def _get_recommendations(self, records: List[MedicineRecord], orders: List[Dict]) -> List[str]:
         """Generate actionable recommendations"""
         recommendations = []
         
-        surge_items = [c["medicine"] for c in classifications if c["demand_level"] == "SURGE"]
+        surge_items = []
+        critical_stock_count = 0
+        outbreak_affected_count = 0
+        for r in records:
+            if r.demand_level == "SURGE":
+                surge_items.append(r.medicine)
+            if r.days_remaining < 3:
+                critical_stock_count += 1
+            if r.outbreak_affected:
+                outbreak_affected_count += 1
+        
         if surge_items:
             recommendations.append(f"🚨 SURGE DEMAND: Immediate orders placed for {len(surge_items)} medicines: {', '.join(surge_items[:3])}")
         
-        critical_stock = [c["medicine"] for c in classifications if c["days_remaining"] < 3]
-        if critical_stock:
-            recommendations.append(f"⚠️ CRITICAL: {len(critical_stock)} medicines have <3 days stock remaining")
+        if critical_stock_count:
+            recommendations.append(f"⚠️ CRITICAL: {critical_stock_count} medicines have <3 days stock remaining")
         
         if orders:
             recommendations.append(f"📦 {len(orders)} pre-emptive orders generated for supplier")
         
-        outbreak_affected = [c["medicine"] for c in classifications if c["outbreak_affected"]]
-        if outbreak_affected:
-            recommendations.append(f"🦠 {len(outbreak_affected)} medicines affected by outbreak alerts")
+        if outbreak_affected_count:
+            recommendations.append(f"🦠 {outbreak_affected_count} medicines affected by outbreak alerts")
         
         if not recommendations:
             recommendations.append("✅ Inventory levels are healthy. Continue monitoring.")
@@ -0,0 +1,61 @@
+"""
+Typed Agent Inputs - Supplier Orders and Hospital Capacity
+
+Enum-like fields are normalized once, at validation: urgency is upper-cased
+and mapped onto the Supplier Agent's urgency levels ('critical' from the
+Node agents is URGENT; anything unrecognized is NORMAL, the weight unknown
+urgencies always had), medicine names are lower-cased, and missing fields
+get their defaults. Agents then index the
+validated dicts directly instead of repeating .get(...) defaults and
+.lower()/.upper() per order.
+
+Schemas are TypedDicts, so validation (constraints included) stays in
+pydantic-core and yields plain dicts that are echoed back without a dump
+step. The TypeAdapters are built once at import and reused for bulk
+payloads.
+"""
+
+from typing import Annotated, Any, Dict, List
+
+from pydantic import BeforeValidator, ConfigDict, Field, StringConstraints, TypeAdapter, with_config
+from typing_extensions import NotRequired, TypedDict
+
+URGENCY_LEVELS = frozenset({"URGENT", "HIGH", "MEDIUM", "NORMAL", "LOW"})
+URGENCY_ALIASES = {"CRITICAL": "URGENT"}    # SupplierAgent_DB.js sends 'critical'
+
+
+def _urgency_level(value: Any) -> str:
+    """Upper-cased urgency level; aliases mapped, anything else NORMAL"""
+    level = value.strip().upper() if isinstance(value, str) else ""
+    level = URGENCY_ALIASES.get(level, level)
+    return level if level in URGENCY_LEVELS else "NORMAL"
+
+
+Urgency = Annotated[str, BeforeValidator(_urgency_level)]
+Medicine = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True)]
+
+
+@with_config(ConfigDict(extra="allow"))
+class SupplierOrder(TypedDict, total=False):
+    """One order to the Supplier Agent (unknown fields are kept and echoed back)"""
+    order_id: NotRequired[str]
+    requester_id: NotRequired[str]
+    medicine: Annotated[Medicine, Field(default="default")]
+    quantity: Annotated[int, Field(default=0, ge=0, strict=True)]
+    urgency: Annotated[Urgency, Field(default="NORMAL")]
+    requester_strain: Annotated[float, Field(default=50.0, strict=True)]  # 0-100, clamped when scored
+    timestamp: NotRequired[str]
+    lat: NotRequired[float]  # Delivery location, used by the delivery planner
+    lng: NotRequired[float]
+
+
+@with_config(ConfigDict(extra="allow"))
+class HospitalCapacity(TypedDict, total=False):
+    """Citywide hospital capacity for the City Agent"""
+    utilization_percent: Annotated[float, Field(default=0, ge=0)]
+    total_beds: NotRequired[Annotated[int, Field(ge=0)]]
+    available_beds: NotRequired[Annotated[int, Field(ge=0)]]
+
+
+ORDER_LIST_ADAPTER = TypeAdapter(List[SupplierOrder])
+INVENTORY_ADAPTER = TypeAdapter(Dict[Medicine, int])
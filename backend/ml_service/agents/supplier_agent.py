@@ -9,9 +9,57 @@ Implementation Mandate: Hybrid Logic
 - Rule: Fulfill strictly by Priority Score (highest first) and log the action
 """
 
+from dataclasses import dataclass
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from agents.schemas import INVENTORY_ADAPTER, ORDER_LIST_ADAPTER, SupplierOrder
+
+
+# Fulfillment status / pending reason codes
+FULFILLED, PARTIAL, PENDING = "FULFILLED", "PARTIAL", "PENDING"
+NO_VEHICLE, NO_STOCK = "No delivery vehicles available", "Insufficient inventory"
+
+
+@dataclass(slots=True)
+class OrderRecord:
+    """Internal per-order state; converted to dicts only for the response"""
+    order: Dict  # Validated payload (normalized, defaults filled), echoed back in every view
+    medicine: str
+    quantity: int
+    priority_score: float
+    timestamp: str
+    status: Optional[str] = None
+    allocated_quantity: int = 0
+    available_stock: int = 0
+    reason: Optional[str] = None
+    
+    def as_prioritized(self) -> Dict:
+        return {**self.order, 'priority_score': self.priority_score, 'timestamp': self.timestamp}
+    
+    def as_fulfillment(self, fulfillment_time: str) -> Dict:
+        view = self.as_prioritized()
+        view['status'] = self.status
+        view['allocated_quantity'] = self.allocated_quantity
+        if self.status == PARTIAL:
+            view['requested_quantity'] = self.quantity
+            view['shortage'] = self.quantity - self.allocated_quantity
+            view['fulfillment_time'] = fulfillment_time
+        else:
+            view['fulfillment_time'] = fulfillment_time
+            view['estimated_delivery'] = '4-8 hours' if self.order['urgency'] == 'URGENT' else '24 hours'
+        return view
+    
+    def as_pending(self) -> Dict:
+        view = self.as_prioritized()
+        view['status'] = self.status
+        view['reason'] = self.reason
+        if self.reason == NO_VEHICLE:
+            view['estimated_fulfillment'] = 'Next delivery cycle'
+        else:
+            view['available_stock'] = self.available_stock
+        return view
+
 
 class SupplierAgent:
     """Supplier Agent for supply chain management and order prioritization"""
@@ -51,9 +99,11 @@ class SupplierAgent:
     
     def prioritize_orders(
         self,
-        orders: List[Dict],  # List of incoming orders
+        orders: List[SupplierOrder],  # List of incoming orders
         inventory: Dict[str, int],  # Current warehouse inventory
-        delivery_capacity: int = 4  # Number of available delivery vehicles
+        delivery_capacity: int = 4,  # Number of available delivery vehicles
+        validate: bool = True,  # False when orders/inventory were already validated
+        priority_scores: Optional[List[float]] = None  # Precomputed (e.g. aged) scores, one per order
     ) -> Dict:
         """
         Prioritize and fulfill orders based on Priority Score
@@ -61,109 +111,107 @@ class SupplierAgent:
         Priority Score Formula:
         PS = (Requester_Strain * 0.4) + (Medicine_Criticality * 0.3) + (Urgency * 0.3)
         
-        Orders are fulfilled strictly by highest priority first
+        Orders are fulfilled strictly by highest priority first. Unless the
+        caller already did, orders and inventory are validated (normalized,
+        defaults filled) in one pass through the cached TypeAdapters.
+        priority_scores replaces the formula, e.g. with the order book's
+        aged priorities.
         """
-        
-        prioritized_orders = []
-        fulfilled_orders = []
-        pending_orders = []
+        now = datetime.now().isoformat()
+        if validate:
+            orders = ORDER_LIST_ADAPTER.validate_python(orders)
+            inventory = INVENTORY_ADAPTER.validate_python(inventory)
         
         # Calculate priority score for each order
-        for order in orders:
-            priority_score = self._calculate_priority_score(
-                requester_strain=order.get('requester_strain', 50),
-                medicine=order.get('medicine', 'default'),
-                urgency=order.get('urgency', 'NORMAL'),
-                quantity=order.get('quantity', 0)
+        if priority_scores is None:
+            priority_scores = self.score_orders(orders)
+        records = [
+            OrderRecord(
+                order=order,
+                medicine=order['medicine'],
+                quantity=order['quantity'],
+                priority_score=score,
+                timestamp=order.get('timestamp', now)
             )
-            
-            order_with_priority = {
-                **order,
-                'priority_score': priority_score,
-                'timestamp': order.get('timestamp', datetime.now().isoformat())
-            }
-            
-            prioritized_orders.append(order_with_priority)
+            for order, score in zip(orders, priority_scores)
+        ]
         
         # Sort by priority score (highest first)
-        prioritized_orders.sort(key=lambda x: x['priority_score'], reverse=True)
+        records.sort(key=lambda r: r.priority_score, reverse=True)
         
         # Fulfill orders based on priority and inventory availability
+        fulfilled = []
+        pending = []
         available_vehicles = delivery_capacity
         
-        for order in prioritized_orders:
-            medicine = order.get('medicine', 'default')
-            quantity = order.get('quantity', 0)
-            requester = order.get('requester_id', 'UNKNOWN')
+        for record in records:
+            medicine = record.medicine
+            quantity = record.quantity
             
             # Check inventory availability
             available_stock = inventory.get(medicine, 0)
             
             if available_stock >= quantity and available_vehicles > 0:
                 # Can fulfill order
-                fulfillment = {
-                    **order,
-                    'status': 'FULFILLED',
-                    'allocated_quantity': quantity,
-                    'fulfillment_time': datetime.now().isoformat(),
-                    'estimated_delivery': '4-8 hours' if order.get('urgency') == 'URGENT' else '24 hours'
-                }
-                fulfilled_orders.append(fulfillment)
+                record.status = FULFILLED
+                record.allocated_quantity = quantity
+                fulfilled.append(record)
                 
                 # Update inventory and vehicle availability
-                inventory[medicine] -= quantity
+                inventory[medicine] = available_stock - quantity
                 available_vehicles -= 1
                 
-            elif available_stock >= quantity and available_vehicles == 0:
+            elif available_stock >= quantity:
                 # Have stock but no vehicles
-                pending_orders.append({
-                    **order,
-                    'status': 'PENDING',
-                    'reason': 'No delivery vehicles available',
-                    'estimated_fulfillment': 'Next delivery cycle'
-                })
+                record.status = PENDING
+                record.reason = NO_VEHICLE
+                pending.append(record)
                 
-            elif available_stock < quantity:
+            elif available_stock > 0 and available_vehicles > 0:
                 # Insufficient stock - partial fulfillment
-                if available_stock > 0 and available_vehicles > 0:
-                    fulfillment = {
-                        **order,
-                        'status': 'PARTIAL',
-                        'allocated_quantity': available_stock,
-                        'requested_quantity': quantity,
-                        'shortage': quantity - available_stock,
-                        'fulfillment_time': datetime.now().isoformat()
-                    }
-                    fulfilled_orders.append(fulfillment)
-                    inventory[medicine] = 0
-                    available_vehicles -= 1
-                else:
-                    pending_orders.append({
-                        **order,
-                        'status': 'PENDING',
-                        'reason': 'Insufficient inventory',
-                        'available_stock': available_stock
-                    })
+                record.status = PARTIAL
+                record.allocated_quantity = available_stock
+                fulfilled.append(record)
+                inventory[medicine] = 0
+                available_vehicles -= 1
+                
+            else:
+                record.status = PENDING
+                record.reason = NO_STOCK
+                record.available_stock = available_stock
+                pending.append(record)
         
         # Calculate metrics
-        fulfillment_rate = (len(fulfilled_orders) / len(orders) * 100) if orders else 0
+        fulfillment_rate = (len(fulfilled) / len(orders) * 100) if orders else 0
         
         return {
-            'prioritized_orders': prioritized_orders,
-            'fulfilled_orders': fulfilled_orders,
-            'pending_orders': pending_orders,
+            'prioritized_orders': [r.as_prioritized() for r in records],
+            'fulfilled_orders': [r.as_fulfillment(now) for r in fulfilled],
+            'pending_orders': [r.as_pending() for r in pending],
             'metrics': {
                 'total_orders': len(orders),
-                'fulfilled_count': len(fulfilled_orders),
-                'pending_count': len(pending_orders),
+                'fulfilled_count': len(fulfilled),
+                'pending_count': len(pending),
                 'fulfillment_rate': round(fulfillment_rate, 1),
                 'vehicles_used': delivery_capacity - available_vehicles,
                 'vehicles_available': available_vehicles
             },
             'inventory_status': self._get_inventory_status(inventory),
-            'recommendations': self._get_recommendations(fulfilled_orders, pending_orders, inventory)
+            'recommendations': self._get_recommendations(fulfilled, pending, inventory)
         }
     
+    def score_orders(self, orders: List[SupplierOrder]) -> List[float]:
+        """Priority Score of each validated order"""
+        return [
+            self._calculate_priority_score(
+                requester_strain=order['requester_strain'],
+                medicine=order['medicine'],
+                urgency=order['urgency'],
+                quantity=order['quantity']
+            )
+            for order in orders
+        ]
+    
     def _calculate_priority_score(
         self,
         requester_strain: float,  # 0-100 (Hospital HSI or Pharmacy urgency)
@@ -175,6 +223,8 @@ class SupplierAgent:
         Calculate Priority Score using weighted formula
         
         PS = (Requester_Strain * 0.4) + (Medicine_Criticality * 0.3) + (Urgency * 0.3)
+        
+        medicine and urgency arrive normalized (see agents.schemas)
         """
         
         # Normalize requester strain (0-100)
@@ -182,12 +232,12 @@ class SupplierAgent:
         
         # Get medicine criticality (0-100)
         criticality_score = self.MEDICINE_CRITICALITY.get(
-            medicine.lower(), 
+            medicine,
             self.MEDICINE_CRITICALITY['default']
         )
         
         # Get urgency weight (0-100)
-        urgency_score = self.URGENCY_WEIGHTS.get(urgency.upper(), 25)
+        urgency_score = self.URGENCY_WEIGHTS[urgency]
         
         # Calculate weighted priority score
         priority_score = (
@@ -226,29 +276,29 @@ class SupplierAgent:
     
     def _get_recommendations(
         self, 
-        fulfilled: List[Dict], 
-        pending: List[Dict],
+        fulfilled: List[OrderRecord], 
+        pending: List[OrderRecord],
         inventory: Dict[str, int]
     ) -> List[str]:
         """Generate actionable recommendations"""
         recommendations = []
         
         if fulfilled:
-            urgent_fulfilled = [o for o in fulfilled if o.get('urgency') == 'URGENT']
+            urgent_fulfilled = sum(1 for r in fulfilled if r.order['urgency'] == 'URGENT')
             if urgent_fulfilled:
-                recommendations.append(f"✅ {len(urgent_fulfilled)} URGENT orders fulfilled immediately")
+                recommendations.append(f"✅ {urgent_fulfilled} URGENT orders fulfilled immediately")
             recommendations.append(f"📦 Total {len(fulfilled)} orders dispatched")
         
         if pending:
             recommendations.append(f"⏳ {len(pending)} orders pending - requires attention")
             
-            no_vehicle = [o for o in pending if 'vehicle' in o.get('reason', '').lower()]
+            no_vehicle = sum(1 for r in pending if r.reason == NO_VEHICLE)
             if no_vehicle:
-                recommendations.append(f"🚚 {len(no_vehicle)} orders waiting for delivery vehicles")
+                recommendations.append(f"🚚 {no_vehicle} orders waiting for delivery vehicles")
             
-            no_stock = [o for o in pending if 'inventory' in o.get('reason', '').lower()]
+            no_stock = len(pending) - no_vehicle
             if no_stock:
-                recommendations.append(f"📦 {len(no_stock)} orders pending due to low stock - restock needed")
+                recommendations.append(f"📦 {no_stock} orders pending due to low stock - restock needed")
         
         # Inventory warnings
         critical_items = [item for item, qty in inventory.items() if qty < 50]
@@ -0,0 +1,131 @@
+"""
+Benchmark for HealSync ML agents
+Measures throughput and peak memory of the agent pipelines on large inputs
+"""
+
+import json
+import random
+import time
+import tracemalloc
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+
+from agents.pharmacy_agent import PharmacyAgent
+from agents.schemas import ORDER_LIST_ADAPTER, SupplierOrder
+from agents.supplier_agent import SupplierAgent
+
+MEDICINES = ["oxygen", "iv_fluids", "antibiotics", "paracetamol", "dengue_medicine",
+             "malaria_medicine", "antivirals", "syringes", "gloves", "bandages"]
+URGENCIES = ["URGENT", "HIGH", "MEDIUM", "NORMAL", "LOW"]
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print(f"\n{'='*60}")
+    print(f"  {title}")
+    print(f"{'='*60}\n")
+
+
+def make_orders(n, rng):
+    return [
+        {
+            "order_id": f"ORD{i:06d}",
+            "requester_id": f"H{rng.randint(1, 500)}",
+            "medicine": rng.choice(MEDICINES),
+            "quantity": rng.randint(10, 300),
+            "urgency": rng.choice(URGENCIES),
+            "requester_strain": rng.randint(0, 100)
+        }
+        for i in range(n)
+    ]
+
+
+def make_pharmacy(n, rng):
+    stocks = {f"sku_{i}": rng.randint(0, 1000) for i in range(n)}
+    consumption = {f"sku_{i}": rng.randint(0, 200) for i in range(n)}
+    return stocks, consumption
+
+
+def measure(label, fn, repeat=3):
+    """Best-of-N wall time and peak traced memory of fn()"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"  {label:40} {best * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB")
+    return best, peak
+
+
+def bench_supplier(n_orders=100_000):
+    print_section(f"SUPPLIER AGENT - prioritize_orders ({n_orders:,} orders)")
+    rng = random.Random(7)
+    agent = SupplierAgent()
+    # Validated up front, as the endpoint does (cost measured in bench_order_validation)
+    orders = ORDER_LIST_ADAPTER.validate_python(make_orders(n_orders, rng))
+    inventory = {m: n_orders * 20 for m in MEDICINES}
+
+    measure(
+        "prioritize_orders",
+        lambda: agent.prioritize_orders(orders, dict(inventory), delivery_capacity=n_orders // 2, validate=False)
+    )
+
+
+def bench_pharmacy(n_skus=10_000):
+    print_section(f"PHARMACY AGENT - classify_medicine_demand ({n_skus:,} SKUs)")
+    rng = random.Random(7)
+    agent = PharmacyAgent()
+    stocks, consumption = make_pharmacy(n_skus, rng)
+
+    measure(
+        "classify_medicine_demand",
+        lambda: agent.classify_medicine_demand(stocks, consumption, ["dengue", "covid"])
+    )
+
+
+def untyped_scores(agent, orders):
+    """Previous untyped path: .get() defaults and per-order case normalization"""
+    scores = []
+    for order in orders:
+        strain = min(100, max(0, order.get('requester_strain', 50)))
+        criticality = agent.MEDICINE_CRITICALITY.get(
+            order.get('medicine', 'default').lower(), agent.MEDICINE_CRITICALITY['default']
+        )
+        urgency = agent.URGENCY_WEIGHTS.get(order.get('urgency', 'NORMAL').upper(), 25)
+        scores.append(round(strain * 0.4 + criticality * 0.3 + urgency * 0.3, 2))
+    return scores
+
+
+def typed_scores(agent, orders):
+    return [
+        agent._calculate_priority_score(o['requester_strain'], o['medicine'], o['urgency'], o['quantity'])
+        for o in orders
+    ]
+
+
+def bench_order_validation(n_orders=10_000):
+    print_section(f"ORDER VALIDATION + SCORING ({n_orders:,} orders, JSON body)")
+    rng = random.Random(7)
+    agent = SupplierAgent()
+    body = json.dumps(make_orders(n_orders, rng)).encode()
+    untyped_adapter = TypeAdapter(List[Dict])
+
+    measure("untyped: List[Dict] + .get/.lower/.upper",
+            lambda: untyped_scores(agent, untyped_adapter.validate_json(body)), repeat=5)
+    measure("typed: cached TypeAdapter",
+            lambda: typed_scores(agent, ORDER_LIST_ADAPTER.validate_json(body)), repeat=5)
+    measure("typed: TypeAdapter rebuilt per call",
+            lambda: typed_scores(agent, TypeAdapter(List[SupplierOrder]).validate_json(body)), repeat=5)
+
+
+if __name__ == "__main__":
+    bench_supplier()
+    bench_pharmacy()
+    bench_order_validation()
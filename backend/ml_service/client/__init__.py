@@ -0,0 +1 @@
+# HealSync ML Service - Python Client
@@ -0,0 +1,375 @@
+"""
+Async Client - Pooled, Coalescing Client for the ML Service
+
+One httpx.AsyncClient per client keeps a bounded pool of keep-alive
+connections, and a semaphore caps the requests in flight. Concurrent
+single-lab predict_outbreak calls, metric samples and ledger events are
+coalesced: calls arriving within BATCH_WINDOW seconds (or until max_batch
+accumulate) go out as one batch-endpoint request and each caller gets its
+own slice of the response. A batch rejected with 422 is re-sent one item
+per request, so an invalid item fails only its own caller.
+
+    async with AsyncMLClient("http://localhost:8000", max_concurrency=16) as ml:
+        per_lab = await asyncio.gather(*[ml.predict_outbreak(**lab) for lab in labs])
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from client.base import BaseClient, MLServiceError
+
+
+class _Coalescer:
+    """Items waiting for one batch request, keyed by everything but the item"""
+
+    def __init__(self, send: Callable):
+        self.send = send                # items -> per-item results
+        self.items: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class AsyncMLClient(BaseClient):
+    """asyncio ML service client over a pooled httpx.AsyncClient"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        city_id: Optional[str] = None,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        compress: bool = False,
+        max_batch: int = 64,
+        max_connections: int = 20,
+        max_concurrency: int = 32,
+        batch_window: float = 0.002,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            base_url: Service root
+            city_id: Default city/tenant shard key for every call
+            compress: Gzip request bodies of at least COMPRESS_MIN_BYTES
+            max_batch: Items per batch request
+            max_connections: Connections kept in the pool
+            max_concurrency: Requests in flight at once
+            batch_window: Seconds a coalesced call waits for company
+            transport: httpx transport override (e.g. ASGITransport in-process)
+        """
+        super().__init__(base_url, city_id, timeout, max_retries, compress, max_batch)
+        self.BATCH_WINDOW = batch_window
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[Tuple, _Coalescer] = {}
+        self._dispatches: set = set()
+        self.batches_sent = 0
+        self.items_coalesced = 0
+
+    # ============= TRANSPORT =============
+
+    async def request(self, method: str, path: str, payload: Any = None, params: Optional[Dict] = None) -> Any:
+        """
+        Send one request, retrying per the shared policy
+
+        Raises:
+            MLServiceError: Non-2xx response after retries
+            httpx.TransportError: Service unreachable after retries
+        """
+        body, headers = self._encode(payload) if payload is not None else (None, {})
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self.http.request(method, path, content=body, headers=headers, params=params)
+            except httpx.TransportError as e:
+                connect_failed = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                delay = self._retry_delay(path, attempt, connect_failed=connect_failed)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                delay = self._retry_delay(
+                    path, attempt, status=response.status_code,
+                    retry_after=response.headers.get("Retry-After")
+                )
+                if delay is None:
+                    raise self._error(response.status_code, response.text, path)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, path: str, city_id: Optional[str] = None, **params) -> Any:
+        return await self.request("GET", path, params=self._params(params, city_id))
+
+    async def post(self, path: str, payload: Dict, city_id: Optional[str] = None) -> Any:
+        return await self.request("POST", path, self._with_city(dict(payload), city_id))
+
+    # ============= COALESCING =============
+
+    def _enqueue(self, key: Tuple, item: Any, send: Callable) -> asyncio.Future:
+        """
+        Queue item for the batch under key; send(items) -> per-item results
+
+        The batch goes out when max_batch items are waiting or BATCH_WINDOW
+        after the first one arrived, whichever is sooner
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Coalescer(send)
+            batch.timer = loop.call_later(self.BATCH_WINDOW, self._dispatch, key)
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.MAX_BATCH:
+            batch.timer.cancel()
+            self._dispatch(key)
+        return future
+
+    def _dispatch(self, key: Tuple):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _send_batch(self, batch: _Coalescer):
+        self.batches_sent += 1
+        self.items_coalesced += len(batch.items)
+        try:
+            results = await batch.send(batch.items)
+        except MLServiceError as e:
+            if e.status_code != 422 or len(batch.items) == 1:
+                self._fail(batch.futures, e)
+                return
+            # Validation rejected the whole batch before any agent ran: find the culprits
+            await asyncio.gather(*[
+                self._send_one(batch.send, item, future)
+                for item, future in zip(batch.items, batch.futures)
+            ])
+            return
+        except Exception as e:
+            self._fail(batch.futures, e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _send_one(self, send: Callable, item: Any, future: asyncio.Future):
+        try:
+            result = (await send([item]))[0]
+        except Exception as e:
+            self._fail([future], e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(futures: List[asyncio.Future], error: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    # ============= AGENTS =============
+
+    async def health(self) -> Dict:
+        return await self.request("GET", "/health")
+
+    async def predict_outbreak(
+        self,
+        current_tests: Dict[str, int],
+        baseline_tests: Dict[str, int],
+        positive_tests: Optional[Dict[str, int]] = None,
+        lab_id: Optional[str] = None,
+        include_uncertainty: bool = False,
+        city_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Lab Agent predictions for one lab, coalesced into /predict/outbreak/batch
+
+        Returns:
+            The /predict/outbreak response fields, as from the sync client
+        """
+        city_id = city_id or self.city_id
+
+        async def send(labs: List[Dict]) -> List[List[Dict]]:
+            payload = self._outbreak_batch_payload(labs, include_uncertainty, None, city_id)
+            response = await self.request("POST", "/predict/outbreak/batch", payload)
+            return [
+                [self._outbreak_response(prediction) for prediction in predictions]
+                for predictions in self._unpack_outbreak_batch(response)
+            ]
+
+        lab = self._lab(current_tests, baseline_tests, positive_tests, lab_id)
+        return await self._enqueue(("/predict/outbreak/batch", city_id, include_uncertainty), lab, send)
+
+    async def predict_outbreak_many(
+        self,
+        labs: Sequence[Dict],
+        include_uncertainty: bool = False,
+        n_draws: Optional[int] = None,
+        city_id: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """Lab Agent predictions for many labs; chunks are sent concurrently"""
+        chunks = await asyncio.gather(*[
+            self.request(
+                "POST", "/predict/outbreak/batch",
+                self._outbreak_batch_payload(chunk, include_uncertainty, n_draws, city_id)
+            )
+            for chunk in self._chunks(labs)
+        ])
+        return [predictions for chunk in chunks for predictions in self._unpack_outbreak_batch(chunk)]
+
+    async def predict_crisis(
+        self,
+        disease_stats: Dict[str, int],
+        hospital_capacity: Dict[str, int],
+        medicine_stock: Dict[str, int],
+        zone_risks: Dict[str, str],
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return await self.post("/predict/crisis", {
+            "disease_stats": disease_stats,
+            "hospital_capacity": hospital_capacity,
+            "medicine_stock": medicine_stock,
+            "zone_risks": zone_risks
+        }, city_id)
+
+    async def hospital_strain(self, hospital_id: Optional[str] = None, city_id: Optional[str] = None, **snapshot) -> Dict:
+        """Hospital Agent HSI; snapshot is total_beds, available_beds, icu_total, ..."""
+        if hospital_id is not None:
+            snapshot["hospital_id"] = hospital_id
+        return await self.post("/calculate/hospital_strain", snapshot, city_id)
+
+    async def pharmacy_demand(
+        self,
+        medicine_stocks: Dict[str, int],
+        consumption_rates: Dict[str, int],
+        outbreak_alerts: Optional[List[str]] = None,
+        pharmacy_id: Optional[str] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        payload = {"medicine_stocks": medicine_stocks, "consumption_rates": consumption_rates}
+        if outbreak_alerts is not None:
+            payload["outbreak_alerts"] = outbreak_alerts
+        if pharmacy_id is not None:
+            payload["pharmacy_id"] = pharmacy_id
+        return await self.post("/classify/pharmacy_demand", payload, city_id)
+
+    async def prioritize_orders(
+        self,
+        orders: List[Dict],
+        inventory: Dict[str, int],
+        delivery_capacity: int,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return await self.post("/prioritize/orders", {
+            "orders": orders,
+            "inventory": inventory,
+            "delivery_capacity": delivery_capacity
+        }, city_id)
+
+    # ============= COALESCED WRITES =============
+
+    async def record_metric(
+        self,
+        entity_id: str,
+        metric: str,
+        value: float,
+        timestamp: Optional[float] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        """One rollup sample, coalesced into /rollups/points; returns the batch summary"""
+        city_id = city_id or self.city_id
+
+        async def send(points: List[Dict]) -> List[Dict]:
+            result = await self.request("POST", "/rollups/points", self._with_city({"points": points}, city_id))
+            return [result] * len(points)
+
+        point = self._metric_point(entity_id, metric, value, timestamp)
+        return await self._enqueue(("/rollups/points", city_id), point, send)
+
+    async def record_metrics(self, points: Sequence[Dict], city_id: Optional[str] = None) -> Dict:
+        """Write rollup samples now, max_batch per request"""
+        return self._merge_counts(await asyncio.gather(*[
+            self.request("POST", "/rollups/points", self._with_city({"points": list(chunk)}, city_id))
+            for chunk in self._chunks(points)
+        ]))
+
+    async def ledger_event(
+        self,
+        pharmacy_id: str,
+        medicine: str,
+        event_type: str,
+        quantity: int,
+        timestamp: Optional[float] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        """One dispense / restock / count event, coalesced into /ledger/events; returns the batch summary"""
+        city_id = city_id or self.city_id
+
+        async def send(events: List[Dict]) -> List[Dict]:
+            result = await self.request("POST", "/ledger/events", self._with_city({"events": events}, city_id))
+            return [result] * len(events)
+
+        event = self._ledger_event(pharmacy_id, medicine, event_type, quantity, timestamp)
+        return await self._enqueue(("/ledger/events", city_id), event, send)
+
+    async def ledger_events(
+        self,
+        events: Sequence[Dict],
+        zones: Optional[Dict[str, str]] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        """Write stock ledger events now, max_batch per request, in order"""
+        responses = []
+        for chunk in self._chunks(events):
+            payload = {"events": list(chunk)}
+            if zones is not None:
+                payload["zones"] = zones
+            responses.append(await self.request("POST", "/ledger/events", self._with_city(payload, city_id)))
+        return self._merge_counts(responses)
+
+    async def query_rollups(
+        self,
+        entity_id: str,
+        metric: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: Optional[str] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return await self.get(
+            "/rollups/query", city_id,
+            entity_id=entity_id, metric=metric, start=start, end=end, resolution=resolution
+        )
+
+    # ============= LIFECYCLE =============
+
+    async def flush(self):
+        """Send every waiting batch now and wait for them to finish"""
+        for key, batch in list(self._pending.items()):
+            batch.timer.cancel()
+            self._dispatch(key)
+        if self._dispatches:
+            await asyncio.gather(*list(self._dispatches), return_exceptions=True)
+
+    async def aclose(self):
+        try:
+            await self.flush()
+        finally:
+            await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncMLClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
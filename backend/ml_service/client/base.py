@@ -0,0 +1,201 @@
+"""
+Client Base - Shared Encoding, Retry and Batching Rules
+
+Both client flavors build identical payloads and make the same retry
+decisions; only the transport differs:
+- Bodies are compact JSON, gzip-compressed (Content-Encoding: gzip) when
+  compression is on and the body is large enough; responses come back
+  gzip-compressed whenever they are large
+- A request is retried with exponential backoff and jitter (or the
+  server's Retry-After) when it never reached an agent: connection refused,
+  or 503 / 429 from admission control. Timeouts, dropped connections and
+  502 / 504 are retried only for endpoints without side effects
+- Single-item calls with a batch endpoint are chunked (and, in the async
+  client, coalesced) into batch requests of at most max_batch items
+"""
+
+import gzip
+import json
+import random
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class MLServiceError(Exception):
+    """Non-2xx response from the ML service"""
+
+    def __init__(self, status_code: int, detail: Any, path: str):
+        super().__init__(f"{path} -> {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.path = path
+
+
+class BaseClient:
+    """Configuration, payload builders and retry policy shared by both clients"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        city_id: Optional[str] = None,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        compress: bool = False,
+        max_batch: int = 64
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.city_id = city_id                  # Sent as city_id unless a call sets its own
+        self.TIMEOUT = timeout
+        self.MAX_RETRIES = max_retries
+        self.COMPRESS = compress
+        self.COMPRESS_MIN_BYTES = 1024          # Smaller bodies gain nothing from gzip
+        self.COMPRESS_LEVEL = 5
+        self.MAX_BATCH = max_batch
+        self.BACKOFF_BASE = 0.1                 # Seconds; doubles per attempt
+        self.BACKOFF_MAX = 5.0
+        self.SHED_STATUSES = {429, 503}         # Rejected before any agent ran
+        self.GATEWAY_STATUSES = {502, 504}      # Outcome unknown
+        # Endpoints with side effects: not retried once the request may have run
+        self.NON_IDEMPOTENT = {
+            "/orders/book", "/orders/cycle", "/ledger/events", "/detect/lab_changes",
+            "/graph/tick", "/rollups/points"
+        }
+        # /predict/outbreak response fields (the batch endpoint returns more)
+        self.OUTBREAK_FIELDS = (
+            "disease", "risk_level", "growth_rate", "predicted_cases_24h", "recommendation",
+            "trigger_outbreak", "predicted_cases_interval", "interval_level", "outbreak_probability"
+        )
+
+    # ============= ENCODING =============
+
+    def _encode(self, payload: Any) -> Tuple[bytes, Dict[str, str]]:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.COMPRESS and len(body) >= self.COMPRESS_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=self.COMPRESS_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _with_city(self, payload: Dict, city_id: Optional[str]) -> Dict:
+        city_id = city_id or self.city_id
+        if city_id is not None:
+            payload["city_id"] = city_id
+        return payload
+
+    def _params(self, params: Optional[Dict], city_id: Optional[str] = None) -> Dict:
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        city_id = city_id or self.city_id
+        if city_id is not None:
+            params.setdefault("city_id", city_id)
+        return params
+
+    # ============= RETRIES =============
+
+    def _retry_delay(
+        self,
+        path: str,
+        attempt: int,
+        status: Optional[int] = None,
+        connect_failed: bool = False,
+        retry_after: Optional[str] = None
+    ) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up"""
+        if attempt >= self.MAX_RETRIES:
+            return None
+        if status is not None:
+            retryable = status in self.SHED_STATUSES or (
+                status in self.GATEWAY_STATUSES and path not in self.NON_IDEMPOTENT
+            )
+        else:
+            retryable = connect_failed or path not in self.NON_IDEMPOTENT
+        if not retryable:
+            return None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.BACKOFF_MAX)
+            except ValueError:
+                pass
+        return min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _error(status_code: int, text: str, path: str) -> MLServiceError:
+        try:
+            detail = json.loads(text).get("detail", text)
+        except (ValueError, AttributeError):
+            detail = text
+        return MLServiceError(status_code, detail, path)
+
+    # ============= PAYLOADS =============
+
+    def _chunks(self, items: Sequence) -> Iterator[Sequence]:
+        for start in range(0, len(items), self.MAX_BATCH):
+            yield items[start:start + self.MAX_BATCH]
+
+    @staticmethod
+    def _lab(
+        current_tests: Dict[str, int],
+        baseline_tests: Dict[str, int],
+        positive_tests: Optional[Dict[str, int]] = None,
+        lab_id: Optional[str] = None
+    ) -> Dict:
+        lab = {"current_tests": current_tests, "baseline_tests": baseline_tests}
+        if positive_tests is not None:
+            lab["positive_tests"] = positive_tests
+        if lab_id is not None:
+            lab["lab_id"] = lab_id
+        return lab
+
+    def _outbreak_batch_payload(
+        self,
+        labs: Sequence[Dict],
+        include_uncertainty: bool,
+        n_draws: Optional[int],
+        city_id: Optional[str]
+    ) -> Dict:
+        payload = {"labs": list(labs), "include_uncertainty": include_uncertainty}
+        if n_draws is not None:
+            payload["n_draws"] = n_draws
+        return self._with_city(payload, city_id)
+
+    @staticmethod
+    def _unpack_outbreak_batch(response: List[Dict]) -> List[List[Dict]]:
+        return [lab["predictions"] for lab in response]
+
+    def _outbreak_response(self, prediction: Dict) -> Dict:
+        """A batch prediction in /predict/outbreak shape (unset optional fields omitted)"""
+        return {
+            field: prediction[field]
+            for field in self.OUTBREAK_FIELDS if prediction.get(field) is not None
+        }
+
+    @staticmethod
+    def _metric_point(entity_id: str, metric: str, value: float, timestamp: Optional[float]) -> Dict:
+        point = {"entity_id": entity_id, "metric": metric, "value": value}
+        if timestamp is not None:
+            point["timestamp"] = timestamp
+        return point
+
+    @staticmethod
+    def _ledger_event(
+        pharmacy_id: str,
+        medicine: str,
+        event_type: str,
+        quantity: int,
+        timestamp: Optional[float]
+    ) -> Dict:
+        event = {"pharmacy_id": pharmacy_id, "medicine": medicine, "type": event_type, "quantity": quantity}
+        if timestamp is not None:
+            event["timestamp"] = timestamp
+        return event
+
+    @staticmethod
+    def _merge_counts(responses: List[Dict]) -> Dict:
+        """One summary for a write split across batch requests: counts add, the rest is the last"""
+        merged: Dict[str, Any] = {}
+        for response in responses:
+            for key, value in response.items():
+                if key in ("recorded", "applied", "rejected", "pharmacies_updated") and isinstance(value, int):
+                    merged[key] = merged.get(key, 0) + value
+                else:
+                    merged[key] = value
+        merged["requests"] = len(responses)
+        return merged
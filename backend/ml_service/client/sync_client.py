@@ -0,0 +1,301 @@
+"""
+Sync Client - Pooled Keep-Alive Client for the ML Service
+
+One requests.Session per client keeps connections to the service open
+across calls (a bare requests.post opens and tears down a TCP connection
+every time). Many-item calls are split into batch-endpoint chunks, and
+single metric samples and ledger events are buffered and written in
+batches on flush(), when the buffer is full, or on close(). A batch leaves
+the buffer only once it was written, so a failed write is retried by the
+next flush.
+
+    with MLClient("http://localhost:8000", city_id="pune") as ml:
+        predictions = ml.predict_outbreak(current, baseline, positives)
+        per_lab = ml.predict_outbreak_many(labs)
+        ml.record_metric("H1", "hsi", 72.5)
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from client.base import BaseClient, MLServiceError
+
+
+class MLClient(BaseClient):
+    """Blocking ML service client over a pooled requests.Session"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        city_id: Optional[str] = None,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        compress: bool = False,
+        max_batch: int = 64,
+        pool_size: int = 10
+    ):
+        """
+        Args:
+            base_url: Service root
+            city_id: Default city/tenant shard key for every call
+            compress: Gzip request bodies of at least COMPRESS_MIN_BYTES
+            max_batch: Items per batch request (and buffered writes per flush)
+            pool_size: Keep-alive connections kept open to the service
+        """
+        super().__init__(base_url, city_id, timeout, max_retries, compress, max_batch)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pending_points: Dict[Optional[str], List[Dict]] = {}    # city_id -> buffered samples
+        self._pending_events: Dict[Optional[str], List[Dict]] = {}    # city_id -> buffered events
+
+    # ============= TRANSPORT =============
+
+    def request(self, method: str, path: str, payload: Any = None, params: Optional[Dict] = None) -> Any:
+        """
+        Send one request, retrying per the shared policy
+
+        Raises:
+            MLServiceError: Non-2xx response after retries
+            requests.exceptions.ConnectionError: Service unreachable after retries
+        """
+        body, headers = self._encode(payload) if payload is not None else (None, {})
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    method, self.base_url + path, data=body, headers=headers,
+                    params=params, timeout=self.TIMEOUT
+                )
+            except requests.exceptions.RequestException as e:
+                delay = self._retry_delay(path, attempt, connect_failed=self._connect_failed(e))
+                if delay is None:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                delay = self._retry_delay(
+                    path, attempt, status=response.status_code,
+                    retry_after=response.headers.get("Retry-After")
+                )
+                if delay is None:
+                    raise self._error(response.status_code, response.text, path)
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _connect_failed(e: requests.exceptions.RequestException) -> bool:
+        """True when no connection was made, so the request never reached the service"""
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def get(self, path: str, city_id: Optional[str] = None, **params) -> Any:
+        return self.request("GET", path, params=self._params(params, city_id))
+
+    def post(self, path: str, payload: Dict, city_id: Optional[str] = None) -> Any:
+        return self.request("POST", path, self._with_city(dict(payload), city_id))
+
+    # ============= AGENTS =============
+
+    def health(self) -> Dict:
+        return self.request("GET", "/health")
+
+    def predict_outbreak(
+        self,
+        current_tests: Dict[str, int],
+        baseline_tests: Dict[str, int],
+        positive_tests: Optional[Dict[str, int]] = None,
+        lab_id: Optional[str] = None,
+        include_uncertainty: bool = False,
+        city_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Lab Agent predictions for one lab"""
+        payload = self._lab(current_tests, baseline_tests, positive_tests, lab_id)
+        payload["include_uncertainty"] = include_uncertainty
+        return self.post("/predict/outbreak", payload, city_id)
+
+    def predict_outbreak_many(
+        self,
+        labs: Sequence[Dict],
+        include_uncertainty: bool = False,
+        n_draws: Optional[int] = None,
+        city_id: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Lab Agent predictions for many labs via /predict/outbreak/batch
+
+        Args:
+            labs: [{"current_tests", "baseline_tests", "positive_tests"?, "lab_id"?}]
+
+        Returns:
+            Predictions per lab, in input order
+        """
+        results: List[List[Dict]] = []
+        for chunk in self._chunks(labs):
+            payload = self._outbreak_batch_payload(chunk, include_uncertainty, n_draws, city_id)
+            results.extend(self._unpack_outbreak_batch(self.request("POST", "/predict/outbreak/batch", payload)))
+        return results
+
+    def predict_crisis(
+        self,
+        disease_stats: Dict[str, int],
+        hospital_capacity: Dict[str, int],
+        medicine_stock: Dict[str, int],
+        zone_risks: Dict[str, str],
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return self.post("/predict/crisis", {
+            "disease_stats": disease_stats,
+            "hospital_capacity": hospital_capacity,
+            "medicine_stock": medicine_stock,
+            "zone_risks": zone_risks
+        }, city_id)
+
+    def hospital_strain(self, hospital_id: Optional[str] = None, city_id: Optional[str] = None, **snapshot) -> Dict:
+        """Hospital Agent HSI; snapshot is total_beds, available_beds, icu_total, ..."""
+        if hospital_id is not None:
+            snapshot["hospital_id"] = hospital_id
+        return self.post("/calculate/hospital_strain", snapshot, city_id)
+
+    def pharmacy_demand(
+        self,
+        medicine_stocks: Dict[str, int],
+        consumption_rates: Dict[str, int],
+        outbreak_alerts: Optional[List[str]] = None,
+        pharmacy_id: Optional[str] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        payload = {"medicine_stocks": medicine_stocks, "consumption_rates": consumption_rates}
+        if outbreak_alerts is not None:
+            payload["outbreak_alerts"] = outbreak_alerts
+        if pharmacy_id is not None:
+            payload["pharmacy_id"] = pharmacy_id
+        return self.post("/classify/pharmacy_demand", payload, city_id)
+
+    def prioritize_orders(
+        self,
+        orders: List[Dict],
+        inventory: Dict[str, int],
+        delivery_capacity: int,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return self.post("/prioritize/orders", {
+            "orders": orders,
+            "inventory": inventory,
+            "delivery_capacity": delivery_capacity
+        }, city_id)
+
+    # ============= BUFFERED WRITES =============
+
+    def record_metric(
+        self,
+        entity_id: str,
+        metric: str,
+        value: float,
+        timestamp: Optional[float] = None,
+        city_id: Optional[str] = None
+    ):
+        """Buffer one rollup sample; written with the next full batch or flush()"""
+        city_id = city_id or self.city_id
+        pending = self._pending_points.setdefault(city_id, [])
+        pending.append(self._metric_point(entity_id, metric, value, timestamp))
+        if len(pending) >= self.MAX_BATCH:
+            self._drain(self._pending_points, city_id, self.record_metrics)
+
+    def record_metrics(self, points: Sequence[Dict], city_id: Optional[str] = None) -> Dict:
+        """Write rollup samples now, max_batch per request"""
+        return self._merge_counts([
+            self.request("POST", "/rollups/points", self._with_city({"points": list(chunk)}, city_id))
+            for chunk in self._chunks(points)
+        ])
+
+    def ledger_event(
+        self,
+        pharmacy_id: str,
+        medicine: str,
+        event_type: str,
+        quantity: int,
+        timestamp: Optional[float] = None,
+        city_id: Optional[str] = None
+    ):
+        """Buffer one dispense / restock / count event; written with the next full batch or flush()"""
+        city_id = city_id or self.city_id
+        pending = self._pending_events.setdefault(city_id, [])
+        pending.append(self._ledger_event(pharmacy_id, medicine, event_type, quantity, timestamp))
+        if len(pending) >= self.MAX_BATCH:
+            self._drain(self._pending_events, city_id, self._write_events)
+
+    def ledger_events(
+        self,
+        events: Sequence[Dict],
+        zones: Optional[Dict[str, str]] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        """Write stock ledger events now, max_batch per request"""
+        responses = []
+        for chunk in self._chunks(events):
+            payload = {"events": list(chunk)}
+            if zones is not None:
+                payload["zones"] = zones
+            responses.append(self.request("POST", "/ledger/events", self._with_city(payload, city_id)))
+        return self._merge_counts(responses)
+
+    def _write_events(self, events: Sequence[Dict], city_id: Optional[str]) -> Dict:
+        return self.ledger_events(events, city_id=city_id)
+
+    def _drain(self, pending: Dict[Optional[str], List[Dict]], city_id: Optional[str], write: Callable):
+        """
+        Write one city's buffered items a batch at a time
+
+        Each batch is dropped from the buffer only after write() returns;
+        if it raises, that batch and the rest stay buffered
+        """
+        items = pending[city_id]
+        while items:
+            batch = items[:self.MAX_BATCH]
+            write(batch, city_id)
+            del items[:len(batch)]
+        del pending[city_id]
+
+    def flush(self):
+        """Write every buffered sample and event"""
+        for city_id in list(self._pending_points):
+            self._drain(self._pending_points, city_id, self.record_metrics)
+        for city_id in list(self._pending_events):
+            self._drain(self._pending_events, city_id, self._write_events)
+
+    def query_rollups(
+        self,
+        entity_id: str,
+        metric: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: Optional[str] = None,
+        city_id: Optional[str] = None
+    ) -> Dict:
+        return self.get(
+            "/rollups/query", city_id,
+            entity_id=entity_id, metric=metric, start=start, end=end, resolution=resolution
+        )
+
+    # ============= LIFECYCLE =============
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.session.close()
+
+    def __enter__(self) -> "MLClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
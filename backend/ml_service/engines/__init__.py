@@ -0,0 +1 @@
+# HealSync ML Service - Engine Modules
@@ -0,0 +1,230 @@
+"""
+Change Detector - Streaming CUSUM / EWMA Charts for Lab Series
+
+Implementation Mandate: Hybrid Logic
+- Formula: Every lab x disease has two series, test count x and positive
+  rate p, each standardized against its in-control baseline:
+      z = (x - mean) / sqrt(max(var, mean, 1))         (Poisson floor)
+      z = (p - p0) / sqrt(p0 * (1 - p0) / tests)        (binomial)
+  then charted with a one-sided CUSUM and an EWMA:
+      S = min(max(0, S + z - K), CUSUM_CAP)
+      E = LAMBDA * z + (1 - LAMBDA) * E,  UCL = L * sqrt(LAMBDA / (2 - LAMBDA) * (1 - (1 - LAMBDA)^(2t)))
+
+- Rule: CUSUM alarms while S > H, EWMA while E > UCL. The baseline is
+  learned over the first WARMUP_TICKS (no alarms yet) and then follows a
+  slow EWMA only while neither chart alarms, so an outbreak is not absorbed
+  into it. State is one contiguous (labs, diseases, metrics) array per
+  field and a tick updates every observed series in one vectorized pass
+- Rule: A tick reports only the series that are alarming or changed state
+  (warmed up, alarm raised or cleared); quiet series cost nothing to report.
+  full=True reports every observed series
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.lab_agent import LabAgent
+
+
+class ChangeDetector:
+    """Online CUSUM and EWMA change detection for every lab x disease"""
+
+    _FIELDS = ('_mean', '_var', '_cusum', '_ewma', '_n', '_charted', '_cusum_run', '_cusum_alarm', '_ewma_alarm')
+
+    def __init__(self, diseases: Optional[List[str]] = None, capacity: int = 64):
+        self.K = 0.5                    # CUSUM allowance (detects ~1 sigma shifts)
+        self.H = 5.0                    # CUSUM decision interval
+        self.CUSUM_CAP = 10.0           # Bounds S so alarms clear soon after a return to baseline
+        self.LAMBDA = 0.2               # EWMA smoothing
+        self.L = 3.0                    # EWMA control limit width
+        self.WARMUP_TICKS = 14          # Ticks that only learn the baseline
+        self.BASELINE_ALPHA = 0.05      # Slow baseline drift once warmed up
+        self.MIN_RATE = 0.01            # p0 clip for the binomial sigma
+        self.METRICS = ('tests', 'positive_rate')
+
+        self.diseases = list(diseases or LabAgent().diseases)
+        self._disease_index = {d: j for j, d in enumerate(self.diseases)}
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self.ticks = 0
+
+        shape = (capacity, len(self.diseases), len(self.METRICS))
+        self._mean = np.zeros(shape)
+        self._var = np.zeros(shape)
+        self._cusum = np.zeros(shape)
+        self._ewma = np.zeros(shape)
+        self._n = np.zeros(shape, dtype=np.int64)            # Observations (baseline + charted)
+        self._charted = np.zeros(shape, dtype=np.int64)      # Observations since warm-up
+        self._cusum_run = np.zeros(shape, dtype=np.int64)    # Ticks since S last left 0
+        self._cusum_alarm = np.zeros(shape, dtype=np.int64)  # Consecutive CUSUM alarm ticks
+        self._ewma_alarm = np.zeros(shape, dtype=np.int64)   # Consecutive EWMA alarm ticks
+
+    def observe(self, labs: List[Dict], full: bool = False) -> List[Dict]:
+        """
+        Advance one tick for each lab given
+
+        Args:
+            labs: [{"lab_id", "current_tests", "positive_tests"}]; diseases
+                  missing from current_tests do not advance
+            full: Report every observed series, not only alarming or changed ones
+
+        Returns:
+            Per lab, in input order: {"baseline_tests", "detectors"} where
+            detectors maps disease -> metric -> chart state and alarms for
+            the reported series
+        """
+        if not labs:
+            return []
+        n_diseases = len(self.diseases)
+        tests = np.zeros((len(labs), n_diseases))
+        positives = np.zeros((len(labs), n_diseases))
+        present = np.zeros((len(labs), n_diseases), dtype=bool)
+        for i, lab in enumerate(labs):
+            lab_positives = lab.get('positive_tests') or {}
+            for disease, count in (lab.get('current_tests') or {}).items():
+                j = self._disease_index.get(disease)
+                if j is not None:
+                    tests[i, j] = count
+                    positives[i, j] = lab_positives.get(disease, 0)
+                    present[i, j] = True
+
+        with self._lock:
+            rows = np.array([self._row(lab['lab_id']) for lab in labs], dtype=np.int64)
+            before = self._status(rows)
+            # A lab sent twice in one batch ticks twice, in order
+            passes = self._passes(rows)
+            for selected in passes:
+                self._tick(rows[selected], tests[selected], positives[selected], present[selected])
+            self.ticks += 1
+            observed = self._n[rows][..., 0] > 0
+            if full:
+                reported = np.broadcast_to(observed[..., None], before.shape[:-1])
+            else:
+                status = self._status(rows)
+                reported = status[..., 1:].any(axis=-1) | (status != before).any(axis=-1)
+            return self._reports(rows, observed, reported)
+
+    def _tick(self, rows: np.ndarray, tests: np.ndarray, positives: np.ndarray, present: np.ndarray):
+        """One vectorized update of every observed series of these (distinct) labs"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(tests > 0, positives / tests, 0.0)
+        x = np.stack([tests, rate], axis=-1)
+        valid = np.stack([present, present & (tests > 0)], axis=-1)
+
+        mean, var, n = self._mean[rows], self._var[rows], self._n[rows]
+        p0 = np.clip(mean[..., 1], self.MIN_RATE, 1 - self.MIN_RATE)
+        sigma = np.stack([
+            np.sqrt(np.maximum(np.maximum(var[..., 0], mean[..., 0]), 1.0)),
+            np.sqrt(p0 * (1 - p0) / np.maximum(tests, 1))
+        ], axis=-1)
+        z = (x - mean) / sigma
+
+        charting = valid & (n >= self.WARMUP_TICKS)
+        cusum = np.where(charting, np.clip(self._cusum[rows] + z - self.K, 0, self.CUSUM_CAP), self._cusum[rows])
+        ewma = np.where(charting, self.LAMBDA * z + (1 - self.LAMBDA) * self._ewma[rows], self._ewma[rows])
+        charted = self._charted[rows] + charting
+        ucl = self._ucl(charted)
+        cusum_alarm = charting & (cusum > self.H)
+        ewma_alarm = charting & (ewma > ucl)
+
+        self._cusum[rows] = cusum
+        self._ewma[rows] = ewma
+        self._charted[rows] = charted
+        self._cusum_run[rows] = np.where(charting, np.where(cusum > 0, self._cusum_run[rows] + 1, 0), self._cusum_run[rows])
+        self._cusum_alarm[rows] = np.where(charting, np.where(cusum_alarm, self._cusum_alarm[rows] + 1, 0), self._cusum_alarm[rows])
+        self._ewma_alarm[rows] = np.where(charting, np.where(ewma_alarm, self._ewma_alarm[rows] + 1, 0), self._ewma_alarm[rows])
+
+        # Baseline: running mean during warm-up, slow EWMA after; frozen in alarm
+        learn = valid & ~(cusum_alarm | ewma_alarm)
+        alpha = np.maximum(1.0 / (n + 1), self.BASELINE_ALPHA)
+        diff = x - mean
+        self._mean[rows] = np.where(learn, mean + alpha * diff, mean)
+        self._var[rows] = np.where(learn, np.where(n > 0, (1 - alpha) * (var + alpha * diff * diff), 0.0), var)
+        self._n[rows] = n + learn
+
+    def _ucl(self, charted: np.ndarray) -> np.ndarray:
+        decay = (1 - self.LAMBDA) ** (2 * charted)
+        return self.L * np.sqrt(self.LAMBDA / (2 - self.LAMBDA) * (1 - decay))
+
+    def _status(self, rows: np.ndarray) -> np.ndarray:
+        """(labs, diseases, metrics, 3) warmed up / CUSUM alarm / EWMA alarm flags"""
+        return np.stack([
+            self._n[rows] >= self.WARMUP_TICKS,
+            self._cusum[rows] > self.H,
+            self._ewma_alarm[rows] > 0
+        ], axis=-1)
+
+    def _reports(self, rows: np.ndarray, observed: np.ndarray, reported: np.ndarray) -> List[Dict]:
+        """Baselines of the observed series and chart state of the reported ones"""
+        baseline_tests = self._mean[rows][..., 0].round().astype(np.int64)
+        labs, diseases = np.nonzero(observed)
+        reports = [{"baseline_tests": {}, "detectors": {}} for _ in range(len(rows))]
+        for i, j, value in zip(labs.tolist(), diseases.tolist(), baseline_tests[labs, diseases].tolist()):
+            reports[i]["baseline_tests"][self.diseases[j]] = value
+
+        labs, diseases, metrics = np.nonzero(reported)
+        if not len(labs):
+            return reports
+        cells = (rows[labs], diseases, metrics)
+        mean, cusum = self._mean[cells], self._cusum[cells]
+        columns = {
+            "baseline": np.where(metrics == 0, mean.round(1), mean.round(4)).tolist(),
+            "warmed_up": (self._n[cells] >= self.WARMUP_TICKS).tolist(),
+            "cusum": cusum.round(3).tolist(),
+            "cusum_alarm": (cusum > self.H).tolist(),
+            "cusum_run_length": self._cusum_run[cells].tolist(),
+            "cusum_alarm_ticks": self._cusum_alarm[cells].tolist(),
+            "ewma": self._ewma[cells].round(3).tolist(),
+            "ewma_ucl": self._ucl(self._charted[cells]).round(3).tolist(),
+            "ewma_alarm": (self._ewma_alarm[cells] > 0).tolist(),
+            "ewma_alarm_ticks": self._ewma_alarm[cells].tolist()
+        }
+        for k, (i, j, m) in enumerate(zip(labs.tolist(), diseases.tolist(), metrics.tolist())):
+            detectors = reports[i]["detectors"].setdefault(self.diseases[j], {})
+            detectors[self.METRICS[m]] = {name: values[k] for name, values in columns.items()}
+        return reports
+
+    def _row(self, lab_id: str) -> int:
+        row = self._rows.get(lab_id)
+        if row is None:
+            row = self._rows[lab_id] = len(self._ids)
+            self._ids.append(lab_id)
+            if row >= len(self._mean):
+                self._grow()
+        return row
+
+    def _grow(self):
+        """Double every state array (zero rows are fresh series)"""
+        for field in self._FIELDS:
+            column = getattr(self, field)
+            grown = np.zeros((len(column) * 2,) + column.shape[1:], dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, field, grown)
+
+    @staticmethod
+    def _passes(rows: np.ndarray) -> List[np.ndarray]:
+        """Split positions so each pass updates a lab at most once"""
+        if len(np.unique(rows)) == len(rows):
+            return [np.arange(len(rows))]
+        counts: Dict[int, int] = {}
+        occurrence = np.empty(len(rows), dtype=np.int64)
+        for i, row in enumerate(rows.tolist()):
+            occurrence[i] = counts.get(row, 0)
+            counts[row] = occurrence[i] + 1
+        return [np.flatnonzero(occurrence == k) for k in range(occurrence.max() + 1)]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            n = len(self._ids)
+            charting = self._n[:n] >= self.WARMUP_TICKS
+            return {
+                "labs": n,
+                "series": int(np.count_nonzero(self._n[:n])),
+                "warmed_up": int(np.count_nonzero(charting)),
+                "cusum_alarms": int(np.count_nonzero(self._cusum[:n] > self.H)),
+                "ewma_alarms": int(np.count_nonzero(self._ewma_alarm[:n])),
+                "ticks": self.ticks
+            }
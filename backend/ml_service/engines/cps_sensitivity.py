@@ -0,0 +1,231 @@
+"""
+CPS Sensitivity - Crisis Tiers Across Weight and Threshold Grids
+
+Implementation Mandate: Hybrid Logic
+- Formula: With component scores S (snapshots x 4) and weight vectors W
+  (grid x 4, rows summing to 1), every CPS in the grid is one product
+      CPS = W @ S^T
+  The smallest weight change that moves a snapshot's CPS by gap (staying
+  on sum(w) = 1) is
+      ||dw|| = |gap| / ||s - mean(s)||,   dw = gap * (s - mean(s)) / ||s - mean(s)||^2
+  (a lower bound: it ignores the w >= 0 constraint)
+
+- Rule: A snapshot is fragile when a small weight change, or another
+  threshold set in the grid, changes its severity tier
+"""
+
+import time
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from agents.city_agent import CityAgent
+
+
+class CPSSensitivity:
+    """How far each city snapshot is from a different CPS severity"""
+
+    def __init__(self):
+        self.DEFAULT_WEIGHT_STEP = 0.05     # Simplex grid spacing (1771 weight vectors)
+        self.MIN_WEIGHT_STEP = 0.01         # 176851 weight vectors
+        self.CHUNK_CELLS = 2_000_000        # CPS cells evaluated per pass (bounds memory)
+
+        self._city = CityAgent()
+        self.COMPONENTS = tuple(self._city.CPS_WEIGHTS)
+        self.TIERS = ('LOW',) + tuple(sorted(self._city.CPS_THRESHOLDS, key=self._city.CPS_THRESHOLDS.get))
+
+    def analyze(
+        self,
+        snapshots: List[Dict],
+        weights: Optional[Sequence[Sequence[float]]] = None,
+        thresholds: Optional[Sequence[Sequence[float]]] = None,
+        weight_step: Optional[float] = None
+    ) -> Dict:
+        """
+        Evaluate CPS for every snapshot x weight vector x threshold set
+
+        Args:
+            snapshots: [{"snapshot_id", "disease_stats", "hospital_capacity",
+                         "medicine_stock", "zone_risks"}]
+            weights: Weight vectors in COMPONENTS order (normalized to sum 1);
+                     default a simplex grid with weight_step spacing
+            thresholds: [MEDIUM, ELEVATED, CRITICAL] cutoff sets; default the
+                        City Agent's
+            weight_step: Simplex grid spacing when weights are omitted
+
+        Returns:
+            Per snapshot: default CPS and tier, distance to the nearest tier
+            change, tier shares over the grid and the closest flipping grid
+            point; snapshots ordered from most to least fragile
+        """
+        start = time.perf_counter()
+        scores = np.array([
+            [component[c] for c in self.COMPONENTS]
+            for component in (
+                self._city.component_scores(
+                    s['disease_stats'], s['hospital_capacity'], s['medicine_stock'], s['zone_risks']
+                )
+                for s in snapshots
+            )
+        ], dtype=np.float64).reshape(len(snapshots), len(self.COMPONENTS))
+
+        w0 = np.array([self._city.CPS_WEIGHTS[c] for c in self.COMPONENTS])
+        t0 = np.array([self._city.CPS_THRESHOLDS[t] for t in self.TIERS[1:]], dtype=np.float64)
+        grid = self._weight_grid(weights, weight_step)
+        threshold_sets = self._threshold_sets(thresholds, t0)
+
+        # Summed term by term like predict_crisis, so CPS on a cutoff tiers identically
+        cps = sum(scores[:, j] * w0[j] for j in range(len(w0)))
+        tier = np.searchsorted(t0, cps, side="right")
+        boundaries = self._boundaries(scores, cps, tier, t0)
+        tier_counts, flip, cps_range = self._scan_grid(scores, tier, grid, threshold_sets, w0)
+
+        combos = len(grid) * len(threshold_sets) * len(snapshots)
+        results = []
+        for i, snapshot in enumerate(snapshots):
+            lower, upper = boundaries[0][i], boundaries[1][i]
+            # Boundaries no weight vector reaches cannot be the nearest change
+            reachable = [b for b in (lower, upper) if b is not None and b['weight_distance'] is not None]
+            nearest = min(reachable, key=lambda b: b['weight_distance'], default=None)
+            best = flip[i]
+            results.append({
+                "snapshot_id": snapshot.get('snapshot_id') or str(i),
+                "cps": round(float(cps[i]), 2),
+                "severity": self.TIERS[tier[i]],
+                "components": dict(zip(self.COMPONENTS, scores[i].round(1).tolist())),
+                "cps_range": [round(float(cps_range[0][i]), 2), round(float(cps_range[1][i]), 2)],
+                "boundaries": {"lower": lower, "upper": upper},
+                "nearest_tier_change": nearest,
+                "tier_shares": {
+                    t: round(float(tier_counts[k, i]) / (len(grid) * len(threshold_sets)), 4)
+                    for k, t in enumerate(self.TIERS)
+                },
+                "flip_share": round(1 - float(tier_counts[tier[i], i]) / (len(grid) * len(threshold_sets)), 4),
+                "nearest_grid_flip": None if best is None else {
+                    "weights": dict(zip(self.COMPONENTS, grid[best[0]].round(4).tolist())),
+                    "thresholds": dict(zip(self.TIERS[1:], threshold_sets[best[1]].tolist())),
+                    "severity": self.TIERS[best[2]],
+                    "weight_distance": round(best[3], 4)
+                }
+            })
+
+        fragility = sorted(
+            (r for r in results if r['nearest_tier_change'] is not None),
+            key=lambda r: r['nearest_tier_change']['weight_distance']
+        )
+        return {
+            "defaults": {
+                "weights": dict(self._city.CPS_WEIGHTS),
+                "thresholds": dict(zip(self.TIERS[1:], t0.tolist()))
+            },
+            "grid": {
+                "weight_vectors": len(grid),
+                "threshold_sets": len(threshold_sets),
+                "snapshots": len(snapshots),
+                "combinations": combos,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+            },
+            "snapshots": results,
+            "most_fragile": [r['snapshot_id'] for r in fragility]
+        }
+
+    def _weight_grid(self, weights: Optional[Sequence[Sequence[float]]], step: Optional[float]) -> np.ndarray:
+        """Given vectors normalized to sum 1, or every simplex point at step spacing"""
+        if weights is not None:
+            grid = np.asarray(weights, dtype=np.float64).reshape(-1, len(self.COMPONENTS))
+            totals = grid.sum(axis=1)
+            if (grid < 0).any() or (totals <= 0).any():
+                raise ValueError("Weight vectors must be non-negative with a positive sum")
+            return grid / totals[:, None]
+
+        step = max(step or self.DEFAULT_WEIGHT_STEP, self.MIN_WEIGHT_STEP)
+        n = int(round(1 / step))
+        parts = len(self.COMPONENTS)
+        # Stars and bars: bar positions among n + parts - 1 slots
+        bars = np.array(list(combinations(range(n + parts - 1), parts - 1)), dtype=np.int64)
+        edges = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), n + parts - 1)])
+        return (np.diff(edges, axis=1) - 1) / n
+
+    def _threshold_sets(self, thresholds: Optional[Sequence[Sequence[float]]], default: np.ndarray) -> np.ndarray:
+        if thresholds is None:
+            return default[None, :]
+        sets = np.asarray(thresholds, dtype=np.float64).reshape(-1, len(self.TIERS) - 1)
+        if (np.diff(sets, axis=1) <= 0).any():
+            raise ValueError("Threshold sets must be strictly increasing (MEDIUM < ELEVATED < CRITICAL)")
+        return sets
+
+    def _boundaries(self, scores: np.ndarray, cps: np.ndarray, tier: np.ndarray, t0: np.ndarray):
+        """Tier boundaries below and above each CPS, with the weight change to reach them"""
+        centered = scores - scores.mean(axis=1, keepdims=True)
+        norm = np.linalg.norm(centered, axis=1)
+        lows, highs = scores.min(axis=1), scores.max(axis=1)
+
+        sides = ([], [])
+        for i in range(len(scores)):
+            for side, level in ((0, tier[i] - 1), (1, tier[i])):
+                if level < 0 or level >= len(t0):
+                    sides[side].append(None)
+                    continue
+                threshold = t0[level]
+                gap = threshold - cps[i]
+                # Weights on the simplex reach CPS values in [min(s), max(s)] only
+                reachable = norm[i] > 0 and (lows[i] < threshold if side == 0 else highs[i] >= threshold)
+                sides[side].append({
+                    "threshold": float(threshold),
+                    "severity": self.TIERS[level if side == 0 else level + 1],
+                    "cps_gap": round(float(gap), 2),
+                    "weight_distance": round(float(abs(gap) / norm[i]), 4) if reachable else None,
+                    "weight_change": dict(zip(
+                        self.COMPONENTS, (gap * centered[i] / norm[i] ** 2).round(4).tolist()
+                    )) if reachable else None
+                })
+        return sides
+
+    def _scan_grid(
+        self,
+        scores: np.ndarray,
+        tier: np.ndarray,
+        grid: np.ndarray,
+        threshold_sets: np.ndarray,
+        w0: np.ndarray
+    ):
+        """
+        Tier counts, CPS range and the flipping grid point closest to the
+        default weights, over weight chunks so memory stays bounded
+        """
+        n = len(scores)
+        counts = np.zeros((len(self.TIERS), n), dtype=np.int64)
+        cps_min = np.full(n, np.inf)
+        cps_max = np.full(n, -np.inf)
+        best_distance = np.full(n, np.inf)
+        best = np.zeros((3, n), dtype=np.int64)     # weight row, threshold set, tier
+        distance = np.linalg.norm(grid - w0, axis=1)
+        columns = np.arange(n)
+
+        rows_per_chunk = max(1, self.CHUNK_CELLS // max(n, 1))
+        for lo in range(0, len(grid), rows_per_chunk):
+            chunk = grid[lo:lo + rows_per_chunk]
+            cps = chunk @ scores.T                  # (weights, snapshots)
+            np.minimum(cps_min, cps.min(axis=0), out=cps_min)
+            np.maximum(cps_max, cps.max(axis=0), out=cps_max)
+            chunk_distance = distance[lo:lo + rows_per_chunk, None]
+
+            for k, thresholds in enumerate(threshold_sets):
+                tiers = np.searchsorted(thresholds, cps, side="right")
+                for level in range(len(self.TIERS)):
+                    counts[level] += np.count_nonzero(tiers == level, axis=0)
+                flipped = np.where(tiers != tier, chunk_distance, np.inf)
+                row = flipped.argmin(axis=0)
+                closest = flipped[row, columns]
+                better = closest < best_distance
+                best_distance[better] = closest[better]
+                best[0, better] = lo + row[better]
+                best[1, better] = k
+                best[2, better] = tiers[row, columns][better]
+
+        flips = [
+            None if np.isinf(best_distance[i]) else (int(best[0, i]), int(best[1, i]), int(best[2, i]), float(best_distance[i]))
+            for i in range(n)
+        ]
+        return counts, flips, (cps_min, cps_max)
@@ -0,0 +1,351 @@
+"""
+Delivery Planner - Multi-Cycle Vehicle Routing for Supplier Deliveries
+
+Implementation Mandate: Hybrid Logic
+- Formula: Clarke-Wright savings s_ij = d(0, i) + d(0, j) - d(i, j) merge
+  single-stop routes under the vehicle capacity, then 2-opt removes crossing
+  edges within each route. d is straight-line km (equirectangular projection)
+  times ROAD_FACTOR, cached as a matrix over the depot + delivery locations
+
+- Rule: Deliveries are taken in Priority Score order. Each cycle loads up to
+  vehicles x capacity units; if the routes need more vehicles than there are,
+  the routes with the lowest top priority wait for the next cycle. Whatever
+  is left after MAX_CYCLES is reported as beyond the planning horizon
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class DeliveryPlanner:
+    """Batch orders into capacity-limited vehicle routes across delivery cycles"""
+
+    def __init__(self):
+        self.ROAD_FACTOR = 1.3              # Road km per straight-line km
+        self.VEHICLE_CAPACITY = 500         # Units per vehicle when not given
+        self.MAX_CYCLES = 3
+        self.SAVINGS_NEIGHBORS = 24         # Merge candidates per stop (nearest stops)
+        self.TWO_OPT_MAX_MOVES = 500        # Per route
+        self.TWO_OPT_MIN_GAIN_KM = 0.001    # Smaller gains are float32 rounding noise
+        self.MAX_STOPS = 5000               # Per plan, after splitting loads above capacity
+
+        # (location key, (locations + 1)^2 float32 km matrix; row/col 0 = depot)
+        self._matrix_cache: Optional[Tuple] = None
+
+    def plan(
+        self,
+        deliveries: List[Dict],
+        depot: Dict[str, float],
+        vehicles: int,
+        vehicle_capacity: Optional[int] = None,
+        max_cycles: Optional[int] = None,
+        locations: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict:
+        """
+        Plan delivery routes for allocated orders
+
+        Args:
+            deliveries: Orders with allocated_quantity and priority_score (e.g. the
+                        Supplier Agent's fulfilled_orders); lat/lng per order or
+                        via locations
+            depot: {"lat", "lng"} of the supplier warehouse
+            vehicles: Vehicles available per cycle
+            vehicle_capacity: Units one vehicle carries (default VEHICLE_CAPACITY)
+            max_cycles: Delivery cycles to plan ahead (default MAX_CYCLES)
+            locations: requester_id -> {"lat", "lng"} for orders without coordinates
+
+        Returns:
+            Routes per cycle, unscheduled deliveries and distance metrics
+        """
+        capacity = vehicle_capacity or self.VEHICLE_CAPACITY
+        max_cycles = max_cycles or self.MAX_CYCLES
+        if capacity < 1 or max_cycles < 1:
+            raise ValueError("vehicle_capacity and max_cycles must be positive")
+        locations = locations or {}
+
+        unscheduled = []
+        routable = []
+        coordinates = []
+        for delivery in sorted(deliveries, key=lambda d: -d.get('priority_score', 0)):
+            point = self._locate(delivery, locations)
+            if point is None:
+                unscheduled.append({**delivery, 'reason': 'No delivery location'})
+            else:
+                routable.append(delivery)
+                coordinates.append(point)
+
+        stops, overflow = self._split_stops(routable, capacity, self.MAX_STOPS)
+        for index, quantity in overflow.items():
+            unscheduled.append({**routable[index], 'undelivered_quantity': quantity, 'reason': 'Beyond stop limit'})
+        if stops:
+            unique, inverse = np.unique(np.array(coordinates, dtype=np.float64), axis=0, return_inverse=True)
+            matrix, xy = self._distance_matrix(depot, unique)
+            location = inverse.reshape(-1)[[s['delivery'] for s in stops]] + 1   # 0 is the depot
+        else:
+            matrix, xy, location = None, None, np.empty(0, dtype=np.int64)
+
+        cycles = []
+        pool = list(range(len(stops)))
+        for cycle in range(1, max_cycles + 1):
+            if not pool or vehicles <= 0:
+                break
+            routes, pool = self._plan_cycle(pool, stops, location, matrix, xy, vehicles, capacity)
+            cycles.append({
+                'cycle': cycle,
+                'routes': [
+                    self._route_view(v + 1, route, stops, routable, coordinates, location, matrix, capacity)
+                    for v, route in enumerate(routes)
+                ]
+            })
+            cycles[-1]['stop_count'] = sum(len(r['stops']) for r in cycles[-1]['routes'])
+            cycles[-1]['load'] = sum(r['load'] for r in cycles[-1]['routes'])
+            cycles[-1]['distance_km'] = round(sum(r['distance_km'] for r in cycles[-1]['routes']), 2)
+
+        waiting = {}
+        for s in pool:
+            waiting.setdefault(stops[s]['delivery'], 0)
+            waiting[stops[s]['delivery']] += stops[s]['quantity']
+        for index, quantity in waiting.items():
+            unscheduled.append({
+                **routable[index],
+                'undelivered_quantity': quantity,
+                'reason': 'Beyond planning horizon'
+            })
+
+        return {
+            'cycles': cycles,
+            'unscheduled_deliveries': unscheduled,
+            'metrics': self._metrics(cycles, stops, pool, location, matrix, unscheduled)
+        }
+
+    def _locate(self, delivery: Dict, locations: Dict) -> Optional[Tuple[float, float]]:
+        if delivery.get('lat') is not None and delivery.get('lng') is not None:
+            return float(delivery['lat']), float(delivery['lng'])
+        point = locations.get(delivery.get('requester_id'))
+        if point is not None:
+            return float(point['lat']), float(point['lng'])
+        return None
+
+    @staticmethod
+    def _split_stops(deliveries: List[Dict], capacity: int, max_stops: int) -> Tuple[List[Dict], Dict[int, int]]:
+        """
+        One stop per delivery; loads above the vehicle capacity become full-load stops
+
+        Returns:
+            Stops (at most max_stops, in delivery order) and delivery index ->
+            quantity that did not fit in the stop limit
+        """
+        stops = []
+        overflow = {}
+        for index, delivery in enumerate(deliveries):
+            remaining = max(0, int(delivery.get('allocated_quantity', delivery.get('quantity', 0))))
+            taken = min(max(1, -(-remaining // capacity)), max_stops - len(stops))
+            for _ in range(taken):
+                load = min(remaining, capacity)
+                stops.append({
+                    'delivery': index,
+                    'quantity': load,
+                    'priority_score': float(delivery.get('priority_score', 0))
+                })
+                remaining -= load
+            if remaining > 0 or taken == 0:
+                overflow[index] = remaining
+        return stops, overflow
+
+    def _distance_matrix(self, depot: Dict[str, float], unique: np.ndarray):
+        """Road-km matrix over the depot + unique locations, cached while they are unchanged"""
+        latlng = np.vstack([[float(depot['lat']), float(depot['lng'])], unique])
+        key = (latlng.shape[0], hash(latlng.tobytes()))
+        cached = self._matrix_cache
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        xy = self._project(latlng)
+        x, y = xy[:, 0].astype(np.float32), xy[:, 1].astype(np.float32)
+        matrix = np.empty((len(xy), len(xy)), dtype=np.float32)
+        for start in range(0, len(xy), 512):  # Row blocks bound the temporaries
+            dx = x[start:start + 512, None] - x[None, :]
+            dy = y[start:start + 512, None] - y[None, :]
+            block = matrix[start:start + 512]
+            np.multiply(dx, dx, out=block)
+            block += dy * dy
+            np.sqrt(block, out=block)
+            block *= self.ROAD_FACTOR
+
+        self._matrix_cache = (key, matrix, xy)
+        return matrix, xy
+
+    def _plan_cycle(self, pool, stops, location, matrix, xy, vehicles, capacity):
+        """Routes for one cycle, and the stops (still in priority order) left for later"""
+        budget = vehicles * capacity
+        selected, deferred = [], []
+        for s in pool:
+            if stops[s]['quantity'] <= budget:
+                selected.append(s)
+                budget -= stops[s]['quantity']
+            else:
+                deferred.append(s)
+
+        routes = self._savings_routes(selected, stops, location, matrix, xy, capacity)
+        if len(routes) > vehicles:
+            # Bin packing left more routes than vehicles: the most urgent go now
+            routes.sort(key=lambda r: max(stops[s]['priority_score'] for s in r), reverse=True)
+            deferred.extend(s for r in routes[vehicles:] for s in r)
+            routes = routes[:vehicles]
+
+        routes = [self._orient(self._two_opt(route, location, matrix), stops, location, matrix) for route in routes]
+        order = {s: i for i, s in enumerate(pool)}
+        return routes, sorted(deferred, key=order.__getitem__)
+
+    def _savings_routes(self, selected, stops, location, matrix, xy, capacity) -> List[List[int]]:
+        """
+        Parallel Clarke-Wright savings over nearest-neighbor candidate pairs
+
+        Only pairs among each stop's SAVINGS_NEIGHBORS nearest stops are
+        considered, which keeps the pair list O(n k) for thousands of stops.
+        """
+        n = len(selected)
+        if n == 0:
+            return []
+        ids = np.array(selected)
+        loc = location[ids]
+        loads = [stops[s]['quantity'] for s in selected]
+
+        k = min(self.SAVINGS_NEIGHBORS + 1, n)
+        _, neighbors = cKDTree(xy[loc]).query(xy[loc], k=k)
+        neighbors = np.asarray(neighbors).reshape(n, k)
+        a = np.repeat(np.arange(n), k)
+        b = neighbors.ravel()
+        pairs = np.unique(np.column_stack([np.minimum(a, b), np.maximum(a, b)]), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+        depot_km = matrix[0, loc].astype(np.float64)
+        savings = depot_km[pairs[:, 0]] + depot_km[pairs[:, 1]] - matrix[loc[pairs[:, 0]], loc[pairs[:, 1]]]
+        ranked = np.argsort(-savings, kind='stable')
+        ranked = ranked[savings[ranked] > 0]
+
+        route_of = list(range(n))
+        routes = {i: [i] for i in range(n)}
+        route_load = {i: loads[i] for i in range(n)}
+        for i, j in pairs[ranked].tolist():
+            ri, rj = route_of[i], route_of[j]
+            if ri == rj or route_load[ri] + route_load[rj] > capacity:
+                continue
+            first, second = routes[ri], routes[rj]
+            # i and j must both be route ends; join as ... i -> j ...
+            if first[-1] != i and first[0] != i:
+                continue
+            if second[0] != j and second[-1] != j:
+                continue
+            if first[-1] != i:
+                first.reverse()
+            if second[0] != j:
+                second.reverse()
+
+            if len(first) >= len(second):
+                keep, drop = ri, rj
+                first.extend(second)
+            else:
+                keep, drop = rj, ri
+                second[:0] = first
+            for s in routes[drop]:
+                route_of[s] = keep
+            route_load[keep] += route_load.pop(drop)
+            del routes[drop]
+
+        return [[selected[s] for s in route] for route in routes.values()]
+
+    def _two_opt(self, route: List[int], location, matrix) -> List[int]:
+        """Best-improvement 2-opt on depot -> route -> depot, one vectorized delta matrix per move"""
+        if len(route) < 3:
+            return route
+        route = np.array(route)
+        for _ in range(self.TWO_OPT_MAX_MOVES):
+            path = np.concatenate([[0], location[route], [0]])
+            a, b = path[:-1], path[1:]
+            edge = matrix[a, b].astype(np.float64)
+            # Reversing route[i:j] replaces edges (a_i, b_i), (a_j, b_j) with (a_i, a_j), (b_i, b_j)
+            delta = matrix[a[:, None], a[None, :]] + matrix[b[:, None], b[None, :]].astype(np.float64)
+            delta -= edge[:, None] + edge[None, :]
+            delta = np.triu(delta, k=2)
+            i, j = np.unravel_index(np.argmin(delta), delta.shape)
+            if delta[i, j] > -self.TWO_OPT_MIN_GAIN_KM:
+                break
+            route[i:j] = route[i:j][::-1]
+        return route.tolist()
+
+    @staticmethod
+    def _orient(route: List[int], stops, location, matrix) -> List[int]:
+        """Drive the route in the direction that reaches high-priority stops sooner"""
+        if len(route) < 2:
+            return route
+        path = np.concatenate([[0], location[route]])
+        arrival = np.cumsum(matrix[path[:-1], path[1:]])
+        total = arrival[-1] + matrix[path[-1], 0]
+        priority = np.array([stops[s]['priority_score'] for s in route])
+        # Reversed, each stop is reached after total - arrival km
+        if (priority * (total - arrival)).sum() < (priority * arrival).sum():
+            return route[::-1]
+        return route
+
+    def _route_view(self, vehicle, route, stops, routable, coordinates, location, matrix, capacity) -> Dict:
+        path = np.concatenate([[0], location[route], [0]])
+        legs = matrix[path[:-1], path[1:]].astype(np.float64)
+        arrival = np.cumsum(legs)
+        load = sum(stops[s]['quantity'] for s in route)
+
+        return {
+            'vehicle': vehicle,
+            'load': load,
+            'utilization_percent': round(load / capacity * 100, 1),
+            'distance_km': round(float(legs.sum()), 2),
+            'stops': [
+                {
+                    'sequence': n + 1,
+                    'order_id': routable[stops[s]['delivery']].get('order_id'),
+                    'requester_id': routable[stops[s]['delivery']].get('requester_id'),
+                    'medicine': routable[stops[s]['delivery']].get('medicine'),
+                    'urgency': routable[stops[s]['delivery']].get('urgency'),
+                    'quantity': stops[s]['quantity'],
+                    'priority_score': stops[s]['priority_score'],
+                    'lat': coordinates[stops[s]['delivery']][0],
+                    'lng': coordinates[stops[s]['delivery']][1],
+                    'route_km': round(float(arrival[n]), 2)
+                }
+                for n, s in enumerate(route)
+            ]
+        }
+
+    @staticmethod
+    def _metrics(cycles, stops, pool, location, matrix, unscheduled) -> Dict:
+        routes = [r for c in cycles for r in c['routes']]
+        scheduled = len(stops) - len(pool)
+        total_km = sum(r['distance_km'] for r in routes)
+        # Baseline: the old one-order-per-vehicle round trips for the same stops
+        served = np.ones(len(stops), dtype=bool)
+        served[pool] = False
+        direct_km = float(2 * matrix[0, location[served]].astype(np.float64).sum()) if scheduled else 0.0
+
+        return {
+            'cycles_used': len(cycles),
+            'routes': len(routes),
+            'stops_scheduled': scheduled,
+            'deliveries_unscheduled': len(unscheduled),
+            'total_distance_km': round(total_km, 2),
+            'direct_distance_km': round(direct_km, 2),
+            'distance_saved_percent': round((direct_km - total_km) / direct_km * 100, 1) if direct_km > 0 else 0.0,
+            'avg_utilization_percent': round(
+                sum(r['utilization_percent'] for r in routes) / len(routes), 1
+            ) if routes else 0.0
+        }
+
+    @staticmethod
+    def _project(latlng: np.ndarray) -> np.ndarray:
+        """Equirectangular projection to km around the locations' centroid"""
+        lat0, lng0 = latlng.mean(axis=0)
+        x = (latlng[:, 1] - lng0) * 111.32 * math.cos(math.radians(lat0))
+        y = (latlng[:, 0] - lat0) * 110.57
+        return np.column_stack([x, y])
@@ -0,0 +1,523 @@
+"""
+Feature Store - Entity State Held Server-Side, Addressed by ID or Zone
+
+Implementation Mandate: Hybrid Logic
+- Formula: One table per entity type; every numeric feature is a column
+  (rows x 1) or, for per-disease / per-medicine features, a matrix
+  (rows x keys) with a presence mask. Zone aggregates are one bincount per
+  column over the zone codes
+
+- Rule: Tables load from the seed JSON files (backend/data) and take bulk
+  upserts, which merge into the stored state (omitted features and keys
+  keep their last value). Agent endpoints gather rows by entity ID or zone
+  index, so callers send IDs instead of full payloads
+- Rule: Upserts run on the event loop and reads in the threadpool; one lock
+  per store serialises them, and read() gathers ids, zones and records
+  under it so a concurrent removal cannot move rows mid-read
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class _Table:
+    """Columnar rows of one entity type; removal swaps the last row into the hole"""
+
+    def __init__(self, scalar_features: Tuple[str, ...], keyed_features: Tuple[str, ...], capacity: int = 64):
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.zone_rows: Dict[int, set] = {}
+        self.zone_code = np.full(capacity, -1, dtype=np.int32)
+        self.latlng = np.full((capacity, 2), np.nan)
+        self.scalars = {name: np.zeros(capacity, dtype=np.int64) for name in scalar_features}
+        self.key_index: Dict[str, int] = {}     # Disease / medicine -> matrix column
+        self.keys: List[str] = []
+        self.keyed = {name: np.zeros((capacity, 8), dtype=np.int64) for name in keyed_features}
+        self.present = {name: np.zeros((capacity, 8), dtype=bool) for name in keyed_features}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_row(self, entity_id: str) -> int:
+        row = len(self.ids)
+        if row == len(self.zone_code):
+            self._grow_rows(2 * row)
+        self.ids.append(entity_id)
+        self.row_of[entity_id] = row
+        return row
+
+    def key_column(self, key: str) -> int:
+        column = self.key_index.get(key)
+        if column is None:
+            column = len(self.keys)
+            if self.keyed and column == next(iter(self.keyed.values())).shape[1]:
+                self._grow_keys(2 * column)
+            self.key_index[key] = column
+            self.keys.append(key)
+        return column
+
+    def set_zone(self, row: int, code: int):
+        old = self.zone_code[row]
+        if old == code:
+            return
+        if old >= 0:
+            self.zone_rows[old].discard(row)
+        self.zone_code[row] = code
+        if code >= 0:
+            self.zone_rows.setdefault(code, set()).add(row)
+
+    def remove_row(self, entity_id: str):
+        row = self.row_of.pop(entity_id)
+        last = len(self.ids) - 1
+        self.set_zone(row, -1)
+        if row != last:
+            moved = self.ids[last]
+            moved_zone = self.zone_code[last]
+            self.set_zone(last, -1)
+            self.ids[row] = moved
+            self.row_of[moved] = row
+            self.set_zone(row, moved_zone)
+            self.latlng[row] = self.latlng[last]
+            for column in self.scalars.values():
+                column[row] = column[last]
+            for name, matrix in self.keyed.items():
+                matrix[row] = matrix[last]
+                self.present[name][row] = self.present[name][last]
+        self.ids.pop()
+        self.latlng[last] = np.nan
+        for column in self.scalars.values():
+            column[last] = 0
+        for name, matrix in self.keyed.items():
+            matrix[last] = 0
+            self.present[name][last] = False
+
+    def _grow_rows(self, capacity: int):
+        n = len(self.zone_code)
+        self.zone_code = np.concatenate([self.zone_code, np.full(capacity - n, -1, dtype=np.int32)])
+        self.latlng = np.vstack([self.latlng, np.full((capacity - n, 2), np.nan)])
+        for name, column in self.scalars.items():
+            self.scalars[name] = np.concatenate([column, np.zeros(capacity - n, dtype=column.dtype)])
+        for name, matrix in self.keyed.items():
+            self.keyed[name] = np.vstack([matrix, np.zeros((capacity - n, matrix.shape[1]), dtype=matrix.dtype)])
+            mask = self.present[name]
+            self.present[name] = np.vstack([mask, np.zeros((capacity - n, mask.shape[1]), dtype=bool)])
+
+    def _grow_keys(self, width: int):
+        for name, matrix in self.keyed.items():
+            rows, n = matrix.shape
+            self.keyed[name] = np.hstack([matrix, np.zeros((rows, width - n), dtype=matrix.dtype)])
+            self.present[name] = np.hstack([self.present[name], np.zeros((rows, width - n), dtype=bool)])
+
+
+class FeatureStore:
+    """Per-city hospital, lab, pharmacy and supplier features in columnar tables"""
+
+    def __init__(self):
+        self.SCALAR_FEATURES = {
+            'hospital': ('total_beds', 'available_beds', 'icu_total', 'icu_available',
+                         'er_wait_time', 'incoming_patients', 'icu_incoming'),
+            'lab': (),
+            'pharmacy': (),
+            'supplier': ()
+        }
+        self.KEYED_FEATURES = {
+            'hospital': (),
+            'lab': ('current_tests', 'baseline_tests', 'positive_tests', 'test_capacity'),
+            'pharmacy': ('medicine_stocks', 'consumption_rates', 'reorder_levels'),
+            'supplier': ('inventory', 'incoming')
+        }
+        self.SEED_FILES = {
+            'hospital': 'hospitals.json',
+            'lab': 'labs.json',
+            'pharmacy': 'pharmacies.json',
+            'supplier': 'suppliers.json'
+        }
+        self.PLURALS = {
+            'hospital': 'hospitals',
+            'lab': 'labs',
+            'pharmacy': 'pharmacies',
+            'supplier': 'suppliers'
+        }
+        self.SEED_ER_WAIT = 30          # seedDatabase.js starts every ER at 30 min
+
+        self._tables = {
+            entity_type: _Table(self.SCALAR_FEATURES[entity_type], self.KEYED_FEATURES[entity_type])
+            for entity_type in self.SCALAR_FEATURES
+        }
+        self._types: Dict[str, str] = {}        # entity_id -> entity_type
+        self._zones: Dict[str, int] = {}        # zone -> code
+        self._zone_names: List[str] = []
+        self._lock = threading.RLock()
+        self.version = 0
+
+    # ============= WRITES =============
+
+    def upsert(self, entities: Iterable[Dict]) -> Dict:
+        """
+        Insert or merge entities
+
+        Args:
+            entities: [{"entity_id", "entity_type", "zone", "lat", "lng", **features}]
+                      Scalar features are ints; keyed features are {key: int}
+
+        Returns:
+            Created and updated counts
+        """
+        entities = self._validate(entities)
+        with self._lock:
+            return self._upsert(entities)
+
+    def apply(self, entities: Iterable[Dict], remove_ids: Iterable[str]) -> Dict:
+        """
+        Remove then upsert entities as one write
+
+        The upserts are validated before anything is removed, and both run
+        under one lock hold, so a rejected request changes nothing and
+        readers never see the removals without the upserts.
+
+        Returns:
+            Created, updated and removed counts
+        """
+        entities = self._validate(entities)
+        with self._lock:
+            removed = self._remove(remove_ids)
+            return {**self._upsert(entities), 'removed': removed}
+
+    def _validate(self, entities: Iterable[Dict]) -> List[Dict]:
+        """Check the whole batch before any of it is written"""
+        entities = list(entities)
+        for entity in entities:
+            entity_type = entity['entity_type']
+            if entity_type not in self._tables:
+                raise ValueError(f"Unknown entity type '{entity_type}'")
+            allowed = self.SCALAR_FEATURES[entity_type] + self.KEYED_FEATURES[entity_type]
+            for field in entity:
+                if field not in allowed and field not in ('entity_id', 'entity_type', 'zone', 'lat', 'lng'):
+                    raise ValueError(f"'{field}' is not a {entity_type} feature")
+        return entities
+
+    def _upsert(self, entities: List[Dict]) -> Dict:
+        created = updated = 0
+        writes: Dict[Tuple[str, str], Tuple[List, List, List]] = {}
+        for entity in entities:
+            entity_id = entity['entity_id']
+            entity_type = entity['entity_type']
+            table = self._tables[entity_type]
+
+            known_type = self._types.get(entity_id)
+            if known_type is not None and known_type != entity_type:
+                self._flush(writes)     # Removal moves a row; apply buffered writes first
+                self._tables[known_type].remove_row(entity_id)
+                known_type = None
+            if known_type is None:
+                row = table.add_row(entity_id)
+                self._types[entity_id] = entity_type
+                created += 1
+            else:
+                row = table.row_of[entity_id]
+                updated += 1
+
+            for field, value in entity.items():
+                if field in ('entity_id', 'entity_type') or value is None:
+                    continue
+                if field == 'zone':
+                    table.set_zone(row, self._zone_code(value))
+                elif field == 'lat':
+                    table.latlng[row, 0] = value
+                elif field == 'lng':
+                    table.latlng[row, 1] = value
+                else:
+                    rows, columns, values = writes.setdefault((entity_type, field), ([], [], []))
+                    if field in table.scalars:
+                        rows.append(row)
+                        values.append(value)
+                    else:
+                        for key, amount in value.items():
+                            rows.append(row)
+                            columns.append(table.key_column(key))
+                            values.append(amount)
+
+        self._flush(writes)
+        self.version += 1
+        return {'created': created, 'updated': updated, 'entities': len(self._types), 'version': self.version}
+
+    def _flush(self, writes: Dict):
+        """Apply buffered feature writes, one fancy-indexed assignment per column"""
+        for (entity_type, field), (rows, columns, values) in writes.items():
+            table = self._tables[entity_type]
+            if field in table.scalars:
+                table.scalars[field][rows] = values
+            else:
+                table.keyed[field][rows, columns] = values
+                table.present[field][rows, columns] = True
+        writes.clear()
+
+    def remove(self, entity_ids: Iterable[str]) -> Dict:
+        with self._lock:
+            removed = self._remove(entity_ids)
+            return {'removed': removed, 'entities': len(self._types), 'version': self.version}
+
+    def _remove(self, entity_ids: Iterable[str]) -> int:
+        removed = 0
+        for entity_id in entity_ids:
+            entity_type = self._types.pop(entity_id, None)
+            if entity_type is not None:
+                self._tables[entity_type].remove_row(entity_id)
+                removed += 1
+        if removed:
+            self.version += 1
+        return removed
+
+    def load_seed(self, data_dir: str) -> Dict:
+        """
+        Load the seed entities of backend/data, keyed by their email
+
+        Mirrors scripts/seedDatabase.js: total_beds sums every ward, beds and
+        ICU start empty, pharmacy medicines and supplier inventory as given.
+        """
+        entities = []
+        for entity_type, filename in self.SEED_FILES.items():
+            path = os.path.join(data_dir, filename)
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for record in json.load(f):
+                    entity = {
+                        'entity_id': record['email'],
+                        'entity_type': entity_type,
+                        'zone': record.get('zone'),
+                        'lat': (record.get('coordinates') or {}).get('lat'),
+                        'lng': (record.get('coordinates') or {}).get('lng'),
+                        **self._seed_features(entity_type, record)
+                    }
+                    entities.append(entity)
+        return self.upsert(entities)
+
+    def _seed_features(self, entity_type: str, record: Dict) -> Dict:
+        if entity_type == 'hospital':
+            beds = record.get('beds') or {}
+            total = sum(ward.get('total', 0) for ward in beds.values())
+            icu = (beds.get('icu') or {}).get('total', 0)
+            return {
+                'total_beds': total,
+                'available_beds': total,
+                'icu_total': icu,
+                'icu_available': icu,
+                'er_wait_time': self.SEED_ER_WAIT
+            }
+        if entity_type == 'lab':
+            capacity = record.get('testingCapacity') or {}
+            return {'test_capacity': {test: c.get('daily', 0) for test, c in capacity.items()}}
+        if entity_type == 'pharmacy':
+            medicines = record.get('medicines') or {}
+            return {
+                'medicine_stocks': {m: v.get('stock', 0) for m, v in medicines.items()},
+                'consumption_rates': {m: v.get('dailyUsage', 0) for m, v in medicines.items()},
+                'reorder_levels': {m: v.get('reorderLevel', 0) for m, v in medicines.items()}
+            }
+        inventory = record.get('inventory') or {}
+        return {
+            'inventory': {m: v.get('stock', 0) for m, v in inventory.items()},
+            'incoming': {m: v.get('incoming', 0) for m, v in inventory.items()}
+        }
+
+    def _zone_code(self, zone: str) -> int:
+        code = self._zones.get(zone)
+        if code is None:
+            code = self._zones[zone] = len(self._zone_names)
+            self._zone_names.append(zone)
+        return code
+
+    # ============= READS =============
+
+    def read(
+        self,
+        entity_type: str,
+        entity_ids: Optional[List[str]] = None,
+        zone: Optional[str] = None
+    ) -> Tuple[List[str], List[Optional[str]], List[Dict], List[str]]:
+        """
+        Selected rows of one type, read under the store lock
+
+        Returns:
+            (ids, zones, agent kwargs per row, requested IDs not found)
+        """
+        with self._lock:
+            rows, missing = self.select(entity_type, entity_ids, zone)
+            return (
+                self.ids(entity_type, rows),
+                self.zones(entity_type, rows),
+                self.records(entity_type, rows),
+                missing
+            )
+
+    def select(
+        self,
+        entity_type: str,
+        entity_ids: Optional[List[str]] = None,
+        zone: Optional[str] = None
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Rows of one type by ID list and/or zone (all rows when neither is given)
+
+        Returns:
+            (row indices, requested IDs not found for this type)
+        """
+        table = self._tables[entity_type]
+        missing = []
+        if entity_ids is not None:
+            rows = []
+            for entity_id in entity_ids:
+                row = table.row_of.get(entity_id)
+                if row is None:
+                    missing.append(entity_id)
+                else:
+                    rows.append(row)
+            rows = np.array(rows, dtype=np.int64)
+            if zone is not None:
+                rows = rows[table.zone_code[rows] == self._zones.get(zone, -2)]
+        elif zone is not None:
+            rows = np.array(sorted(table.zone_rows.get(self._zones.get(zone, -2), ())), dtype=np.int64)
+        else:
+            rows = np.arange(len(table), dtype=np.int64)
+        return rows, missing
+
+    def records(self, entity_type: str, rows: np.ndarray) -> List[Dict]:
+        """Agent keyword arguments per row (keyed features as {key: value} dicts)"""
+        table = self._tables[entity_type]
+        scalars = {name: column[rows].tolist() for name, column in table.scalars.items()}
+        keyed = {}
+        for name, matrix in table.keyed.items():
+            values = matrix[rows, :len(table.keys)].tolist()
+            mask = table.present[name][rows, :len(table.keys)].tolist()
+            keyed[name] = [
+                {key: value for key, value, has in zip(table.keys, row_values, row_mask) if has}
+                for row_values, row_mask in zip(values, mask)
+            ]
+        return [
+            {
+                **{name: values[i] for name, values in scalars.items()},
+                **{name: values[i] for name, values in keyed.items()}
+            }
+            for i in range(len(rows))
+        ]
+
+    def ids(self, entity_type: str, rows: np.ndarray) -> List[str]:
+        ids = self._tables[entity_type].ids
+        return [ids[row] for row in rows]
+
+    def zones(self, entity_type: str, rows: np.ndarray) -> List[Optional[str]]:
+        codes = self._tables[entity_type].zone_code[rows].tolist()
+        return [self._zone_names[code] if code >= 0 else None for code in codes]
+
+    def get(self, entity_id: str) -> Optional[Dict]:
+        with self._lock:
+            entity_type = self._types.get(entity_id)
+            if entity_type is None:
+                return None
+            table = self._tables[entity_type]
+            row = table.row_of[entity_id]
+            lat, lng = table.latlng[row]
+            zone = table.zone_code[row]
+            return {
+                'entity_id': entity_id,
+                'entity_type': entity_type,
+                'zone': self._zone_names[zone] if zone >= 0 else None,
+                'lat': None if np.isnan(lat) else float(lat),
+                'lng': None if np.isnan(lng) else float(lng),
+                **self.records(entity_type, np.array([row]))[0]
+            }
+
+    def zone_summary(self, zone: Optional[str] = None) -> List[Dict]:
+        """
+        Capacity, testing, stock and supply totals per zone
+
+        Every column is aggregated over all zones at once (bincount on the
+        zone codes); entities without a zone are left out.
+        """
+        with self._lock:
+            return self._zone_summary(zone)
+
+    def _zone_summary(self, zone: Optional[str]) -> List[Dict]:
+        n_zones = len(self._zone_names)
+        summaries = [{'zone': name} for name in self._zone_names]
+
+        for entity_type, table in self._tables.items():
+            n = len(table)
+            codes = table.zone_code[:n]
+            zoned = codes >= 0
+            codes = codes[zoned]
+            counts = np.bincount(codes, minlength=n_zones)
+            scalar_sums = {
+                name: np.bincount(codes, weights=column[:n][zoned], minlength=n_zones)
+                for name, column in table.scalars.items()
+            }
+            n_keys = len(table.keys)
+            cells = (codes[:, None] * n_keys + np.arange(n_keys)).ravel()
+            keyed_sums = {
+                name: np.bincount(
+                    cells, weights=matrix[:n, :n_keys][zoned].ravel(), minlength=n_zones * n_keys
+                ).reshape(n_zones, n_keys)
+                for name, matrix in table.keyed.items()
+            }
+
+            for z, summary in enumerate(summaries):
+                summary[self.PLURALS[entity_type]] = int(counts[z])
+                self._summarize_type(summary, entity_type, z, table.keys, scalar_sums, keyed_sums)
+
+        if zone is not None:
+            return [s for s in summaries if s['zone'] == zone]
+        return summaries
+
+    @staticmethod
+    def _summarize_type(summary, entity_type, z, keys, scalar_sums, keyed_sums):
+        def per_key(name):
+            return {key: int(v) for key, v in zip(keys, keyed_sums[name][z]) if v}
+
+        def percent(used, total):
+            return round(float(used / total * 100), 1) if total > 0 else 0.0
+
+        if entity_type == 'hospital':
+            total, available = scalar_sums['total_beds'][z], scalar_sums['available_beds'][z]
+            icu_total, icu_available = scalar_sums['icu_total'][z], scalar_sums['icu_available'][z]
+            summary.update({
+                'total_beds': int(total),
+                'available_beds': int(available),
+                'bed_occupancy_percent': percent(total - available, total),
+                'icu_total': int(icu_total),
+                'icu_available': int(icu_available),
+                'icu_occupancy_percent': percent(icu_total - icu_available, icu_total),
+                'incoming_patients': int(scalar_sums['incoming_patients'][z])
+            })
+        elif entity_type == 'lab':
+            tests, positives = keyed_sums['current_tests'][z], keyed_sums['positive_tests'][z]
+            summary.update({
+                'tests': per_key('current_tests'),
+                'positive_tests': per_key('positive_tests'),
+                'positive_rate': {
+                    key: round(float(p / t), 3) for key, t, p in zip(keys, tests, positives) if t
+                }
+            })
+        elif entity_type == 'pharmacy':
+            stock, consumption = keyed_sums['medicine_stocks'][z], keyed_sums['consumption_rates'][z]
+            summary.update({
+                'medicine_stock': per_key('medicine_stocks'),
+                'daily_consumption': per_key('consumption_rates'),
+                'days_of_cover': {
+                    key: round(float(s / c), 1) for key, s, c in zip(keys, stock, consumption) if c
+                }
+            })
+        else:
+            summary['supplier_inventory'] = per_key('inventory')
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entities': {entity_type: len(table) for entity_type, table in self._tables.items()},
+                'zones': list(self._zone_names),
+                'version': self.version
+            }
@@ -0,0 +1,271 @@
+"""
+Heatmap Engine - Interpolated Disease-Density Grids
+
+Implementation Mandate: Hybrid Logic
+- Formula: Inverse-distance weighting (IDW) over lab and hospital case counts
+  value(cell) = sum(w_i * cases_i) / sum(w_i),  w_i = 1 / d_i^p
+  using only the MAX_NEIGHBORS nearest entities within NEIGHBOR_RADIUS_KM
+  (KD-tree neighbor cutoff)
+
+- Rule: Grids are cached per disease. When only a few entities change, only
+  the cells within the cutoff radius of their old/new positions are
+  recomputed; otherwise the whole grid is rebuilt
+"""
+
+import base64
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class HeatmapEngine:
+    """Heatmap Engine for per-disease lat/lng density surfaces"""
+    
+    def __init__(self):
+        self.diseases = ['dengue', 'malaria', 'typhoid', 'influenza', 'covid']
+        
+        self.GRID_SIZE = 128            # Cells per side
+        self.TILE_SIZE = 32             # Cells per tile side
+        self.IDW_POWER = 2
+        self.NEIGHBOR_RADIUS_KM = 5.0
+        self.MAX_NEIGHBORS = 16
+        self.MIN_DISTANCE_KM = 0.05     # Avoid infinite weight on top of an entity
+        self.PADDING_DEG = 0.02         # Margin around the entity bounding box
+        self.INCREMENTAL_LIMIT = 0.25   # Rebuild fully above this changed fraction
+        
+        self._entities: Dict[str, Dict] = {}
+        self._ids: List[str] = []
+        self._latlng = np.empty((0, 2))
+        self._xy = np.empty((0, 2))
+        self._values = np.empty((0, len(self.diseases)), dtype=np.float32)
+        self._entity_tree: Optional[cKDTree] = None
+        
+        self._bounds: Optional[Dict[str, float]] = None
+        self._cell_xy = None
+        self._cell_tree: Optional[cKDTree] = None
+        self._grid = None               # (GRID_SIZE, GRID_SIZE, diseases)
+        self.version = 0
+    
+    def upsert_points(self, points: List[Dict]) -> Dict:
+        """
+        Insert or update entity points and refresh the cached grids
+        
+        Args:
+            points: [{"entity_id", "entity_type", "lat", "lng", "cases": {disease: count}}]
+            
+        Returns:
+            Update statistics (changed entities, recomputed cells, full rebuild)
+        """
+        changed_positions = []
+        changed = 0
+        
+        for point in points:
+            entity_id = str(point["entity_id"])
+            cases = point.get("cases") or {}
+            record = {
+                "entity_type": point.get("entity_type", "lab"),
+                "lat": float(point["lat"]),
+                "lng": float(point["lng"]),
+                "cases": [float(cases.get(d, 0)) for d in self.diseases]
+            }
+            previous = self._entities.get(entity_id)
+            if previous == record:
+                continue
+            if previous is not None:
+                changed_positions.append((previous["lat"], previous["lng"]))
+            changed_positions.append((record["lat"], record["lng"]))
+            self._entities[entity_id] = record
+            changed += 1
+        
+        return self._refresh(changed, changed_positions)
+    
+    def remove_points(self, entity_ids: List[str]) -> Dict:
+        """Remove entities from the surface"""
+        changed_positions = []
+        for entity_id in entity_ids:
+            previous = self._entities.pop(str(entity_id), None)
+            if previous is not None:
+                changed_positions.append((previous["lat"], previous["lng"]))
+        return self._refresh(len(changed_positions), changed_positions)
+    
+    def get_grid_info(self, disease: str) -> Optional[Dict]:
+        """Describe the cached grid and tile layout for a disease"""
+        if self._grid is None or disease not in self.diseases:
+            return None
+        
+        tiles_per_side = math.ceil(self.GRID_SIZE / self.TILE_SIZE)
+        return {
+            "disease": disease,
+            "version": self.version,
+            "bounds": self._bounds,
+            "grid_size": self.GRID_SIZE,
+            "tile_size": self.TILE_SIZE,
+            "tile_rows": tiles_per_side,
+            "tile_cols": tiles_per_side,
+            "max_value": round(float(self._grid[..., self.diseases.index(disease)].max()), 3),
+            "entities": len(self._ids)
+        }
+    
+    def get_tile(self, disease: str, row: int, col: int) -> Optional[Dict]:
+        """
+        Return one tile as quantized bytes
+        
+        Values are scaled to 0-255 against the disease-wide maximum so tiles
+        are comparable, and sent as base64. Row 0 is the northern edge.
+        """
+        info = self.get_grid_info(disease)
+        if info is None or not (0 <= row < info["tile_rows"] and 0 <= col < info["tile_cols"]):
+            return None
+        
+        t = self.TILE_SIZE
+        block = self._grid[row * t:(row + 1) * t, col * t:(col + 1) * t, self.diseases.index(disease)]
+        scale = info["max_value"]
+        if scale > 0:
+            quantized = np.rint(np.clip(block / scale, 0, 1) * 255).astype(np.uint8)
+        else:
+            quantized = np.zeros(block.shape, dtype=np.uint8)
+        
+        lat_step, lng_step = self._cell_steps()
+        b = self._bounds
+        return {
+            "disease": disease,
+            "version": self.version,
+            "row": row,
+            "col": col,
+            "shape": list(quantized.shape),
+            "bounds": {
+                "north": b["north"] - row * t * lat_step,
+                "south": b["north"] - (row * t + quantized.shape[0]) * lat_step,
+                "west": b["west"] + col * t * lng_step,
+                "east": b["west"] + (col * t + quantized.shape[1]) * lng_step
+            },
+            "scale": scale,
+            "encoding": "uint8-base64",
+            "data": base64.b64encode(quantized.tobytes()).decode("ascii")
+        }
+    
+    def _refresh(self, changed: int, changed_positions: List) -> Dict:
+        """Rebuild entity index and recompute affected grid cells"""
+        if changed == 0:
+            return {"changed_entities": 0, "recomputed_cells": 0, "full_rebuild": False, "version": self.version}
+        
+        self._rebuild_entity_index()
+        
+        total_cells = self.GRID_SIZE * self.GRID_SIZE
+        needs_full = (
+            self._grid is None
+            or not self._within_bounds()
+            or changed > max(1, len(self._ids)) * self.INCREMENTAL_LIMIT
+        )
+        
+        if needs_full:
+            self._build_grid()
+            recomputed = total_cells
+        else:
+            changed_xy = self._project(np.asarray(changed_positions, dtype=np.float64))
+            hits = self._cell_tree.query_ball_point(changed_xy, r=self.NEIGHBOR_RADIUS_KM)
+            cells = np.unique(np.concatenate([np.asarray(h, dtype=np.intp) for h in hits]))
+            if cells.size:
+                flat = self._grid.reshape(total_cells, -1)
+                flat[cells] = self._interpolate(self._cell_xy[cells])
+            recomputed = int(cells.size)
+        
+        self.version += 1
+        return {
+            "changed_entities": changed,
+            "recomputed_cells": recomputed,
+            "full_rebuild": needs_full,
+            "version": self.version
+        }
+    
+    def _rebuild_entity_index(self):
+        """Pack entity records into arrays and rebuild the KD-tree"""
+        self._ids = list(self._entities.keys())
+        records = [self._entities[i] for i in self._ids]
+        self._latlng = np.array([(r["lat"], r["lng"]) for r in records], dtype=np.float64).reshape(-1, 2)
+        self._values = np.array([r["cases"] for r in records], dtype=np.float32).reshape(-1, len(self.diseases))
+        
+        if self._bounds is not None and len(records):
+            self._xy = self._project(self._latlng)
+            self._entity_tree = cKDTree(self._xy)
+        else:
+            self._entity_tree = None
+    
+    def _within_bounds(self) -> bool:
+        """Check every entity lies inside the current grid bounds"""
+        if not len(self._ids):
+            return True
+        b = self._bounds
+        lat, lng = self._latlng[:, 0], self._latlng[:, 1]
+        return bool(
+            (lat >= b["south"]).all() and (lat <= b["north"]).all()
+            and (lng >= b["west"]).all() and (lng <= b["east"]).all()
+        )
+    
+    def _build_grid(self):
+        """Fit bounds to the entities and interpolate every cell"""
+        n = self.GRID_SIZE
+        if len(self._ids):
+            lat, lng = self._latlng[:, 0], self._latlng[:, 1]
+            self._bounds = {
+                "south": float(lat.min()) - self.PADDING_DEG,
+                "north": float(lat.max()) + self.PADDING_DEG,
+                "west": float(lng.min()) - self.PADDING_DEG,
+                "east": float(lng.max()) + self.PADDING_DEG
+            }
+        elif self._bounds is None:
+            self._bounds = {"south": 0.0, "north": self.PADDING_DEG, "west": 0.0, "east": self.PADDING_DEG}
+        
+        lat_step, lng_step = self._cell_steps()
+        rows = self._bounds["north"] - (np.arange(n) + 0.5) * lat_step
+        cols = self._bounds["west"] + (np.arange(n) + 0.5) * lng_step
+        cell_lat, cell_lng = np.meshgrid(rows, cols, indexing="ij")
+        self._cell_xy = self._project(np.column_stack([cell_lat.ravel(), cell_lng.ravel()]))
+        self._cell_tree = cKDTree(self._cell_xy)
+        
+        self._rebuild_entity_index()  # Re-project against the new origin
+        self._grid = self._interpolate(self._cell_xy).reshape(n, n, len(self.diseases))
+    
+    def _interpolate(self, cell_xy: np.ndarray) -> np.ndarray:
+        """IDW for all diseases at the given cell centers -> (cells, diseases)"""
+        out = np.zeros((len(cell_xy), len(self.diseases)), dtype=np.float32)
+        if self._entity_tree is None or not len(cell_xy):
+            return out
+        
+        k = min(self.MAX_NEIGHBORS, len(self._ids))
+        dist, idx = self._entity_tree.query(
+            cell_xy, k=k, distance_upper_bound=self.NEIGHBOR_RADIUS_KM
+        )
+        dist = dist.reshape(len(cell_xy), k)
+        idx = idx.reshape(len(cell_xy), k)
+        
+        valid = np.isfinite(dist)
+        weights = np.where(
+            valid, 1.0 / np.maximum(dist, self.MIN_DISTANCE_KM) ** self.IDW_POWER, 0.0
+        )
+        neighbor_values = self._values[np.minimum(idx, len(self._ids) - 1)]  # (cells, k, diseases)
+        weight_sum = weights.sum(axis=1)
+        
+        weighted = np.einsum("ck,ckd->cd", weights, neighbor_values)
+        has_neighbors = weight_sum > 0
+        out[has_neighbors] = weighted[has_neighbors] / weight_sum[has_neighbors, None]
+        return out
+    
+    def _cell_steps(self):
+        """Cell height and width in degrees"""
+        b = self._bounds
+        return (
+            (b["north"] - b["south"]) / self.GRID_SIZE,
+            (b["east"] - b["west"]) / self.GRID_SIZE
+        )
+    
+    def _project(self, latlng: np.ndarray) -> np.ndarray:
+        """Equirectangular projection to km around the grid center"""
+        b = self._bounds
+        lat0 = (b["north"] + b["south"]) / 2
+        lng0 = (b["east"] + b["west"]) / 2
+        x = (latlng[:, 1] - lng0) * 111.32 * math.cos(math.radians(lat0))
+        y = (latlng[:, 0] - lat0) * 110.57
+        return np.column_stack([x, y])
@@ -0,0 +1,276 @@
+"""
+Order Book - Durable Pending-Order Queue with Priority Aging
+
+Implementation Mandate: Hybrid Logic
+- Formula: Aged_Priority = Priority_Score + AGING_PER_HOUR * hours_waiting
+  Since every order ages at the same rate, ranking by the fixed key
+  Priority_Score - AGING_PER_HOUR * enqueued_hour gives the same order at any
+  moment, so the in-memory heap never has to be re-keyed as time passes
+
+- Rule: Orders persist in SQLite (WAL) keyed by order_id, so a retried
+  submission is ignored instead of queued twice. Fulfillment cycles walk the
+  heap for the top of the book; delivered orders are marked FULFILLED, partly
+  delivered ones keep their remaining quantity and their place in the queue
+- Rule: Orders without an order_id get a content-hash id that dedupes only
+  against pending orders: on fulfillment the id is suffixed with the row's
+  seq, so an identical later order is queued anew. FULFILLED rows are kept
+  FULFILLED_RETENTION_HOURS (the retry window of client order_ids), then purged
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class OrderBook:
+    """Persistent pending orders with an in-memory aged-priority index"""
+
+    def __init__(self, path: str):
+        self.AGING_PER_HOUR = 5.0       # Priority points gained per hour in the queue
+        self.COMPACT_RATIO = 1          # Rebuild the heap when stale > ratio * live
+        self.COMPACT_MIN_ENTRIES = 1024
+        self.FETCH_CHUNK = 500          # order_ids per SQL IN (...) lookup
+        self.FULFILLED_RETENTION_HOURS = 24  # Fulfilled rows kept for order_id retry dedupe
+        self.PURGE_INTERVAL = 600       # Seconds between purges of expired rows
+
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._cycle_lock = threading.Lock()     # One fulfillment cycle at a time
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Durable at WAL checkpoint granularity
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS orders (
+                seq INTEGER PRIMARY KEY,
+                order_id TEXT NOT NULL UNIQUE,
+                sort_key REAL NOT NULL,
+                priority_score REAL NOT NULL,
+                quantity INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS orders_pending
+                ON orders (sort_key DESC) WHERE status = 'PENDING';
+            CREATE INDEX IF NOT EXISTS orders_fulfilled
+                ON orders (updated_at) WHERE status = 'FULFILLED';
+        """)
+
+        self._pending: Dict[int, float] = {}     # seq -> heap key (-sort_key)
+        self._heap: List[Tuple[float, int]] = []
+        self._purged_at = 0.0
+        self.purged = 0
+        self.recovery_ms = self._recover()
+
+    def _recover(self) -> float:
+        """
+        Rebuild the index from the pending rows
+
+        Only (sort_key, seq) is loaded, straight from the covering partial
+        index; order ids and payloads stay on disk until an order reaches the
+        top. Rows come back in key order, and a sorted list is already a
+        valid heap.
+        """
+        start = time.perf_counter()
+        rows = self._db.execute(
+            "SELECT -sort_key, seq FROM orders WHERE status = 'PENDING' ORDER BY sort_key DESC"
+        ).fetchall()
+        self._heap = rows
+        self._pending = {seq: key for key, seq in rows}
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def submit(self, orders: List[Dict], scores: List[float]) -> Dict:
+        """
+        Queue orders (already validated) with their base Priority Scores
+
+        Args:
+            orders: Validated orders; order_id makes a submission idempotent
+                    (orders without one get a content hash as their id,
+                    which only dedupes against pending orders)
+            scores: Priority Score per order
+
+        Returns:
+            Accepted and duplicate order_ids and the pending count
+        """
+        now = time.time()
+        rows = []
+        for order, score in zip(orders, scores):
+            order_id = order.get('order_id') or self._content_id(order)
+            sort_key = score - self.AGING_PER_HOUR * now / 3600
+            rows.append((order_id, sort_key, score, order['quantity'], now, json.dumps({**order, 'order_id': order_id})))
+
+        with self._lock:
+            accepted = []
+            with self._db:
+                for row in rows:
+                    inserted = self._db.execute(
+                        "INSERT INTO orders (order_id, sort_key, priority_score, quantity, status, "
+                        "enqueued_at, updated_at, payload) VALUES (?, ?, ?, ?, 'PENDING', ?, ?, ?) "
+                        "ON CONFLICT (order_id) DO NOTHING RETURNING seq",
+                        row[:5] + (row[4], row[5])
+                    ).fetchone()
+                    if inserted is not None:
+                        accepted.append((inserted[0], row))
+            for seq, row in accepted:
+                self._pending[seq] = -row[1]
+                heapq.heappush(self._heap, (-row[1], seq))
+
+        accepted_ids = {row[0] for _, row in accepted}
+        return {
+            'accepted': [row[0] for _, row in accepted],
+            'duplicates': [row[0] for row in rows if row[0] not in accepted_ids],
+            'pending': len(self._pending)
+        }
+
+    def top(self, limit: int) -> List[Dict]:
+        """
+        The highest aged-priority pending orders, without removing them
+
+        Returns:
+            Order payloads (remaining quantity) with priority_score (base),
+            aged_priority and hours_waiting
+        """
+        with self._lock:
+            ids = [seq for _, seq in itertools.islice(self._walk(), limit)]
+            rows = {}
+            for start in range(0, len(ids), self.FETCH_CHUNK):
+                chunk = ids[start:start + self.FETCH_CHUNK]
+                rows.update((row[0], row[1:]) for row in self._db.execute(
+                    f"SELECT seq, priority_score, quantity, enqueued_at, payload FROM orders "
+                    f"WHERE seq IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+
+        now = time.time()
+        book = []
+        for seq in ids:
+            score, quantity, enqueued_at, payload = rows[seq]
+            hours = (now - enqueued_at) / 3600
+            book.append({
+                **json.loads(payload),
+                'quantity': quantity,
+                'priority_score': score,
+                'aged_priority': round(score + self.AGING_PER_HOUR * hours, 2),
+                'hours_waiting': round(hours, 2)
+            })
+        return book
+
+    def record_deliveries(self, delivered: Dict[str, int]) -> Dict:
+        """
+        Apply delivered quantities from a fulfillment cycle
+
+        Args:
+            delivered: order_id -> quantity delivered this cycle
+
+        Returns:
+            Fulfilled and still-pending (partly delivered) order counts
+        """
+        now = time.time()
+        fulfilled = 0
+        partial = 0
+        with self._lock:
+            with self._db:
+                for order_id, quantity in delivered.items():
+                    # A fulfilled auto-id is retired (suffixed) so the same content can queue again
+                    updated = self._db.execute(
+                        "UPDATE orders SET quantity = MAX(quantity - ?, 0), updated_at = ?, "
+                        "status = CASE WHEN quantity - ? <= 0 THEN 'FULFILLED' ELSE status END, "
+                        "order_id = CASE WHEN quantity - ? <= 0 AND order_id LIKE 'auto-%' "
+                        "THEN order_id || '#' || seq ELSE order_id END "
+                        "WHERE order_id = ? AND status = 'PENDING' RETURNING seq, quantity",
+                        (quantity, now, quantity, quantity, order_id)
+                    ).fetchone()
+                    if updated is None:
+                        continue
+                    seq, remaining = updated
+                    if remaining <= 0:
+                        del self._pending[seq]   # Heap entry goes stale
+                        fulfilled += 1
+                    else:
+                        partial += 1
+                if now - self._purged_at >= self.PURGE_INTERVAL:
+                    self._purge(now)
+            self._maybe_compact()
+        return {'fulfilled': fulfilled, 'partial': partial, 'pending': len(self._pending)}
+
+    def _purge(self, now: float):
+        """Delete FULFILLED rows past the retention window (caller holds the lock)"""
+        cutoff = now - self.FULFILLED_RETENTION_HOURS * 3600
+        self.purged += self._db.execute(
+            "DELETE FROM orders WHERE status = 'FULFILLED' AND updated_at < ?", (cutoff,)
+        ).rowcount
+        self._purged_at = now
+
+    def run_cycle(self, limit: int, fulfill: Callable[[List[Dict]], Dict[str, int]]) -> Dict:
+        """
+        Pull the top of the book, fulfill it and record what was delivered
+
+        Cycles are serialized so two of them never hand out the same orders.
+
+        Args:
+            limit: Orders pulled from the top of the book
+            fulfill: Allocates the pulled orders; returns order_id -> delivered quantity
+
+        Returns:
+            The pulled orders and the delivery outcome
+        """
+        with self._cycle_lock:
+            orders = self.top(limit)
+            delivered = fulfill(orders)
+            return {'orders': orders, **self.record_deliveries(delivered)}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            oldest = self._db.execute(
+                "SELECT MIN(enqueued_at) FROM orders WHERE status = 'PENDING'"
+            ).fetchone()[0]
+            return {
+                'pending': len(self._pending),
+                'heap_entries': len(self._heap),
+                'oldest_hours_waiting': round((time.time() - oldest) / 3600, 2) if oldest else 0.0,
+                'aging_per_hour': self.AGING_PER_HOUR,
+                'purged': self.purged,
+                'recovery_ms': self.recovery_ms
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _walk(self) -> Iterator[Tuple[float, int]]:
+        """Live heap entries in priority order, best-first over the heap array"""
+        heap = self._heap
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            item, i = heapq.heappop(frontier)
+            if self._pending.get(item[1]) == item[0]:
+                yield item
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _maybe_compact(self):
+        """Drop stale heap entries once they outnumber the live ones"""
+        if len(self._heap) < self.COMPACT_MIN_ENTRIES:
+            return
+        if len(self._heap) <= (self.COMPACT_RATIO + 1) * len(self._pending):
+            return
+        self._heap = [(key, seq) for seq, key in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    @staticmethod
+    def _content_id(order: Dict) -> str:
+        """Deterministic id for orders submitted without one, so retries still dedupe"""
+        body = json.dumps(order, sort_keys=True, separators=(",", ":"), default=str)
+        return "auto-" + hashlib.blake2b(body.encode(), digest_size=12).hexdigest()
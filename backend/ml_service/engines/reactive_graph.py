@@ -0,0 +1,485 @@
+"""
+Reactive Graph - Incremental Cross-Agent Recomputation
+
+Implementation Mandate: Hybrid Logic
+- Formula: Agent results are nodes of a dependency graph, each memoized
+  with the tick it was computed at and the tick its value last changed:
+      entity inputs -> Lab / Hospital / Pharmacy result per entity
+      lab results -> zone outbreak alerts -> Pharmacy results (2x multiplier)
+      hospital results -> zone strain -> zone SURGE orders <- pharmacy results
+      zone SURGE orders + zone supplier inventory -> Supplier Agent (zone supply)
+      entity inputs + lab / hospital results -> zone CPS inputs -> City CPS
+  Dependencies are recorded while a node computes, so they follow zone
+  membership as entities are added, moved or removed
+
+- Rule: A changed input marks every node downstream of it dirty. At the
+  end of a tick dirty nodes are pulled: a node whose dependencies all came
+  back with unchanged values is kept without recomputing (early cutoff),
+  otherwise it is recomputed. Only the affected part of the city is
+  recomputed, instead of every agent for every entity
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from agents.city_agent import CityAgent
+from agents.hospital_agent import HospitalAgent
+from agents.lab_agent import LabAgent
+from agents.pharmacy_agent import PharmacyAgent
+from agents.supplier_agent import SupplierAgent
+
+Key = Tuple[Hashable, ...]
+
+
+class _Node:
+    """Memoized value with its dependency edges (inputs have no compute)"""
+
+    __slots__ = ('compute', 'value', 'deps', 'dependents', 'dirty', 'computed_at', 'changed_at')
+
+    def __init__(self, compute: Optional[Callable] = None, value: Any = None):
+        self.compute = compute
+        self.value = value
+        self.deps: Tuple[Key, ...] = ()
+        self.dependents: set = set()
+        self.dirty = compute is not None
+        self.computed_at = -1
+        self.changed_at = 0
+
+
+class ReactiveGraph:
+    """Per-city agent results, recomputed only downstream of changed inputs"""
+
+    def __init__(self):
+        self.ENTITY_TYPES = ('hospital', 'lab', 'pharmacy', 'supplier')
+        self.KEYED_FIELDS = ('current_tests', 'baseline_tests', 'positive_tests', 'test_capacity',
+                             'medicine_stocks', 'consumption_rates', 'reorder_levels', 'inventory', 'incoming')
+        self.VEHICLES_PER_SUPPLIER = 4      # Daily deliveries per supplier in a zone's pool
+        self.HISTORY_TICKS = 100            # Per-tick statistics kept
+        self.RISK_LEVELS = ['LOW', 'MEDIUM', 'ELEVATED', 'HIGH', 'CRITICAL']
+
+        self._lab = LabAgent()
+        self._hospital = HospitalAgent()
+        self._pharmacy = PharmacyAgent()
+        self._supplier = SupplierAgent()
+        self._city = CityAgent()
+
+        self._lock = threading.Lock()
+        self._nodes: Dict[Key, _Node] = {}
+        self._dirty: set = set()
+        self._types: Dict[str, str] = {}                # entity_id -> entity_type
+        self._members: Dict[Key, set] = {}              # (zone, entity_type) -> entity IDs
+        self._computing: List[List[Key]] = []           # Dependencies recorded per computing node
+        self._changed: List[Key] = []                   # Derived nodes whose value changed this tick
+        self.tick = 0
+        self._tick_counts: Dict[str, int] = {}
+        self.history: deque = deque(maxlen=self.HISTORY_TICKS)
+        self.totals = {"ticks": 0, "recomputed": 0, "reused": 0, "full_recompute": 0}
+
+        self._derived = 0                               # Nodes a full recompute would evaluate
+        self._computes = {
+            'lab': self._lab_result,
+            'hospital': self._hospital_result,
+            'pharmacy': self._pharmacy_result,
+            'alerts': self._zone_alerts,
+            'strain': self._zone_strain,
+            'city_strain': self._city_strain,
+            'orders': self._zone_orders,
+            'supply': self._zone_supply,
+            'zone': self._zone_inputs,
+            'city': self._city_crisis
+        }
+        self._define(('city_strain',))
+        self._define(('city',))
+
+    # ============= TICKS =============
+
+    def update(self, entities: Iterable[Dict] = (), remove_ids: Iterable[str] = (), replace: bool = False) -> Dict:
+        """
+        Apply one tick of input changes and bring every result up to date
+
+        Args:
+            entities: [{"entity_id", "entity_type", "zone", **features}] merged
+                      into the stored inputs like feature store upserts
+                      (omitted fields and keys keep their value)
+            remove_ids: Entities to drop
+            replace: entities are complete records (e.g. read back from the
+                     feature store): stored fields they omit are cleared
+
+        Returns:
+            City crisis, the results whose value changed this tick and the
+            tick's recompute statistics
+        """
+        with self._lock:
+            start = time.perf_counter()
+            self.tick += 1
+            self._tick_counts = {"inputs_changed": 0, "marked_dirty": 0, "recomputed": 0, "reused": 0}
+            self._changed = []
+            removed = [entity_id for entity_id in remove_ids if entity_id in self._types]
+            for entity_id in removed:
+                self._remove(entity_id)
+            for entity in entities:
+                self._upsert(entity, replace)
+
+            for key in list(self._dirty):
+                self._pull(key)
+            changed = self._changed_results()
+            for entity_id in removed:
+                # Inputs of entities gone for good, once nothing reads them
+                node = self._nodes.get(('entity', entity_id))
+                if entity_id not in self._types and node is not None and not node.dependents:
+                    del self._nodes[('entity', entity_id)]
+
+            derived = self._derived
+            stats = {
+                "tick": self.tick,
+                **self._tick_counts,
+                "full_recompute": derived,
+                "recompute_share": round(self._tick_counts["recomputed"] / derived, 4) if derived else 0.0,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+            self.history.append(stats)
+            self.totals["ticks"] += 1
+            self.totals["recomputed"] += self._tick_counts["recomputed"]
+            self.totals["reused"] += self._tick_counts["reused"]
+            self.totals["full_recompute"] += derived
+            return {"city": self._nodes[('city',)].value, "changed": changed, "stats": stats}
+
+    def sync(self, entities: List[Dict]) -> Dict:
+        """One tick that makes the inputs exactly these entities (complete records)"""
+        with self._lock:
+            listed = {entity['entity_id'] for entity in entities}
+            stale = [entity_id for entity_id in self._types if entity_id not in listed]
+        return self.update(entities, remove_ids=stale, replace=True)
+
+    def results(self, entity_ids: Optional[List[str]] = None) -> Dict:
+        """Current results of the given entities (default all), their zones and the city"""
+        with self._lock:
+            ids = self._types if entity_ids is None else [i for i in entity_ids if i in self._types]
+            entities = {
+                entity_type: {
+                    entity_id: self._nodes[(entity_type, entity_id)].value
+                    for entity_id in ids if self._types[entity_id] == entity_type
+                }
+                for entity_type in ('lab', 'hospital', 'pharmacy')
+            }
+            zones = {zone for zone, _ in self._members}
+            return {
+                **entities,
+                "supply": {zone: self._nodes[('supply', zone)].value for zone in zones if ('supply', zone) in self._nodes},
+                "city": self._nodes[('city',)].value,
+                "unknown_ids": [] if entity_ids is None else [i for i in entity_ids if i not in self._types],
+                "tick": self.tick
+            }
+
+    def _upsert(self, entity: Dict, replace: bool):
+        entity_id, entity_type = entity['entity_id'], entity['entity_type']
+        if entity_type not in self.ENTITY_TYPES:
+            raise ValueError(f"Unknown entity type '{entity_type}'")
+        known_type = self._types.get(entity_id)
+        if known_type is not None and known_type != entity_type:
+            self._remove(entity_id)
+            known_type = None
+
+        stored = self._nodes[('entity', entity_id)].value if known_type else None
+        if replace or stored is None:
+            record = {}
+        else:
+            record = {k: dict(v) if isinstance(v, dict) else v for k, v in stored.items()}
+        for field, value in entity.items():
+            if value is None:
+                continue
+            if field in self.KEYED_FIELDS and not replace and isinstance(record.get(field), dict):
+                record[field].update(value)
+            else:
+                record[field] = dict(value) if isinstance(value, dict) else value
+        if replace and stored is not None and 'zone' not in record:
+            record['zone'] = None
+
+        if known_type is None:
+            self._types[entity_id] = entity_type
+            self._set(('entity', entity_id), record)
+            self._join(entity_id, entity_type, record.get('zone'))
+            if entity_type != 'supplier':
+                self._define((entity_type, entity_id))
+        else:
+            if record.get('zone') != stored.get('zone'):
+                self._leave(entity_id, entity_type, stored.get('zone'))
+                self._join(entity_id, entity_type, record.get('zone'))
+            self._set(('entity', entity_id), record)
+
+    def _remove(self, entity_id: str):
+        entity_type = self._types.pop(entity_id, None)
+        if entity_type is None:
+            return
+        self._leave(entity_id, entity_type, self._nodes[('entity', entity_id)].value.get('zone'))
+        self._set(('entity', entity_id), None)
+        self._drop((entity_type, entity_id))
+
+    def _join(self, entity_id: str, entity_type: str, zone: Optional[str]):
+        members = self._members.setdefault((zone, entity_type), set())
+        members.add(entity_id)
+        self._set(('members', zone, entity_type), tuple(sorted(members)))
+        if ('zone', zone) not in self._nodes:
+            for kind in ('alerts', 'strain', 'orders', 'supply', 'zone'):
+                self._define((kind, zone))
+            self._set(('zones',), tuple(sorted({z for z, _ in self._members}, key=self._zone_order)))
+
+    def _leave(self, entity_id: str, entity_type: str, zone: Optional[str]):
+        members = self._members[(zone, entity_type)]
+        members.discard(entity_id)
+        self._set(('members', zone, entity_type), tuple(sorted(members)))
+        if not members:
+            del self._members[(zone, entity_type)]
+        if not any(z == zone for z, _ in self._members):
+            for kind in ('alerts', 'strain', 'orders', 'supply', 'zone'):
+                self._drop((kind, zone))
+            self._set(('zones',), tuple(sorted({z for z, _ in self._members}, key=self._zone_order)))
+
+    @staticmethod
+    def _zone_order(zone: Optional[str]):
+        return (zone is None, zone or '')
+
+    # ============= GRAPH CORE =============
+
+    def _define(self, key: Key):
+        self._nodes[key] = _Node(self._computes[key[0]])
+        self._dirty.add(key)
+        self._derived += 1
+
+    def _set(self, key: Key, value: Any):
+        """Write an input; a changed value marks everything downstream dirty"""
+        node = self._nodes.get(key)
+        if node is None:
+            self._nodes[key] = node = _Node(value=value)
+        elif node.value == value:
+            return
+        node.value = value
+        node.changed_at = self.tick
+        self._tick_counts["inputs_changed"] += 1
+        stack = list(node.dependents)
+        while stack:
+            dependent_key = stack.pop()
+            dependent = self._nodes[dependent_key]
+            if not dependent.dirty:
+                dependent.dirty = True
+                self._dirty.add(dependent_key)
+                self._tick_counts["marked_dirty"] += 1
+                stack.extend(dependent.dependents)
+
+    def _drop(self, key: Key):
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return
+        self._derived -= 1
+        for dep in node.deps:
+            if dep in self._nodes:
+                self._nodes[dep].dependents.discard(key)
+        for dependent in node.dependents:
+            if dependent in self._nodes:
+                self._nodes[dependent].dirty = True
+                self._dirty.add(dependent)
+        self._dirty.discard(key)
+
+    def _get(self, key: Key) -> Any:
+        """Value of a node, read inside a compute (records the dependency)"""
+        if key not in self._nodes:
+            self._nodes[key] = _Node()      # Placeholder input, holds the edge until set
+        self._computing[-1].append(key)
+        return self._pull(key)
+
+    def _pull(self, key: Key) -> Any:
+        node = self._nodes.get(key)
+        if node is None:
+            return None
+        if not node.dirty:
+            return node.value
+        self._dirty.discard(key)
+        node.dirty = False
+        if node.computed_at >= 0 and all(dep in self._nodes for dep in node.deps):
+            for dep in node.deps:
+                self._pull(dep)
+            if all(self._nodes[dep].changed_at <= node.computed_at for dep in node.deps):
+                node.computed_at = self.tick
+                self._tick_counts["reused"] += 1
+                return node.value
+
+        self._computing.append([])
+        try:
+            value = node.compute(key, self._get)
+        finally:
+            deps = tuple(dict.fromkeys(self._computing.pop()))
+        for dep in set(node.deps) - set(deps):
+            if dep in self._nodes:
+                self._nodes[dep].dependents.discard(key)
+        for dep in deps:
+            self._nodes[dep].dependents.add(key)
+        node.deps = deps
+        if node.computed_at < 0 or value != node.value:
+            node.value = value
+            node.changed_at = self.tick
+            self._changed.append(key)
+        node.computed_at = self.tick
+        self._tick_counts["recomputed"] += 1
+        return node.value
+
+    def _changed_results(self) -> Dict:
+        changed: Dict[str, Dict] = {"lab": {}, "hospital": {}, "pharmacy": {}, "supply": {}}
+        for key in self._changed:
+            if key[0] in changed and key in self._nodes:
+                changed[key[0]][key[1]] = self._nodes[key].value
+        return changed
+
+    # ============= AGENT NODES =============
+
+    def _members_of(self, get: Callable, zone: Optional[str], entity_type: str) -> Tuple[str, ...]:
+        return get(('members', zone, entity_type)) or ()
+
+    def _lab_result(self, key: Key, get: Callable) -> List[dict]:
+        lab = get(('entity', key[1]))
+        return self._lab.predict_outbreak(
+            current_tests=lab.get('current_tests') or {},
+            baseline_tests=lab.get('baseline_tests') or {},
+            positive_tests=lab.get('positive_tests') or {}
+        )
+
+    def _hospital_result(self, key: Key, get: Callable) -> Dict:
+        hospital = get(('entity', key[1]))
+        total_beds = hospital.get('total_beds') or 0
+        icu_total = hospital.get('icu_total') or 0
+        return self._hospital.calculate_hospital_strain(
+            total_beds=total_beds,
+            available_beds=hospital.get('available_beds', total_beds),
+            icu_total=icu_total,
+            icu_available=hospital.get('icu_available', icu_total),
+            er_wait_time=hospital.get('er_wait_time') or 0,
+            incoming_patients=hospital.get('incoming_patients') or 0
+        )
+
+    def _pharmacy_result(self, key: Key, get: Callable) -> Dict:
+        pharmacy = get(('entity', key[1]))
+        return self._pharmacy.classify_medicine_demand(
+            medicine_stocks=pharmacy.get('medicine_stocks') or {},
+            consumption_rates=pharmacy.get('consumption_rates') or {},
+            outbreak_alerts=list(get(('alerts', pharmacy.get('zone'))) or ())
+        )
+
+    def _zone_alerts(self, key: Key, get: Callable) -> Tuple[str, ...]:
+        """Diseases any lab of the zone triggers an outbreak for"""
+        return tuple(sorted({
+            prediction['disease']
+            for lab_id in self._members_of(get, key[1], 'lab')
+            for prediction in get(('lab', lab_id))
+            if prediction['trigger_outbreak']
+        }))
+
+    def _zone_strain(self, key: Key, get: Callable) -> Dict:
+        hsi = [get(('hospital', hospital_id))['hsi_score'] for hospital_id in self._members_of(get, key[1], 'hospital')]
+        return {"hsi_sum": sum(hsi), "hospitals": len(hsi)}
+
+    def _city_strain(self, key: Key, get: Callable) -> float:
+        """Mean HSI over the city, the requester strain of zones without hospitals"""
+        strain = [get(('strain', zone)) for zone in get(('zones',)) or ()]
+        hospitals = sum(s['hospitals'] for s in strain)
+        return sum(s['hsi_sum'] for s in strain) / hospitals if hospitals else 50.0
+
+    def _zone_orders(self, key: Key, get: Callable) -> List[Dict]:
+        """SURGE pre-emptive orders of the zone's pharmacies, with the zone's strain"""
+        strain = get(('strain', key[1]))
+        requester_strain = (
+            strain['hsi_sum'] / strain['hospitals'] if strain['hospitals'] else get(('city_strain',))
+        )
+        return [
+            {
+                'order_id': f"{pharmacy_id}:{order['medicine']}",
+                'requester_id': pharmacy_id,
+                'medicine': order['medicine'],
+                'quantity': int(order['order_quantity']),
+                'urgency': order['urgency'],
+                'requester_strain': float(requester_strain)
+            }
+            for pharmacy_id in self._members_of(get, key[1], 'pharmacy')
+            for order in get(('pharmacy', pharmacy_id))['preemptive_orders']
+        ]
+
+    def _zone_supply(self, key: Key, get: Callable) -> Optional[Dict]:
+        """Supplier Agent over the zone's orders and its suppliers' pooled inventory"""
+        orders = get(('orders', key[1]))
+        suppliers = self._members_of(get, key[1], 'supplier')
+        if not orders:
+            return None
+        inventory: Dict[str, int] = {}
+        for supplier_id in suppliers:
+            for medicine, quantity in (get(('entity', supplier_id)).get('inventory') or {}).items():
+                inventory[medicine] = inventory.get(medicine, 0) + quantity
+        return self._supplier.prioritize_orders(
+            [dict(order) for order in orders],
+            inventory,
+            delivery_capacity=self.VEHICLES_PER_SUPPLIER * len(suppliers)
+        )
+
+    def _zone_inputs(self, key: Key, get: Callable) -> Dict:
+        """The zone's share of the City Agent inputs"""
+        zone = key[1]
+        positives: Dict[str, int] = {}
+        risk = 'LOW'
+        for lab_id in self._members_of(get, zone, 'lab'):
+            for disease, count in (get(('entity', lab_id)).get('positive_tests') or {}).items():
+                positives[disease] = positives.get(disease, 0) + count
+            for prediction in get(('lab', lab_id)):
+                risk = max(risk, prediction['risk_level'], key=self.RISK_LEVELS.index)
+        total_beds = occupied = 0
+        for hospital_id in self._members_of(get, zone, 'hospital'):
+            hospital = get(('entity', hospital_id))
+            total = hospital.get('total_beds') or 0
+            total_beds += total
+            occupied += total - min(hospital.get('available_beds', total), total)
+            risk = max(risk, get(('hospital', hospital_id))['strain_level'], key=self.RISK_LEVELS.index)
+        stock: Dict[str, int] = {}
+        for pharmacy_id in self._members_of(get, zone, 'pharmacy'):
+            for medicine, units in (get(('entity', pharmacy_id)).get('medicine_stocks') or {}).items():
+                stock[medicine] = stock.get(medicine, 0) + units
+        return {"positives": positives, "total_beds": total_beds, "occupied_beds": occupied,
+                "medicine_stock": stock, "risk": risk}
+
+    def _city_crisis(self, key: Key, get: Callable) -> Dict:
+        disease_stats: Dict[str, int] = {}
+        medicine_stock: Dict[str, int] = {}
+        zone_risks: Dict[str, str] = {}
+        total_beds = occupied = 0
+        for zone in get(('zones',)) or ():
+            inputs = get(('zone', zone))
+            for disease, count in inputs['positives'].items():
+                disease_stats[disease] = disease_stats.get(disease, 0) + count
+            for medicine, units in inputs['medicine_stock'].items():
+                medicine_stock[medicine] = medicine_stock.get(medicine, 0) + units
+            total_beds += inputs['total_beds']
+            occupied += inputs['occupied_beds']
+            if zone is not None:
+                zone_risks[zone] = inputs['risk']
+        return self._city.predict_crisis(
+            disease_stats=disease_stats,
+            hospital_capacity={
+                'utilization_percent': occupied / total_beds * 100 if total_beds else 0.0,
+                'total_beds': total_beds,
+                'available_beds': total_beds - occupied
+            },
+            medicine_stock=medicine_stock,
+            zone_risks=zone_risks
+        )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            full = self.totals["full_recompute"]
+            return {
+                "entities": len(self._types),
+                "zones": len({zone for zone, _ in self._members}),
+                "nodes": len(self._nodes),
+                "derived_nodes": self._derived,
+                "totals": {
+                    **self.totals,
+                    "recompute_share": round(self.totals["recomputed"] / full, 4) if full else 0.0
+                },
+                "recent_ticks": list(self.history)
+            }
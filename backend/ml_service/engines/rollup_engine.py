@@ -0,0 +1,239 @@
+"""
+Rollup Engine - Multi-Resolution Metric History (1 min / 1 h / 1 day)
+
+Implementation Mandate: Hybrid Logic
+- Formula: A point (t, v) of a series falls in bucket b = (t + offset) // width
+  of every tier, stored at ring slot b % slots. A slot holds the bucket it
+  belongs to plus min, max, sum, count and last:
+      slot reset when b > stored bucket, then
+      min = min(min, v), max = max(max, v), sum += v, count += 1, mean = sum / count
+  Points older than a tier's ring are dropped from that tier only
+
+- Rule: Series are (entity, metric) rows of one (series, slots) array per
+  field and tier, so a batch of points folds into all tiers with a few
+  vectorized scatter ops. A range query reads only the slots of the
+  buckets it asks for, picking the finest tier that still covers the range
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class RollupEngine:
+    """Min / max / mean / last per entity metric over minute, hour and day tiers"""
+
+    def __init__(self, capacity: int = 64):
+        # name -> (bucket seconds, ring slots)
+        self.TIERS = {
+            '1m': (60, 360),            # 6 hours of minutes
+            '1h': (3600, 720),          # 30 days of hours
+            '1d': (86400, 400)          # ~13 months of days
+        }
+        self.UTC_OFFSET_HOURS = 5.5     # Bucket boundaries in local (IST) time
+        self.DEFAULT_RANGE = 3600       # Query window when start is omitted (seconds)
+        self.MAX_POINTS = 1000          # Auto resolution: finest tier within this many points
+
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._metrics: Dict[str, List[str]] = {}    # entity_id -> metrics
+        self.points = 0
+
+        self._stamp, self._min, self._max, self._sum, self._count, self._last, self._last_at = (
+            {}, {}, {}, {}, {}, {}, {}
+        )
+        for tier, (_, slots) in self.TIERS.items():
+            self._stamp[tier] = np.full((capacity, slots), -1, dtype=np.int32)   # Bucket held by the slot
+            self._min[tier] = np.zeros((capacity, slots), dtype=np.float32)
+            self._max[tier] = np.zeros((capacity, slots), dtype=np.float32)
+            self._sum[tier] = np.zeros((capacity, slots), dtype=np.float64)      # A day of float32 adds drifts
+            self._count[tier] = np.zeros((capacity, slots), dtype=np.int32)
+            self._last[tier] = np.zeros((capacity, slots), dtype=np.float32)
+            self._last_at[tier] = np.zeros((capacity, slots), dtype=np.int32)   # Seconds into the bucket
+
+    # ============= WRITES =============
+
+    def record(self, points: Iterable[Tuple]) -> Dict:
+        """
+        Fold a batch of points into every tier
+
+        Args:
+            points: (entity_id, metric, value) or (entity_id, metric, value,
+                    timestamp) with timestamp in epoch seconds (default now)
+
+        Returns:
+            Points recorded and series count
+        """
+        now = time.time()
+        keys, values, timestamps = [], [], []
+        for point in points:
+            value = point[2]
+            if value is None:
+                continue
+            keys.append((point[0], point[1]))
+            values.append(float(value))
+            timestamps.append(float(point[3]) if len(point) > 3 and point[3] is not None else now)
+        if not keys:
+            return {"recorded": 0, "series": len(self._keys)}
+
+        with self._lock:
+            rows = np.array([self._row(key) for key in keys], dtype=np.int64)
+            values = np.asarray(values)
+            local = np.asarray(timestamps) + self.UTC_OFFSET_HOURS * 3600
+            for tier in self.TIERS:
+                self._fold(tier, rows, values, local)
+            self.points += len(keys)
+            return {"recorded": len(keys), "series": len(self._keys)}
+
+    def _fold(self, tier: str, rows: np.ndarray, values: np.ndarray, local: np.ndarray):
+        width, slots = self.TIERS[tier]
+        bucket = np.floor(local / width).astype(np.int32)
+        slot = bucket % slots
+        offset = (local - bucket.astype(np.int64) * width).astype(np.int32)
+        stamp = self._stamp[tier]
+
+        # Newest bucket per cell wins the slot; cells that moved on start empty
+        before = stamp[rows, slot]
+        np.maximum.at(stamp, (rows, slot), bucket)
+        after = stamp[rows, slot]
+        reset = after > before
+        r, s = rows[reset], slot[reset]
+        self._min[tier][r, s] = np.inf
+        self._max[tier][r, s] = -np.inf
+        self._sum[tier][r, s] = 0.0
+        self._count[tier][r, s] = 0
+        self._last_at[tier][r, s] = -1
+
+        keep = bucket == after
+        r, s, v, off = rows[keep], slot[keep], values[keep], offset[keep]
+        np.minimum.at(self._min[tier], (r, s), v)
+        np.maximum.at(self._max[tier], (r, s), v)
+        np.add.at(self._sum[tier], (r, s), v)
+        np.add.at(self._count[tier], (r, s), 1)
+
+        # Last: the latest point per cell (batch order breaks ties), if not older than the stored one
+        order = np.lexsort((np.arange(len(r)), off))
+        cell = (r * slots + s.astype(np.int64))[order]
+        _, latest = np.unique(cell[::-1], return_index=True)
+        latest = order[len(order) - 1 - latest]
+        r, s, v, off = r[latest], s[latest], v[latest], off[latest]
+        newer = off >= self._last_at[tier][r, s]
+        self._last[tier][r[newer], s[newer]] = v[newer]
+        self._last_at[tier][r[newer], s[newer]] = off[newer]
+
+    def _row(self, key: Tuple[str, str]) -> int:
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._metrics.setdefault(key[0], []).append(key[1])
+            if row >= len(next(iter(self._stamp.values()))):
+                self._grow()
+        return row
+
+    def _grow(self):
+        """Double the series capacity of every tier array"""
+        for field in (self._stamp, self._min, self._max, self._sum, self._count, self._last, self._last_at):
+            for tier, column in field.items():
+                grown = np.full((len(column) * 2, column.shape[1]), -1 if field is self._stamp else 0, dtype=column.dtype)
+                grown[:len(column)] = column
+                field[tier] = grown
+
+    # ============= QUERIES =============
+
+    def query(
+        self,
+        entity_id: str,
+        metric: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Rolled-up points of one series over [start, end]
+
+        Args:
+            start, end: Epoch seconds (default the last DEFAULT_RANGE seconds)
+            resolution: '1m', '1h' or '1d'; default the finest tier that
+                        covers start and returns at most MAX_POINTS buckets
+
+        Returns:
+            Non-empty buckets in time order with min, max, mean, last and
+            count, or None for an unknown series
+        """
+        end = time.time() if end is None else float(end)
+        start = end - self.DEFAULT_RANGE if start is None else float(start)
+        if start > end:
+            raise ValueError("start must not be after end")
+        if resolution is not None and resolution not in self.TIERS:
+            raise ValueError(f"resolution must be one of {list(self.TIERS)}")
+
+        with self._lock:
+            row = self._rows.get((entity_id, metric))
+            if row is None:
+                return None
+            tier = resolution or self._resolution(start, end)
+            width, slots = self.TIERS[tier]
+            offset = self.UTC_OFFSET_HOURS * 3600
+            first = int((start + offset) // width)
+            last = int((end + offset) // width)
+            first = max(first, last - slots + 1)    # Older buckets are no longer in the ring
+
+            buckets = np.arange(first, last + 1, dtype=np.int32)
+            cells = buckets % slots
+            live = self._stamp[tier][row, cells] == buckets
+            buckets, cells = buckets[live], cells[live]
+            count = self._count[tier][row, cells]
+            columns = {
+                "timestamp": (buckets.astype(np.int64) * width - offset).tolist(),
+                "min": self._min[tier][row, cells].round(4).tolist(),
+                "max": self._max[tier][row, cells].round(4).tolist(),
+                "mean": (self._sum[tier][row, cells].astype(np.float64) / count).round(4).tolist(),
+                "last": self._last[tier][row, cells].round(4).tolist(),
+                "count": count.tolist()
+            }
+
+        return {
+            "entity_id": entity_id,
+            "metric": metric,
+            "resolution": tier,
+            "bucket_seconds": width,
+            "start": start,
+            "end": end,
+            "points": [dict(zip(columns, values)) for values in zip(*columns.values())]
+        }
+
+    def _resolution(self, start: float, end: float) -> str:
+        """Finest tier whose ring reaches back to start within MAX_POINTS buckets"""
+        now = time.time()
+        for tier, (width, slots) in self.TIERS.items():
+            if now - start <= width * slots and (end - start) / width <= self.MAX_POINTS:
+                return tier
+        return next(reversed(self.TIERS))
+
+    def series(self, entity_id: Optional[str] = None) -> Dict[str, List[str]]:
+        """Recorded metrics per entity"""
+        with self._lock:
+            if entity_id is not None:
+                return {entity_id: list(self._metrics.get(entity_id, []))}
+            return {e: list(metrics) for e, metrics in self._metrics.items()}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "series": len(self._keys),
+                "entities": len(self._metrics),
+                "points": self.points,
+                "tiers": {
+                    tier: {"bucket_seconds": width, "slots": slots, "retention_seconds": width * slots}
+                    for tier, (width, slots) in self.TIERS.items()
+                },
+                "memory_mb": round(sum(
+                    column.nbytes
+                    for field in (self._stamp, self._min, self._max, self._sum, self._count, self._last, self._last_at)
+                    for column in field.values()
+                ) / 2 ** 20, 1)
+            }
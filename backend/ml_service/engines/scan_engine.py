@@ -0,0 +1,279 @@
+"""
+Scan Engine - Space-Time Cluster Detection Across Labs
+
+Implementation Mandate: Hybrid Logic
+- Formula: Kulldorff space-time scan statistic (discrete Poisson model, tests
+  as the population at risk). For every cylinder z = (k nearest labs around a
+  center lab) x (last w days):
+      E_z = C * N_z / N
+      LLR_z = c_z log(c_z / E_z) + (C - c_z) log((C - c_z) / (C - E_z)),  c_z > E_z
+  where c = positive tests, N = tests, C / N are city totals over the window
+
+- Rule: The cylinder with the highest LLR is the most likely cluster; its
+  p-value is its rank among the maximum LLRs of Monte Carlo replicates
+  (positives redistributed over (lab, day) cells in proportion to tests).
+  Clusters with p < ALPHA trigger an outbreak alert even when no single lab
+  crosses the per-lab rule
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.special import xlogy
+
+
+class ScanEngine:
+    """Prospective space-time scan over lab coordinates and recent days"""
+
+    def __init__(self):
+        self.MAX_NEIGHBORS = 32             # Labs per circle (k nearest, incl. center)
+        self.MAX_RADIUS_KM = 10.0
+        self.MAX_WINDOW_DAYS = 14           # Cylinders end on the latest day
+        self.MAX_POPULATION_FRACTION = 0.5  # Kulldorff's cap on circle size
+        self.N_REPLICATES = 99
+        self.MAX_REPLICATES = 999           # Each replicate re-scans every cylinder
+        self.ALPHA = 0.05
+        self.MAX_CLUSTERS = 5
+        self.WORKERS = min(4, os.cpu_count() or 1)
+
+        # (coordinates key, (labs, K) neighbor indices -1 padded, (labs, K) km)
+        self._neighbor_cache: Optional[Tuple] = None
+
+    def scan(
+        self,
+        labs: List[Dict],
+        n_replicates: Optional[int] = None,
+        max_neighbors: Optional[int] = None,
+        max_window_days: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """
+        Find space-time clusters of positive tests
+
+        Args:
+            labs: [{"lab_id", "lat", "lng", "tests": [daily...], "positives": [daily...]}]
+                  with series aligned so the last element is the latest day
+            n_replicates: Monte Carlo replicates (default N_REPLICATES, at most MAX_REPLICATES)
+            max_neighbors: Largest circle, in labs (default MAX_NEIGHBORS)
+            max_window_days: Longest time window scanned (default MAX_WINDOW_DAYS)
+            seed: Random seed for reproducible p-values
+
+        Returns:
+            Most likely cluster plus secondary non-overlapping clusters with p-values
+        """
+        n_replicates = self.N_REPLICATES if n_replicates is None else n_replicates
+        if not 1 <= n_replicates <= self.MAX_REPLICATES:
+            raise ValueError(f"n_replicates must be between 1 and {self.MAX_REPLICATES}")
+        tests, positives = self._to_arrays(labs, max_window_days or self.MAX_WINDOW_DAYS)
+        total_tests = int(tests.sum())
+        total_positives = int(positives.sum())
+        result = {
+            "clusters": [],
+            "significant_clusters": 0,
+            "labs_scanned": len(labs),
+            "days_scanned": tests.shape[1],
+            "replicates": 0,
+            "total_positives": total_positives,
+            "total_tests": total_tests
+        }
+        if total_positives == 0:
+            return result
+
+        neighbors, distances = self._neighbor_lists(labs, max_neighbors or self.MAX_NEIGHBORS)
+        model = self._null_model(tests, neighbors, total_positives)
+
+        best_llr, best_k, best_w = self._best_cylinders(positives, model)
+        null_max = self._monte_carlo(tests, model, n_replicates, seed)
+
+        result["clusters"] = self._clusters(
+            labs, tests, positives, neighbors, distances,
+            best_llr, best_k, best_w, null_max
+        )
+        result["significant_clusters"] = sum(1 for c in result["clusters"] if c["significant"])
+        result["replicates"] = n_replicates
+        return result
+
+    def _to_arrays(self, labs: List[Dict], max_days: int):
+        """(labs, days) integer tests/positives, right-aligned on the latest day"""
+        days = min(max_days, max((len(lab.get("tests") or []) for lab in labs), default=0))
+        tests = np.zeros((len(labs), days), dtype=np.int64)
+        positives = np.zeros((len(labs), days), dtype=np.int64)
+        if days == 0:
+            return tests, positives
+        for i, lab in enumerate(labs):
+            t = (lab.get("tests") or [])[-days:]
+            p = (lab.get("positives") or [])[-days:]
+            if t:
+                tests[i, days - len(t):] = t
+            if p:
+                positives[i, days - len(p):] = p
+        # Positives can never exceed tests in the model
+        return tests, np.minimum(positives, tests)
+
+    def _neighbor_lists(self, labs: List[Dict], max_neighbors: int):
+        """k-nearest neighbor lists per lab, cached while coordinates are unchanged"""
+        latlng = np.array([[float(lab["lat"]), float(lab["lng"])] for lab in labs])
+        key = (len(labs), max_neighbors, hash(latlng.tobytes()))
+        cached = self._neighbor_cache
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        xy = self._project(latlng)
+        k = min(max_neighbors, len(labs))
+        distances, neighbors = cKDTree(xy).query(xy, k=k, distance_upper_bound=self.MAX_RADIUS_KM)
+        distances = np.asarray(distances).reshape(len(labs), k)
+        neighbors = np.asarray(neighbors).reshape(len(labs), k)
+        neighbors[~np.isfinite(distances)] = -1
+
+        self._neighbor_cache = (key, neighbors, distances)
+        return neighbors, distances
+
+    @staticmethod
+    def _window_sums(values: np.ndarray) -> np.ndarray:
+        """(labs + 1, W): each lab's total over the last w days; extra zero row for padding"""
+        recent = np.cumsum(values[:, ::-1], axis=1)
+        return np.vstack([recent, np.zeros((1, recent.shape[1]), dtype=recent.dtype)])
+
+    def _null_model(self, tests: np.ndarray, neighbors: np.ndarray, total_cases: int) -> Dict:
+        """
+        Everything about the cylinders that does not depend on the case counts
+
+        With integer cases c and E fixed by the tests, the LLR splits into
+            xlogx(c) + xlogx(C - c)  -  C log(C - E)  -  c (log E - log(C - E))
+        so the first term is a lookup table over 0..C and the rest is
+        precomputed once per scan, shared by the observed data and every
+        replicate. Arrays are laid out (K, labs, W): the k-th slice adds the
+        k-th nearest neighbor to every circle.
+        """
+        window_tests = self._window_sums(tests)
+        total_population = float(tests.sum())
+        neighbors_by_rank = np.ascontiguousarray(neighbors.T)   # -1 -> zero padding row
+
+        population = np.cumsum(window_tests[neighbors_by_rank], axis=0, dtype=np.float64)
+        expected = total_cases * population / total_population
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_rest = np.log(total_cases - expected)
+            slope = np.log(expected) - log_rest
+        offset = total_cases * log_rest
+
+        # Circles past the radius or population cap can never be "elevated"
+        valid = (
+            (neighbors_by_rank >= 0)[:, :, None]
+            & (population > 0)
+            & (population <= self.MAX_POPULATION_FRACTION * total_population)
+        )
+        expected[~valid] = np.inf
+
+        counts = np.arange(total_cases + 1, dtype=np.float64)
+        return {
+            "neighbors_by_rank": neighbors_by_rank,
+            "total_cases": total_cases,
+            "probabilities": (tests / total_population).ravel(),
+            "expected": expected,
+            "slope": slope,
+            "offset": offset,
+            "table": xlogy(counts, counts) + xlogy(total_cases - counts, total_cases - counts)
+        }
+
+    def _slices(self, cases: np.ndarray, model: Dict) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (k, LLR of every cylinder with k + 1 labs), one (labs, W) slice at a time
+
+        Cumulative sums along neighbor rank are built incrementally, so each
+        slice stays cache-sized; cylinders with c <= E score 0.
+        """
+        window_cases = self._window_sums(cases)
+        circle = np.zeros((window_cases.shape[0] - 1, window_cases.shape[1]), dtype=np.int64)
+        llr = np.empty(circle.shape)
+        term = np.empty(circle.shape)
+        not_elevated = np.empty(circle.shape, dtype=bool)
+
+        with np.errstate(invalid="ignore"):
+            for k, ranked in enumerate(model["neighbors_by_rank"]):
+                np.add(circle, window_cases[ranked], out=circle)
+                np.take(model["table"], circle, out=llr)
+                np.multiply(circle, model["slope"][k], out=term)
+                llr -= term
+                llr -= model["offset"][k]
+                np.less_equal(circle, model["expected"][k], out=not_elevated)
+                np.copyto(llr, 0.0, where=not_elevated)
+                yield k, llr
+
+    def _best_cylinders(self, positives: np.ndarray, model: Dict):
+        """Highest-LLR cylinder per center lab: (llr, k, w) arrays of length labs"""
+        n_labs = positives.shape[0]
+        rows = np.arange(n_labs)
+        best_llr = np.zeros(n_labs)
+        best_k = np.zeros(n_labs, dtype=np.int64)
+        best_w = np.zeros(n_labs, dtype=np.int64)
+
+        for k, llr in self._slices(positives, model):
+            w = llr.argmax(axis=1)
+            score = llr[rows, w]
+            better = score > best_llr
+            best_llr[better] = score[better]
+            best_k[better] = k
+            best_w[better] = w[better]
+        return best_llr, best_k, best_w
+
+    def _monte_carlo(self, tests: np.ndarray, model: Dict, n_replicates: int, seed: Optional[int]):
+        """Maximum LLR of each null replicate, computed across worker threads"""
+        streams = np.random.SeedSequence(seed).spawn(n_replicates)
+
+        def replicate(stream):
+            rng = np.random.default_rng(stream)
+            cases = rng.multinomial(model["total_cases"], model["probabilities"]).reshape(tests.shape)
+            return max(llr.max() for _, llr in self._slices(cases, model))
+
+        # numpy releases the GIL inside the array ops
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            return np.fromiter(pool.map(replicate, streams), dtype=np.float64, count=n_replicates)
+
+    def _clusters(self, labs, tests, positives, neighbors, distances,
+                  best_llr, best_k, best_w, null_max) -> List[Dict]:
+        """Most likely cluster, then the best cylinders sharing no lab with earlier ones"""
+        total_cases = positives.sum()
+        total_population = tests.sum()
+        clusters = []
+        used = np.zeros(len(labs), dtype=bool)
+
+        for center in np.argsort(-best_llr, kind="stable"):
+            score = best_llr[center]
+            if len(clusters) >= self.MAX_CLUSTERS or score <= 0:
+                break
+            k, w = best_k[center], best_w[center]
+            members = neighbors[center, :k + 1]
+            if used[members].any():
+                continue
+            used[members] = True
+
+            observed = positives[members, -(w + 1):].sum()
+            expected = total_cases * tests[members, -(w + 1):].sum() / total_population
+            p_value = (1 + int((null_max >= score).sum())) / (len(null_max) + 1)
+            clusters.append({
+                "center_lab_id": labs[center].get("lab_id", str(center)),
+                "lab_ids": [labs[m].get("lab_id", str(m)) for m in members],
+                "radius_km": round(float(distances[center, k]), 2),
+                "window_days": int(w + 1),
+                "observed_positives": int(observed),
+                "expected_positives": round(float(expected), 2),
+                "relative_risk": round(float(
+                    (observed / expected) / ((total_cases - observed) / (total_cases - expected))
+                ), 2) if total_cases > observed else None,
+                "log_likelihood_ratio": round(float(score), 3),
+                "p_value": round(p_value, 4),
+                "significant": p_value < self.ALPHA
+            })
+        return clusters
+
+    @staticmethod
+    def _project(latlng: np.ndarray) -> np.ndarray:
+        """Equirectangular projection to km around the labs' centroid"""
+        lat0, lng0 = latlng.mean(axis=0)
+        x = (latlng[:, 1] - lng0) * 111.32 * math.cos(math.radians(lat0))
+        y = (latlng[:, 0] - lat0) * 110.57
+        return np.column_stack([x, y])
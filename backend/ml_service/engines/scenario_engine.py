@@ -0,0 +1,542 @@
+"""
+Scenario Engine - Parallel What-If Runs of the Agent Chain
+
+Implementation Mandate: Hybrid Logic
+- Formula: Every day each variant steps its own copy of the city through
+  the agents:
+      Lab:      test demand(t+1) = Lab Agent Q_future,
+                positives = min(demand, test capacity) * positive rate
+      Hospital: extra(t) = extra(t-1) * (1 - 1 / AVG_STAY_DAYS) + admissions,
+                admissions = excess positives * HOSPITALIZATION_RATE;
+                ER wait scales with 1 / free-bed share; HSI from the Hospital Agent
+      Pharmacy: stock -= daily usage + excess positives * UNITS_PER_CASE
+                (medicines of the disease); SURGE orders from the Pharmacy Agent
+      Supplier: orders prioritized by the Supplier Agent against the pooled
+                supplier inventory, delivered the next day
+      City:     CPS from positives, utilization, pooled stock and zone risks
+  Excess positives are those above the unperturbed snapshot, whose
+  occupancy and usage already carry its own cases
+
+- Rule: The base snapshot always runs unperturbed next to the variants
+  (outbreak size, bed loss, supplier outage); variants run in parallel
+  across a process pool and are compared against it
+"""
+
+import copy
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Dict, List, Optional
+
+from agents.city_agent import CityAgent
+from agents.hospital_agent import HospitalAgent
+from agents.lab_agent import LabAgent
+from agents.pharmacy_agent import PharmacyAgent
+from agents.supplier_agent import SupplierAgent
+
+
+class ScenarioEngine:
+    """Multi-day what-if runs of Lab -> Hospital/Pharmacy -> Supplier -> City"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.HOSPITALIZATION_RATE = {
+            'dengue': 0.30,
+            'malaria': 0.25,
+            'typhoid': 0.20,
+            'covid': 0.15,
+            'influenza': 0.05
+        }
+        self.ICU_SHARE = 0.10               # Admissions needing an ICU bed
+        self.AVG_STAY_DAYS = 5.0            # Discharge rate 1 / AVG_STAY_DAYS per day
+        self.MIN_FREE_SHARE = 0.05          # Floor of the free-bed share in the ER wait factor
+        self.UNITS_PER_CASE = 10            # Medicine units per excess positive per day
+        self.SEED_POSITIVE_RATE = 0.25      # Positive share of the tests behind seeded cases
+        self.VEHICLES_PER_SUPPLIER = 4      # Daily deliveries per supplier
+        self.BASE_NAME = "base"
+        self.MAX_DAYS = 60
+        self.MAX_WORKERS = max_workers or min(4, os.cpu_count() or 1)
+        self.RISK_LEVELS = ['LOW', 'MEDIUM', 'ELEVATED', 'HIGH', 'CRITICAL']
+
+        # Outbreak medicines: the Pharmacy Agent's map plus the seed data's names
+        self.DISEASE_MEDICINES = {
+            'dengue': ['dengueMed', 'paracetamol'],
+            'malaria': ['chloroquine'],
+            'typhoid': ['ceftriaxone'],
+            'covid': ['paracetamol', 'oxygenCylinders'],
+            'influenza': ['oseltamivir', 'paracetamol']
+        }
+
+        self._lab = LabAgent()
+        self._hospital = HospitalAgent()
+        self._pharmacy = PharmacyAgent()
+        self._supplier = SupplierAgent()
+        self._city = CityAgent()
+        for disease, medicines in self._pharmacy.DISEASE_MEDICINE_MAP.items():
+            self.DISEASE_MEDICINES[disease] = sorted(set(self.DISEASE_MEDICINES.get(disease, []) + medicines))
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.runs = 0
+        self.variants_run = 0
+        self.pool_runs = 0
+
+    # ============= RUNS =============
+
+    def run(self, entities: List[Dict], variants: List[Dict], days: int = 14) -> Dict:
+        """
+        Run the base snapshot and every variant over the horizon
+
+        Args:
+            entities: Base snapshot in feature store shape
+                      [{"entity_id", "entity_type", "zone", **features}]
+            variants: [{"name", "outbreak": {"disease", "multiplier", "seed_positives", "zones"},
+                        "bed_loss": {"fraction", "zones", "hospital_ids"},
+                        "supplier_outage": {"fraction", "zones", "supplier_ids"}}]
+            days: Horizon in days (up to MAX_DAYS)
+
+        Returns:
+            Daily CPS / HSI / stockout trajectories per variant, summaries
+            and their deltas against the base run
+        """
+        days = max(1, min(int(days), self.MAX_DAYS))
+        names = [self.BASE_NAME] + [variant['name'] for variant in variants]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Variant names must be unique and not '{self.BASE_NAME}'")
+
+        base = self._snapshot(entities)
+        tasks = [{'name': self.BASE_NAME}] + list(variants)
+        start = time.perf_counter()
+        results, workers = self._run_tasks(base, tasks, days)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.runs += 1
+        self.variants_run += len(tasks)
+        base_summary = results[0]['summary']
+        for result in results[1:]:
+            result['vs_base'] = {
+                key: round(result['summary'][key] - base_summary[key], 2)
+                for key in ('peak_cps', 'max_hsi', 'max_stockouts', 'unmet_units', 'total_positives')
+            }
+
+        return {
+            "days": days,
+            "variants": results,
+            "trajectories": {
+                metric: {result['name']: [day[metric] for day in result['daily']] for result in results}
+                for metric in ('cps', 'mean_hsi', 'max_hsi', 'stockouts')
+            },
+            "execution": {
+                "workers": workers,
+                "mode": "process_pool" if workers > 1 else "in_process",
+                "elapsed_ms": round(elapsed_ms, 1)
+            }
+        }
+
+    def _run_tasks(self, base: Dict, tasks: List[Dict], days: int):
+        """Fan variants out to the process pool (in-process when there is one worker)"""
+        workers = min(self.MAX_WORKERS, len(tasks))
+        if workers > 1:
+            try:
+                results = list(self._executor().map(_simulate_variant, repeat(base), tasks, repeat(days)))
+                self.pool_runs += 1
+                return results, workers
+            except BrokenProcessPool:
+                with self._pool_lock:
+                    self._pool = None   # Recreated on the next run; this one falls back
+        return [self.simulate(base, task, days) for task in tasks], 1
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """Lazily started pool, reused across runs (spawned, like the shard workers)"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # ============= SNAPSHOT AND PERTURBATIONS =============
+
+    def _snapshot(self, entities: List[Dict]) -> Dict:
+        """Per-type state lists with every field the simulation reads filled in"""
+        city = {'lab': [], 'hospital': [], 'pharmacy': [], 'supplier': []}
+        for entity in entities:
+            entity_type = entity['entity_type']
+            state = {'id': entity['entity_id'], 'zone': entity.get('zone')}
+            if entity_type == 'lab':
+                state.update({
+                    'current_tests': dict(entity.get('current_tests') or {}),
+                    'baseline_tests': dict(entity.get('baseline_tests') or {}),
+                    'positive_tests': dict(entity.get('positive_tests') or {}),
+                    'test_capacity': dict(entity.get('test_capacity') or {})
+                })
+            elif entity_type == 'hospital':
+                total = entity.get('total_beds') or 0
+                icu_total = entity.get('icu_total') or 0
+                available = min(entity.get('available_beds', total) or 0, total)
+                icu_available = min(entity.get('icu_available', icu_total) or 0, icu_total)
+                state.update({
+                    'total_beds': total,
+                    'icu_total': icu_total,
+                    'occupied': float(total - available),
+                    'icu_occupied': float(icu_total - icu_available),
+                    'extra': 0.0,
+                    'icu_extra': 0.0,
+                    'er_wait_base': entity.get('er_wait_time') or 0,
+                    'free_share_base': available / total if total else 1.0
+                })
+            elif entity_type == 'pharmacy':
+                state.update({
+                    'stocks': dict(entity.get('medicine_stocks') or {}),
+                    'usage': dict(entity.get('consumption_rates') or {})
+                })
+            else:
+                state.update({
+                    'inventory': dict(entity.get('inventory') or {}),
+                    'vehicles': self.VEHICLES_PER_SUPPLIER
+                })
+            city[entity_type].append(state)
+        return city
+
+    def _perturb(self, city: Dict, variant: Dict) -> Dict:
+        outbreak = variant.get('outbreak')
+        if outbreak:
+            disease = outbreak['disease'].lower()
+            multiplier = outbreak.get('multiplier')
+            multiplier = 1.0 if multiplier is None else multiplier
+            labs = [lab for lab in city['lab'] if self._selected(lab, outbreak.get('zones'))]
+            seeded = (outbreak.get('seed_positives') or 0) / len(labs) if labs else 0
+            for lab in labs:
+                positives = lab['positive_tests'].get(disease, 0) * multiplier + seeded
+                tests = lab['current_tests'].get(disease, 0) * multiplier + seeded / self.SEED_POSITIVE_RATE
+                lab['positive_tests'][disease] = int(round(positives))
+                lab['current_tests'][disease] = max(int(round(tests)), int(round(positives)))
+
+        bed_loss = variant.get('bed_loss')
+        if bed_loss:
+            kept = 1 - bed_loss['fraction']
+            for hospital in city['hospital']:
+                if self._selected(hospital, bed_loss.get('zones'), bed_loss.get('hospital_ids')):
+                    # Patients stay; beds they no longer fit in become overflow
+                    hospital['total_beds'] = int(round(hospital['total_beds'] * kept))
+                    hospital['icu_total'] = int(round(hospital['icu_total'] * kept))
+
+        outage = variant.get('supplier_outage')
+        if outage:
+            kept = 1 - (1.0 if outage.get('fraction') is None else outage['fraction'])
+            for supplier in city['supplier']:
+                if self._selected(supplier, outage.get('zones'), outage.get('supplier_ids')):
+                    supplier['inventory'] = {m: int(q * kept) for m, q in supplier['inventory'].items()}
+                    supplier['vehicles'] = int(round(supplier['vehicles'] * kept))
+        return city
+
+    @staticmethod
+    def _selected(entity: Dict, zones: Optional[List[str]], ids: Optional[List[str]] = None) -> bool:
+        """No zone/ID filter selects every entity"""
+        if zones is None and ids is None:
+            return True
+        return (zones is not None and entity['zone'] in zones) or (ids is not None and entity['id'] in ids)
+
+    # ============= SIMULATION =============
+
+    def simulate(self, base: Dict, variant: Dict, days: int) -> Dict:
+        """One variant over the horizon; day 0 is the (perturbed) snapshot"""
+        reference = self._zone_positives(base['lab'])
+        city = self._perturb(copy.deepcopy(base), variant)
+        labs, hospitals, pharmacies = city['lab'], city['hospital'], city['pharmacy']
+        rates = [
+            {d: min(lab['positive_tests'].get(d, 0) / tests, 1.0) for d, tests in lab['current_tests'].items() if tests > 0}
+            for lab in labs
+        ]
+        warehouse: Dict[str, int] = {}
+        names: Dict[str, str] = {}      # Supplier Agent lower-cases medicine names
+        for supplier in city['supplier']:
+            for medicine, quantity in supplier['inventory'].items():
+                warehouse[medicine.lower()] = warehouse.get(medicine.lower(), 0) + quantity
+                names.setdefault(medicine.lower(), medicine)
+        vehicles = sum(supplier['vehicles'] for supplier in city['supplier'])
+
+        daily = []
+        in_transit: List[Dict] = []     # Fulfilled yesterday, stocked today
+        pending: List[Dict] = []        # Orders retried until fulfilled
+        outstanding = set()             # (pharmacy, medicine) with an open order
+        for day in range(days + 1):
+            excess = self._excess(self._zone_positives(labs), reference)
+            unmet = 0
+            if day:
+                for delivery in in_transit:
+                    stocks = pharmacies[delivery['pharmacy']]['stocks']
+                    medicine = delivery['pharmacy_medicine']
+                    stocks[medicine] = stocks.get(medicine, 0) + delivery['allocated_quantity']
+                    outstanding.discard((delivery['pharmacy'], medicine))
+                self._admit(hospitals, excess)
+                unmet = self._consume(pharmacies, excess)
+
+            predictions = self._lab.predict_outbreak_batch([
+                {k: lab[k] for k in ('current_tests', 'baseline_tests', 'positive_tests')} for lab in labs
+            ])
+            strain = self._hospital.calculate_hospital_strain_batch([self._hospital_inputs(h) for h in hospitals])
+            zone_outbreaks: Dict[Optional[str], set] = {}
+            zone_risks: Dict[str, str] = {}
+            for lab, lab_predictions in zip(labs, predictions):
+                for prediction in lab_predictions:
+                    if prediction['trigger_outbreak']:
+                        zone_outbreaks.setdefault(lab['zone'], set()).add(prediction['disease'])
+                    self._raise_risk(zone_risks, lab['zone'], prediction['risk_level'])
+            zone_strain: Dict[Optional[str], List[float]] = {}
+            for hospital, result in zip(hospitals, strain):
+                self._raise_risk(zone_risks, hospital['zone'], result['strain_level'])
+                zone_strain.setdefault(hospital['zone'], []).append(result['hsi_score'])
+
+            demand = self._pharmacy.classify_medicine_demand_batch([
+                {
+                    'medicine_stocks': pharmacy['stocks'],
+                    'consumption_rates': pharmacy['today'] if day else pharmacy['usage'],
+                    'outbreak_alerts': sorted(zone_outbreaks.get(pharmacy['zone'], ()))
+                }
+                for pharmacy in pharmacies
+            ])
+
+            fulfilled = []
+            if day < days:
+                hsi_values = [result['hsi_score'] for result in strain]
+                city_hsi = sum(hsi_values) / len(hsi_values) if hsi_values else 50.0
+                for index, (pharmacy, result) in enumerate(zip(pharmacies, demand)):
+                    zone_hsi = zone_strain.get(pharmacy['zone'])
+                    for order in result['preemptive_orders']:
+                        key = (index, order['medicine'])
+                        if key in outstanding:
+                            continue
+                        outstanding.add(key)
+                        pending.append({
+                            'order_id': f"{pharmacy['id']}:{order['medicine']}:{day}",
+                            'requester_id': pharmacy['id'],
+                            'medicine': order['medicine'],
+                            'quantity': int(order['order_quantity']),
+                            'urgency': order['urgency'],
+                            'requester_strain': float(sum(zone_hsi) / len(zone_hsi) if zone_hsi else city_hsi),
+                            'pharmacy': index,
+                            'pharmacy_medicine': order['medicine']
+                        })
+                if pending:
+                    outcome = self._supplier.prioritize_orders(pending, warehouse, delivery_capacity=vehicles)
+                    fulfilled = outcome['fulfilled_orders']
+                    for delivery in fulfilled:
+                        warehouse[delivery['medicine']] = warehouse.get(delivery['medicine'], 0) - delivery['allocated_quantity']
+                    delivered = {delivery['order_id'] for delivery in fulfilled}
+                    pending = [order for order in pending if order['order_id'] not in delivered]
+                in_transit = fulfilled
+
+            daily.append(self._day_record(
+                day, city, labs, hospitals, strain, zone_risks, unmet, len(fulfilled), len(pending)
+            ))
+            if day < days:
+                self._advance_labs(labs, predictions, rates)
+
+        return {
+            "name": variant['name'],
+            "perturbations": {k: variant[k] for k in ('outbreak', 'bed_loss', 'supplier_outage') if variant.get(k)},
+            "daily": daily,
+            "summary": self._summarize(daily)
+        }
+
+    def _zone_positives(self, labs: List[Dict]) -> Dict[Optional[str], Dict[str, int]]:
+        totals: Dict[Optional[str], Dict[str, int]] = {}
+        for lab in labs:
+            zone = totals.setdefault(lab['zone'], {})
+            for disease, count in lab['positive_tests'].items():
+                zone[disease] = zone.get(disease, 0) + count
+        return totals
+
+    @staticmethod
+    def _excess(positives: Dict, reference: Dict) -> Dict[Optional[str], Dict[str, int]]:
+        return {
+            zone: {d: max(n - reference.get(zone, {}).get(d, 0), 0) for d, n in counts.items()}
+            for zone, counts in positives.items()
+        }
+
+    @staticmethod
+    def _shares(members: List[Dict], zone: Optional[str], weight: Optional[str] = None) -> List[tuple]:
+        """(member, share) for a zone's members; zones without members spread citywide"""
+        local = [m for m in members if m['zone'] == zone] or members
+        weights = [m[weight] if weight else 1 for m in local]
+        total = sum(weights)
+        if total <= 0:
+            return [(m, 1 / len(local)) for m in local]
+        return [(m, w / total) for m, w in zip(local, weights)]
+
+    def _admit(self, hospitals: List[Dict], excess: Dict):
+        """Discharge scenario patients at 1 / AVG_STAY_DAYS and admit the day's excess cases"""
+        if not hospitals:
+            return
+        admissions = {id(h): 0.0 for h in hospitals}
+        for zone, counts in excess.items():
+            patients = sum(n * self.HOSPITALIZATION_RATE.get(d, 0) for d, n in counts.items())
+            if patients:
+                for hospital, share in self._shares(hospitals, zone, 'total_beds'):
+                    admissions[id(hospital)] += patients * share
+        discharge = 1 / self.AVG_STAY_DAYS
+        for hospital in hospitals:
+            admitted = admissions[id(hospital)]
+            for key, occupied, new in (('extra', 'occupied', admitted), ('icu_extra', 'icu_occupied', admitted * self.ICU_SHARE)):
+                change = new - hospital[key] * discharge
+                hospital[key] += change
+                hospital[occupied] += change
+
+    def _consume(self, pharmacies: List[Dict], excess: Dict) -> int:
+        """Dispense usage plus outbreak demand; returns the units that could not be dispensed"""
+        for pharmacy in pharmacies:
+            pharmacy['today'] = dict(pharmacy['usage'])
+        if pharmacies:
+            for zone, counts in excess.items():
+                for disease, cases in counts.items():
+                    if not cases:
+                        continue
+                    units = cases * self.UNITS_PER_CASE
+                    for pharmacy, share in self._shares(pharmacies, zone):
+                        for medicine in self.DISEASE_MEDICINES.get(disease, ()):
+                            if medicine in pharmacy['stocks']:
+                                pharmacy['today'][medicine] = pharmacy['today'].get(medicine, 0) + int(round(units * share))
+
+        unmet = 0
+        for pharmacy in pharmacies:
+            stocks = pharmacy['stocks']
+            for medicine, units in pharmacy['today'].items():
+                stock = stocks.get(medicine, 0)
+                unmet += max(units - stock, 0)
+                stocks[medicine] = max(stock - units, 0)
+        return unmet
+
+    def _hospital_inputs(self, hospital: Dict) -> Dict:
+        """Hospital Agent arguments; ER wait grows as 1 / free-bed share"""
+        total, icu_total = hospital['total_beds'], hospital['icu_total']
+        occupied = int(round(hospital['occupied']))
+        icu_occupied = int(round(hospital['icu_occupied']))
+        free_share = max((total - occupied) / total if total else 0.0, self.MIN_FREE_SHARE)
+        base_share = max(hospital['free_share_base'], self.MIN_FREE_SHARE)
+        return {
+            'total_beds': total,
+            'available_beds': max(total - occupied, 0),
+            'icu_total': icu_total,
+            'icu_available': max(icu_total - icu_occupied, 0),
+            'er_wait_time': int(round(hospital['er_wait_base'] * base_share / free_share))
+        }
+
+    def _advance_labs(self, labs: List[Dict], predictions: List[List[dict]], rates: List[Dict]):
+        """
+        Tomorrow's test demand is the Lab Agent forecast and today's becomes
+        the baseline; positives come from the tests capacity allows, so the
+        trend is not bent by the cap
+        """
+        for lab, lab_predictions, lab_rates in zip(labs, predictions, rates):
+            for prediction in lab_predictions:
+                disease = prediction['disease']
+                demand = prediction['predicted_cases_24h']
+                capacity = lab['test_capacity'].get(disease)
+                tests = min(demand, capacity) if capacity else demand
+                lab['baseline_tests'][disease] = lab['current_tests'][disease]
+                lab['current_tests'][disease] = demand
+                lab['positive_tests'][disease] = int(round(tests * lab_rates.get(disease, 0)))
+
+    def _raise_risk(self, zone_risks: Dict[str, str], zone: Optional[str], level: str):
+        if zone is None:
+            return
+        current = zone_risks.get(zone, 'LOW')
+        zone_risks[zone] = max(current, level, key=self.RISK_LEVELS.index)
+
+    def _day_record(
+        self,
+        day: int,
+        city: Dict,
+        labs: List[Dict],
+        hospitals: List[Dict],
+        strain: List[Dict],
+        zone_risks: Dict[str, str],
+        unmet: int,
+        fulfilled: int,
+        pending: int
+    ) -> Dict:
+        disease_stats: Dict[str, int] = {}
+        for lab in labs:
+            for disease, count in lab['positive_tests'].items():
+                disease_stats[disease] = disease_stats.get(disease, 0) + count
+        total_beds = sum(h['total_beds'] for h in hospitals)
+        occupied = sum(min(max(h['occupied'], 0), h['total_beds']) for h in hospitals)
+        overflow = sum(max(h['occupied'] - h['total_beds'], 0) for h in hospitals)
+        medicine_stock: Dict[str, int] = {}
+        stockouts = 0
+        for pharmacy in city['pharmacy']:
+            for medicine, stock in pharmacy['stocks'].items():
+                medicine_stock[medicine] = medicine_stock.get(medicine, 0) + stock
+                stockouts += stock == 0
+        utilization = occupied / total_beds * 100 if total_beds else 0.0
+
+        crisis = self._city.predict_crisis(
+            disease_stats=disease_stats,
+            hospital_capacity={'utilization_percent': utilization},
+            medicine_stock=medicine_stock,
+            zone_risks=zone_risks
+        )
+        hsi = [result['hsi_score'] for result in strain]
+        return {
+            "day": day,
+            "cps": crisis['cps_score'],
+            "severity": crisis['severity'],
+            "positives": sum(disease_stats.values()),
+            "utilization_percent": round(utilization, 1),
+            "overflow_patients": int(round(overflow)),
+            "mean_hsi": round(sum(hsi) / len(hsi), 2) if hsi else 0.0,
+            "max_hsi": round(max(hsi), 2) if hsi else 0.0,
+            "stockouts": stockouts,
+            "unmet_units": unmet,
+            "orders_fulfilled": fulfilled,
+            "orders_pending": pending
+        }
+
+    @staticmethod
+    def _summarize(daily: List[Dict]) -> Dict:
+        def first_day(condition):
+            return next((d['day'] for d in daily if condition(d)), None)
+
+        peak = max(daily, key=lambda d: d['cps'])
+        return {
+            "peak_cps": peak['cps'],
+            "peak_cps_day": peak['day'],
+            "first_elevated_day": first_day(lambda d: d['cps'] >= 50),
+            "first_critical_day": first_day(lambda d: d['cps'] >= 70),
+            "max_hsi": max(d['max_hsi'] for d in daily),
+            "first_stockout_day": first_day(lambda d: d['stockouts'] > 0),
+            "max_stockouts": max(d['stockouts'] for d in daily),
+            "unmet_units": sum(d['unmet_units'] for d in daily),
+            "total_positives": sum(d['positives'] for d in daily)
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "variants_run": self.variants_run,
+            "pool_runs": self.pool_runs,
+            "max_workers": self.MAX_WORKERS,
+            "pool_started": self._pool is not None
+        }
+
+
+_worker_engine: Optional[ScenarioEngine] = None
+
+
+def _simulate_variant(base: Dict, variant: Dict, days: int) -> Dict:
+    """Process pool entry point; each worker builds its agents once"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = ScenarioEngine(max_workers=1)
+    return _worker_engine.simulate(base, variant, days)
@@ -0,0 +1,316 @@
+"""
+SEIR Engine - Multi-Week Epidemic Projection per Zone and Disease
+
+Implementation Mandate: Hybrid Logic
+- Formula: SEIRS compartments for every (zone, disease) at once,
+      dS = -beta S (M I/N) + omega R       dE = beta S (M I/N) - sigma E
+      dI = sigma E - gamma I               dR = gamma I - omega R
+  integrated with fixed-step RK4 on a (compartments, zones, diseases) array.
+  M is the optional sparse inter-zone mixing matrix (identity without it)
+
+- Rule: beta is fitted per (zone, disease) from the recent growth rate r of
+  daily lab positives: R = (1 + r/sigma)(1 + r/gamma) for exponentially
+  distributed latent/infectious periods, beta = R gamma / S0. Zones with too
+  few positives to fit are held at R = 1. Projections are cached by their
+  full parameter set
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, identity
+
+
+class SEIREngine:
+    """Vectorized SEIRS projections fitted to lab positives"""
+
+    def __init__(self):
+        # disease: (latent days 1/sigma, infectious days 1/gamma, immunity days 1/omega or None)
+        self.DISEASE_PARAMS = {
+            'dengue': (7.0, 5.0, None),         # Latent includes the mosquito cycle
+            'malaria': (12.0, 10.0, None),
+            'typhoid': (10.0, 14.0, None),
+            'influenza': (2.0, 5.0, 180.0),
+            'covid': (5.0, 7.0, 180.0)
+        }
+        self.DEFAULT_PARAMS = (5.0, 7.0, None)
+        self.ASCERTAINMENT = 0.1        # Share of infections that show up as lab positives
+        self.FIT_DAYS = 14              # Recent days used to fit the growth rate
+        self.MIN_FIT_POSITIVES = 10     # Below this, R is held at 1
+        self.MAX_GROWTH_RATE = 0.5      # |r| cap per day
+        self.MAX_R = 8.0
+        self.STEPS_PER_DAY = 4          # RK4 dt = 6 hours
+        self.MAX_DAYS = 90
+        self.CACHE_SIZE = 128
+
+        self._cache: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._lock = threading.Lock()   # Guards the cache; projections run in the threadpool
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def project(
+        self,
+        zones: List[Dict],
+        days: int = 30,
+        mixing: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Fit and project every zone x disease
+
+        Args:
+            zones: [{"zone", "population", "positives": {disease: [daily, oldest first]}}]
+            days: Projection horizon (capped at MAX_DAYS)
+            mixing: [{"from_zone", "to_zone", "fraction"}]: share of from_zone's
+                    contacts made in to_zone (the rest stay local); a
+                    zone's fractions may not sum to more than 1
+
+        Returns:
+            Fitted growth/R and daily projected positives per zone x disease,
+            plus city totals per disease
+        """
+        days = max(1, min(int(days), self.MAX_DAYS))
+        names = [z['zone'] for z in zones]
+        diseases = sorted({d for z in zones for d in (z.get('positives') or {})})
+        if not zones or not diseases:
+            return {'days': days, 'projections': [], 'city': [], 'cached': False}
+
+        positives, observed = self._positive_matrix(zones, diseases)
+        population = np.array([float(z['population']) for z in zones])
+        sigma, gamma, omega = self._rates(diseases)
+        growth, incidence, fitted = self._fit(positives, observed)
+        state, beta, r_effective = self._initial_state(positives, population, growth, incidence, sigma, gamma)
+        mixing_matrix = self._mixing_matrix(names, mixing)
+
+        key = self._cache_key(state, beta, sigma, gamma, omega, population, mixing_matrix, days)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        cached = hit is not None
+        if cached:
+            daily_infections, susceptible_end = hit
+        else:
+            daily_infections, susceptible_end = self._integrate(
+                state, beta, sigma, gamma, omega, population, mixing_matrix, days
+            )
+            with self._lock:
+                self._cache[key] = (daily_infections, susceptible_end)
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        daily_positives = daily_infections * self.ASCERTAINMENT     # (days, zones, diseases)
+        return {
+            'days': days,
+            'projections': self._zone_results(
+                names, diseases, daily_positives, growth, r_effective, fitted,
+                state, population, susceptible_end
+            ),
+            'city': self._city_results(diseases, daily_positives),
+            'cached': cached
+        }
+
+    # ============= FITTING =============
+
+    def _positive_matrix(self, zones: List[Dict], diseases: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (FIT_DAYS, zones, diseases) daily positives right-aligned on the latest
+        day, and the mask of days each series actually covers
+        """
+        matrix = np.zeros((self.FIT_DAYS, len(zones), len(diseases)))
+        observed = np.zeros(matrix.shape, dtype=bool)
+        for z, zone in enumerate(zones):
+            for d, disease in enumerate(diseases):
+                series = ((zone.get('positives') or {}).get(disease) or [])[-self.FIT_DAYS:]
+                if series:
+                    matrix[self.FIT_DAYS - len(series):, z, d] = series
+                    observed[self.FIT_DAYS - len(series):, z, d] = True
+        return matrix, observed
+
+    def _rates(self, diseases: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        params = [self.DISEASE_PARAMS.get(d.lower(), self.DEFAULT_PARAMS) for d in diseases]
+        sigma = np.array([1 / p[0] for p in params])
+        gamma = np.array([1 / p[1] for p in params])
+        omega = np.array([1 / p[2] if p[2] else 0.0 for p in params])
+        return sigma, gamma, omega
+
+    def _fit(self, positives: np.ndarray, observed: np.ndarray):
+        """
+        Log-linear least squares of daily positives, all series at once
+
+        Each series is fitted over the days it covers only (weights = mask).
+
+        Returns:
+            growth rate r per day, latest-day positives on the fitted line,
+            and a mask of series with enough positives to fit
+        """
+        weights = observed.astype(np.float64)
+        n_days = weights.sum(axis=0)
+        t = np.arange(self.FIT_DAYS, dtype=np.float64)[:, None, None]
+        log_counts = np.log(positives + 0.5)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_mean = (weights * t).sum(axis=0) / n_days
+            y_mean = (weights * log_counts).sum(axis=0) / n_days
+            t_centered = t - t_mean
+            slope = (weights * t_centered * (log_counts - y_mean)).sum(axis=0) / (weights * t_centered ** 2).sum(axis=0)
+        fitted = (positives.sum(axis=0) >= self.MIN_FIT_POSITIVES) & (n_days >= 3)
+
+        growth = np.where(fitted, np.clip(np.nan_to_num(slope), -self.MAX_GROWTH_RATE, self.MAX_GROWTH_RATE), 0.0)
+        latest_on_line = np.exp(np.nan_to_num(y_mean) + growth * (self.FIT_DAYS - 1 - np.nan_to_num(t_mean))) - 0.5
+        recent_mean = positives[-7:].sum(axis=0) / np.maximum(weights[-7:].sum(axis=0), 1)
+        incidence = np.maximum(np.where(fitted, latest_on_line, recent_mean), 0.0)
+        return growth, incidence, fitted
+
+    def _initial_state(self, positives, population, growth, incidence, sigma, gamma):
+        """
+        Compartments consistent with the fitted exponential phase
+
+        New infections per day = positives / ASCERTAINMENT; under growth r,
+        E = inc / (sigma + r) and I = sigma E / (gamma + r).
+        """
+        infections = incidence / self.ASCERTAINMENT
+        exposed = infections / np.maximum(sigma + growth, 1e-6)
+        infectious = sigma * exposed / np.maximum(gamma + growth, 1e-6)
+        recovered = positives.sum(axis=0) / self.ASCERTAINMENT
+        cap = population[:, None]
+        exposed, infectious = np.minimum(exposed, 0.25 * cap), np.minimum(infectious, 0.25 * cap)
+        recovered = np.minimum(recovered, cap - exposed - infectious)
+        susceptible = cap - exposed - infectious - recovered
+
+        r_effective = np.clip((1 + growth / sigma) * (1 + growth / gamma), 0.0, self.MAX_R)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = np.where(susceptible > 0, r_effective * gamma * cap / susceptible, 0.0)
+        state = np.stack([susceptible, exposed, infectious, recovered, np.zeros_like(susceptible)])
+        return state, beta, r_effective
+
+    def _mixing_matrix(self, names: List[str], mixing: Optional[List[Dict]]):
+        """Row-stochastic sparse contact matrix, or None for fully local contacts"""
+        if not mixing:
+            return None
+        index = {name: i for i, name in enumerate(names)}
+        rows, cols, values = [], [], []
+        for link in mixing:
+            i, j = index.get(link['from_zone']), index.get(link['to_zone'])
+            if i is None or j is None or i == j:
+                continue
+            rows.append(i)
+            cols.append(j)
+            values.append(float(link['fraction']))
+        if not rows:
+            return None
+        n = len(names)
+        away = csr_matrix((values, (rows, cols)), shape=(n, n))     # Duplicate links add up
+        away_share = np.asarray(away.sum(axis=1)).ravel()
+        over = np.flatnonzero(away_share > 1.0 + 1e-9)
+        if over.size:
+            raise ValueError(
+                f"Mixing fractions from zone '{names[over[0]]}' sum to "
+                f"{away_share[over[0]]:.3f}; a zone's contacts cannot exceed 1"
+            )
+        stay = 1.0 - away_share
+        return (away + identity(n, format="csr").multiply(stay[:, None])).tocsr()
+
+    # ============= INTEGRATION =============
+
+    def _integrate(self, state, beta, sigma, gamma, omega, population, mixing, days):
+        """
+        Fixed-step RK4; the 5th compartment accumulates new infections (sigma E)
+
+        Returns:
+            (days, zones, diseases) new infections per day and S/N at the end
+        """
+        inverse_population = 1.0 / population[:, None]
+        dt = 1.0 / self.STEPS_PER_DAY
+
+        def derivative(y):
+            susceptible, exposed, infectious, recovered = y[0], y[1], y[2], y[3]
+            prevalence = infectious * inverse_population
+            if mixing is not None:
+                prevalence = mixing @ prevalence
+            infection = beta * susceptible * prevalence
+            onset = sigma * exposed
+            removal = gamma * infectious
+            waning = omega * recovered
+            return np.stack([
+                waning - infection,
+                infection - onset,
+                onset - removal,
+                removal - waning,
+                onset
+            ])
+
+        y = state.copy()
+        cumulative = np.empty((days + 1,) + y.shape[1:])
+        cumulative[0] = 0.0
+        for day in range(1, days + 1):
+            for _ in range(self.STEPS_PER_DAY):
+                k1 = derivative(y)
+                k2 = derivative(y + 0.5 * dt * k1)
+                k3 = derivative(y + 0.5 * dt * k2)
+                k4 = derivative(y + dt * k3)
+                y += (dt / 6.0) * (k1 + 2 * k2 + 2 * k3 + k4)
+            cumulative[day] = y[4]
+        return np.diff(cumulative, axis=0), y[0] * inverse_population
+
+    def _cache_key(self, state, beta, sigma, gamma, omega, population, mixing, days) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (state, beta, sigma, gamma, omega, population):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        if mixing is not None:
+            for array in (mixing.indptr, mixing.indices, mixing.data):
+                digest.update(array.tobytes())
+        digest.update(f"{days}:{self.STEPS_PER_DAY}".encode())
+        return digest.hexdigest()
+
+    # ============= RESULTS =============
+
+    def _zone_results(self, names, diseases, daily_positives, growth, r_effective, fitted,
+                      state, population, susceptible_end) -> List[Dict]:
+        peak_day = daily_positives.argmax(axis=0)
+        peak = daily_positives.max(axis=0)
+        total = daily_positives.sum(axis=0)
+        results = []
+        for z, zone in enumerate(names):
+            for d, disease in enumerate(diseases):
+                r = float(growth[z, d])
+                results.append({
+                    'zone': zone,
+                    'disease': disease,
+                    'fitted': bool(fitted[z, d]),
+                    'growth_rate': round(r, 4),
+                    'doubling_days': round(math.log(2) / r, 1) if r > 1e-3 else None,
+                    'r_effective': round(float(r_effective[z, d]), 2),
+                    'infectious_now': int(round(state[2, z, d])),
+                    'projected_daily_positives': np.round(daily_positives[:, z, d], 1).tolist(),
+                    'peak_day': int(peak_day[z, d]) + 1,
+                    'peak_daily_positives': round(float(peak[z, d]), 1),
+                    'total_projected_positives': int(round(total[z, d])),
+                    'susceptible_fraction_end': round(float(susceptible_end[z, d]), 4)
+                })
+        return results
+
+    def _city_results(self, diseases, daily_positives) -> List[Dict]:
+        city = daily_positives.sum(axis=1)     # (days, diseases)
+        return [
+            {
+                'disease': disease,
+                'projected_daily_positives': np.round(city[:, d], 1).tolist(),
+                'peak_day': int(city[:, d].argmax()) + 1,
+                'peak_daily_positives': round(float(city[:, d].max()), 1),
+                'total_projected_positives': int(round(city[:, d].sum()))
+            }
+            for d, disease in enumerate(diseases)
+        ]
+
+    def get_stats(self) -> Dict:
+        return {
+            'cached_projections': len(self._cache),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
@@ -0,0 +1,344 @@
+"""
+Stock Ledger - Event-Sourced Pharmacy Stock and Consumption
+
+Implementation Mandate: Hybrid Logic
+- Formula: Dispensed units are bucketed per local day; each completed day x
+  folds into an exponentially weighted mean and variance of daily
+  consumption:
+      diff = x - mean,  mean += ALPHA * diff,  var = (1 - ALPHA) * (var + ALPHA * diff^2)
+  Days without a dispense fold in as zeros (up to MAX_GAP_DAYS)
+
+- Rule: Stock and estimates are a fold over dispense / restock / count
+  events, O(1) per event, held in one typed array per field instead of a
+  dict per entry. The Pharmacy Agent classifies demand on this server
+  state; today's dispensed units act as a floor on the daily consumption so
+  a surge shows before the day closes
+- Rule: Every CHECKPOINT_EVENTS logged events (and on start and close) the
+  state is written to a checkpoint and the log restarts empty, so a start
+  loads one checkpoint and replays a bounded log. The log's first line names
+  the checkpoint generation it follows; a log left behind by a crash before
+  its restart is recognised as already folded in. Lines that do not parse
+  are moved to a .corrupt file instead of stopping the start
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class StockLedger:
+    """Per-(pharmacy, medicine) stock and EWMA consumption built from events"""
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.ALPHA = 0.25               # ~7-day EWMA span (2 / (span + 1))
+        self.MAX_GAP_DAYS = 60          # Zero days folded after a silence (mean ~ 0 by then)
+        self.UTC_OFFSET_HOURS = 5.5     # Day boundaries in local (IST) time
+        self.Z_UPPER = 1.645            # One-sided 95% bound on daily consumption
+        self.EVENT_TYPES = ("dispense", "restock", "count")
+        self.CHECKPOINT_EVENTS = 1_000_000  # Logged events between checkpoints
+
+        self.log_path = log_path        # Append-only event log, replayed on start
+        self.checkpoint_path = log_path + ".checkpoint" if log_path else None
+        self.quarantine_path = log_path + ".corrupt" if log_path else None
+        self._lock = threading.Lock()
+        self._slots: Dict[Tuple[str, str], int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._by_pharmacy: Dict[str, Dict[str, int]] = {}
+
+        # One typed array per field, indexed by slot
+        self._stock = array("q")
+        self._today = array("q")        # Units dispensed in the open day
+        self._day = array("q")          # Open day number
+        self._days_observed = array("q")
+        self._mean = array("d")
+        self._var = array("d")
+        self._updated = array("d")      # Latest event timestamp
+
+        self.events = 0
+        self.version = 0
+        self.generation = 0             # Checkpoints written over the ledger's life
+        self.quarantined = 0            # Log lines set aside on start
+        self._logged = 0                # Events in the log since the checkpoint
+        self._log = None
+        self.replay_ms = 0.0
+        if log_path:
+            if os.path.dirname(log_path):
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            self.replay_ms = self._replay()
+            self._checkpoint()
+
+    def ingest(self, events: Iterable[Dict]) -> Dict:
+        """
+        Apply a batch of events
+
+        Args:
+            events: [{"pharmacy_id", "medicine", "type": dispense|restock|count,
+                      "quantity", "timestamp" (epoch seconds, default now)}]
+
+        Returns:
+            Applied and rejected counts and the pharmacies touched
+        """
+        now = time.time()
+        rows = []
+        rejected = 0
+        for event in events:
+            quantity = int(event["quantity"])
+            if event["type"] not in self.EVENT_TYPES or quantity < 0:
+                rejected += 1
+                continue
+            rows.append((
+                event["pharmacy_id"],
+                event["medicine"],
+                event["type"],
+                quantity,
+                float(event.get("timestamp") or now)
+            ))
+
+        with self._lock:
+            touched = self._apply(rows)
+            if self._log is not None and rows:
+                self._log.write(json.dumps(rows, separators=(",", ":")) + "\n")
+                self._log.flush()
+                self._logged += len(rows)
+                if self._logged >= self.CHECKPOINT_EVENTS:
+                    self._checkpoint()
+            self.version += 1
+
+        return {
+            "applied": len(rows),
+            "rejected": rejected,
+            "pharmacies": sorted(touched),
+            "version": self.version
+        }
+
+    def _apply(self, rows: List[Tuple]) -> set:
+        """The event fold; rows are (pharmacy_id, medicine, type, quantity, timestamp)"""
+        slots = self._slots
+        stock, today, day, updated = self._stock, self._today, self._day, self._updated
+        offset = self.UTC_OFFSET_HOURS * 3600
+        touched = set()
+
+        for pharmacy_id, medicine, kind, quantity, timestamp in rows:
+            slot = slots.get((pharmacy_id, medicine))
+            event_day = int((timestamp + offset) // 86400)
+            if slot is None:
+                slot = self._add_slot(pharmacy_id, medicine, event_day)
+            elif event_day > day[slot]:
+                self._close_days(slot, event_day)
+            touched.add(pharmacy_id)
+
+            # Late events still move stock; their units count toward the open day
+            if kind == "dispense":
+                stock[slot] = max(stock[slot] - quantity, 0)
+                today[slot] += quantity
+            elif kind == "restock":
+                stock[slot] += quantity
+            else:
+                stock[slot] = quantity      # Physical count overrides the running total
+            if timestamp > updated[slot]:
+                updated[slot] = timestamp
+
+        self.events += len(rows)
+        return touched
+
+    def _add_slot(self, pharmacy_id: str, medicine: str, day: int) -> int:
+        slot = len(self._keys)
+        self._slots[(pharmacy_id, medicine)] = slot
+        self._keys.append((pharmacy_id, medicine))
+        self._by_pharmacy.setdefault(pharmacy_id, {})[medicine] = slot
+        for column in (self._stock, self._today, self._days_observed):
+            column.append(0)
+        self._day.append(day)
+        self._mean.append(0.0)
+        self._var.append(0.0)
+        self._updated.append(0.0)
+        return slot
+
+    def _close_days(self, slot: int, day: int):
+        """Fold the open day (and any silent days after it) into the estimates"""
+        elapsed = day - self._day[slot]
+        self._mean[slot], self._var[slot] = self._fold(
+            self._mean[slot], self._var[slot], self._today[slot], elapsed, self._days_observed[slot]
+        )
+        self._days_observed[slot] += elapsed
+        self._today[slot] = 0
+        self._day[slot] = day
+
+    def _fold(self, mean: float, var: float, units: int, elapsed: int, observed: int) -> Tuple[float, float]:
+        """EWMA mean/variance after the open day closes and elapsed - 1 empty days"""
+        alpha = self.ALPHA
+        if observed == 0:
+            mean, var = float(units), 0.0   # First day seeds the mean instead of warming up from 0
+        else:
+            diff = units - mean
+            mean += alpha * diff
+            var = (1 - alpha) * (var + alpha * diff * diff)
+        for _ in range(min(elapsed - 1, self.MAX_GAP_DAYS)):
+            var = (1 - alpha) * (var + alpha * mean * mean)
+            mean *= 1 - alpha
+        return mean, var
+
+    def snapshot(self, pharmacy_ids: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Current stock and consumption estimates per pharmacy
+
+        Days that ended since a medicine's last event are folded in on the
+        fly (without changing the stored state).
+
+        Returns:
+            pharmacy_id -> {"medicine_stocks", "consumption_rates" (units/day),
+            "estimates": {medicine: {...}}}; unknown pharmacies are omitted
+        """
+        now = time.time() if now is None else now
+        current_day = int((now + self.UTC_OFFSET_HOURS * 3600) // 86400)
+        snapshots = {}
+        with self._lock:
+            for pharmacy_id in pharmacy_ids:
+                medicines = self._by_pharmacy.get(pharmacy_id)
+                if medicines is None:
+                    continue
+                stocks, rates, estimates = {}, {}, {}
+                for medicine, slot in medicines.items():
+                    mean, var, today = self._mean[slot], self._var[slot], self._today[slot]
+                    observed = self._days_observed[slot]
+                    if current_day > self._day[slot]:
+                        elapsed = current_day - self._day[slot]
+                        mean, var = self._fold(mean, var, today, elapsed, observed)
+                        observed += elapsed
+                        today = 0
+                    daily = max(mean, today) if observed else float(today)
+                    std = math.sqrt(var)
+
+                    stocks[medicine] = self._stock[slot]
+                    rates[medicine] = int(round(daily))
+                    estimates[medicine] = {
+                        "daily_consumption": round(daily, 2),
+                        "consumption_std": round(std, 2),
+                        "consumption_upper": round(daily + self.Z_UPPER * std, 2),
+                        "dispensed_today": today,
+                        "days_observed": observed,
+                        "updated_at": self._updated[slot]
+                    }
+                snapshots[pharmacy_id] = {
+                    "medicine_stocks": stocks,
+                    "consumption_rates": rates,
+                    "estimates": estimates
+                }
+        return snapshots
+
+    def get_stats(self) -> Dict:
+        return {
+            "pharmacies": len(self._by_pharmacy),
+            "tracked_medicines": len(self._keys),
+            "events": self.events,
+            "alpha": self.ALPHA,
+            "replay_ms": self.replay_ms,
+            "generation": self.generation,
+            "quarantined": self.quarantined,
+            "version": self.version
+        }
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                if self._logged:
+                    self._checkpoint()
+                self._log.close()
+                self._log = None
+
+    # ============= PERSISTENCE =============
+
+    def _checkpoint(self):
+        """
+        Write the state to the checkpoint and restart the log empty
+
+        The checkpoint is replaced atomically before the log is; a crash in
+        between leaves a log whose header names the previous generation, and
+        _replay skips it
+        """
+        generation = self.generation + 1
+        state = {
+            "generation": generation,
+            "events": self.events,
+            "keys": self._keys,
+            "stock": self._stock.tolist(),
+            "today": self._today.tolist(),
+            "day": self._day.tolist(),
+            "days_observed": self._days_observed.tolist(),
+            "mean": self._mean.tolist(),
+            "var": self._var.tolist(),
+            "updated": self._updated.tolist()
+        }
+        self._write_atomic(self.checkpoint_path, json.dumps(state, separators=(",", ":")))
+        self._write_atomic(self.log_path, json.dumps({"generation": generation}) + "\n")
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "a")
+        self.generation = generation
+        self._logged = 0
+
+    @staticmethod
+    def _write_atomic(path: str, text: str):
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+        self.generation = state["generation"]
+        self.events = state["events"]
+        self._keys = [tuple(key) for key in state["keys"]]
+        for slot, (pharmacy_id, medicine) in enumerate(self._keys):
+            self._slots[(pharmacy_id, medicine)] = slot
+            self._by_pharmacy.setdefault(pharmacy_id, {})[medicine] = slot
+        for name in ("stock", "today", "day", "days_observed"):
+            setattr(self, "_" + name, array("q", state[name]))
+        for name in ("mean", "var", "updated"):
+            setattr(self, "_" + name, array("d", state[name]))
+
+    def _replay(self) -> float:
+        """
+        Rebuild state from the checkpoint and the event log (one JSON batch per line)
+
+        A log whose header names an older generation than the checkpoint was
+        already folded into it and is skipped. Lines that do not parse, and
+        a torn final write, are appended to the .corrupt file and skipped
+        """
+        start = time.perf_counter()
+        if os.path.exists(self.checkpoint_path):
+            self._load_checkpoint()
+        if not os.path.exists(self.log_path):
+            return round((time.perf_counter() - start) * 1000, 1)
+
+        corrupt = []
+        with open(self.log_path, "rb") as log:
+            for number, line in enumerate(log):
+                try:
+                    rows = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    rows = None
+                if number == 0 and isinstance(rows, dict):
+                    if rows.get("generation", 0) < self.generation:
+                        break   # Log predates the checkpoint
+                    continue
+                if number == 0 and self.generation > 0:
+                    break       # Headerless log from before the first checkpoint
+                if not isinstance(rows, list):
+                    corrupt.append(line)
+                    continue
+                self._apply(rows)
+
+        if corrupt:
+            self.quarantined = len(corrupt)
+            with open(self.quarantine_path, "ab") as quarantine:
+                for line in corrupt:
+                    quarantine.write(line if line.endswith(b"\n") else line + b"\n")
+        return round((time.perf_counter() - start) * 1000, 1)
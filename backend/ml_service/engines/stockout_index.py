@@ -0,0 +1,242 @@
+"""
+Stockout Index - Citywide "Runs Out First" Ranking
+
+Implementation Mandate: Hybrid Logic
+- Formula: days_remaining = current_stock / daily_consumption per
+  (pharmacy, medicine), same as the Pharmacy Agent (999 when nothing is
+  consumed)
+
+- Rule: Every report pushes the new value onto a citywide heap plus one heap
+  per zone and one per medicine; superseded entries are skipped lazily and
+  compacted away once they outnumber the live ones. Top-k walks the heap
+  array best-first, so a query costs O(k log n) instead of a rescan of
+  every pharmacy's inventory
+"""
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class StockoutIndex:
+    """Incrementally maintained days-remaining index over all pharmacy stock"""
+
+    def __init__(self):
+        self.NO_CONSUMPTION_DAYS = 999
+        self.COMPACT_RATIO = 2          # Rebuild heaps when stale > ratio * live
+        self.COMPACT_MIN_ENTRIES = 1024
+
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._pharmacies: Dict[str, Dict] = {}   # pharmacy_id -> {"zone", "medicines"}
+
+        self._all: List[Tuple] = []
+        self._by_zone: Dict[str, List[Tuple]] = {}
+        self._by_medicine: Dict[str, List[Tuple]] = {}
+        self._seq = itertools.count()
+        self._heap_entries = 0
+        self._live = 0                  # Entries with a stock level (ranked)
+        self.version = 0
+
+    def report(
+        self,
+        pharmacy_id: str,
+        medicine_stocks: Optional[Dict[str, int]] = None,
+        consumption_rates: Optional[Dict[str, int]] = None,
+        zone: Optional[str] = None
+    ) -> Dict:
+        """
+        Apply a stock and/or consumption report from one pharmacy
+
+        Args:
+            pharmacy_id: Reporting pharmacy
+            medicine_stocks: Current stock per medicine (omitted ones keep their last value)
+            consumption_rates: Daily consumption per medicine (omitted ones keep their last value)
+            zone: Pharmacy zone (kept from earlier reports when omitted)
+
+        Returns:
+            Number of (pharmacy, medicine) pairs re-ranked and total indexed
+        """
+        medicine_stocks = medicine_stocks or {}
+        consumption_rates = consumption_rates or {}
+        pharmacy = self._pharmacies.setdefault(pharmacy_id, {"zone": None, "medicines": set()})
+
+        touched = set(medicine_stocks) | set(consumption_rates)
+        if zone is not None and zone != pharmacy["zone"]:
+            pharmacy["zone"] = zone
+            touched |= pharmacy["medicines"]
+
+        now = datetime.now().isoformat()
+        updated = 0
+        for medicine in touched:
+            key = (pharmacy_id, medicine)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "stock": None,
+                    "consumption": 0,
+                    "seq": None,
+                    "reported_at": now
+                }
+                pharmacy["medicines"].add(medicine)
+            if medicine in medicine_stocks:
+                entry["stock"] = int(medicine_stocks[medicine])
+                entry["reported_at"] = now
+            if medicine in consumption_rates:
+                entry["consumption"] = int(consumption_rates[medicine])
+                entry["reported_at"] = now
+
+            # Consumption-only reports wait for a stock level before ranking
+            if entry["stock"] is None:
+                continue
+            if entry["seq"] is None:
+                self._live += 1
+            self._push(key, entry, pharmacy["zone"])
+            updated += 1
+
+        self.version += 1
+        self._maybe_compact()
+        return {"updated": updated, "indexed": self._live, "version": self.version}
+
+    def remove_pharmacies(self, pharmacy_ids: List[str]) -> Dict:
+        """Drop pharmacies from the index (their heap entries go stale)"""
+        removed = 0
+        for pharmacy_id in pharmacy_ids:
+            pharmacy = self._pharmacies.pop(pharmacy_id, None)
+            if pharmacy is None:
+                continue
+            for medicine in pharmacy["medicines"]:
+                entry = self._entries.pop((pharmacy_id, medicine), None)
+                if entry is not None and entry["seq"] is not None:
+                    self._live -= 1
+            removed += 1
+
+        if removed:
+            self.version += 1
+            self._maybe_compact()
+        return {"removed": removed, "indexed": self._live, "version": self.version}
+
+    def runs_out_first(
+        self,
+        k: int = 10,
+        zone: Optional[str] = None,
+        medicine: Optional[str] = None,
+        max_days: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        The k (pharmacy, medicine) pairs closest to stocking out
+
+        Args:
+            k: Number of results
+            zone: Only pharmacies in this zone
+            medicine: Only this medicine
+            max_days: Stop at pairs with more days remaining than this
+
+        Returns:
+            Ranked list, fewest days remaining first
+        """
+        if medicine is not None:
+            heap = self._by_medicine.get(medicine, [])
+        elif zone is not None:
+            heap = self._by_zone.get(zone, [])
+        else:
+            heap = self._all
+
+        results = []
+        for days, _, key in self._walk(heap):
+            if len(results) >= k or (max_days is not None and days > max_days):
+                break
+            pharmacy_id, name = key
+            pharmacy_zone = self._pharmacies[pharmacy_id]["zone"]
+            if zone is not None and pharmacy_zone != zone:
+                continue
+            entry = self._entries[key]
+            results.append({
+                "rank": len(results) + 1,
+                "pharmacy_id": pharmacy_id,
+                "zone": pharmacy_zone,
+                "medicine": name,
+                "current_stock": entry["stock"],
+                "daily_consumption": entry["consumption"],
+                "days_remaining": round(days, 1),
+                "reported_at": entry["reported_at"]
+            })
+        return results
+
+    def get_stats(self) -> Dict:
+        return {
+            "pharmacies": len(self._pharmacies),
+            "indexed": self._live,
+            "heap_entries": self._heap_entries,
+            "zones": sorted(z for z, h in self._by_zone.items() if h),
+            "version": self.version
+        }
+
+    def _days_remaining(self, entry: Dict) -> float:
+        if entry["consumption"] > 0:
+            return entry["stock"] / entry["consumption"]
+        return self.NO_CONSUMPTION_DAYS
+
+    def _push(self, key: Tuple[str, str], entry: Dict, zone: Optional[str]):
+        """Supersede any earlier heap entries for key with a fresh one"""
+        seq = next(self._seq)
+        entry["seq"] = seq
+        item = (self._days_remaining(entry), seq, key)
+
+        heapq.heappush(self._all, item)
+        heapq.heappush(self._by_medicine.setdefault(key[1], []), item)
+        self._heap_entries += 2
+        if zone is not None:
+            heapq.heappush(self._by_zone.setdefault(zone, []), item)
+            self._heap_entries += 1
+
+    def _is_live(self, item: Tuple) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry["seq"] == item[1]
+
+    def _walk(self, heap: List[Tuple]) -> Iterator[Tuple]:
+        """
+        Yield live heap items in ascending order without popping
+
+        Best-first search over the implicit heap tree: children are never
+        smaller than their parent, so popping the frontier is ascending.
+        """
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            item, i = heapq.heappop(frontier)
+            if self._is_live(item):
+                yield item
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _maybe_compact(self):
+        """Rebuild the heaps from live entries once stale ones dominate"""
+        if self._heap_entries < self.COMPACT_MIN_ENTRIES:
+            return
+        if self._heap_entries <= (self.COMPACT_RATIO + 1) * 3 * self._live:
+            return
+
+        self._all = []
+        self._by_zone = {}
+        self._by_medicine = {}
+        self._heap_entries = 0
+        for key, entry in self._entries.items():
+            if entry["seq"] is None:
+                continue
+            zone = self._pharmacies[key[0]]["zone"]
+            item = (self._days_remaining(entry), entry["seq"], key)
+            self._all.append(item)
+            self._by_medicine.setdefault(key[1], []).append(item)
+            self._heap_entries += 2
+            if zone is not None:
+                self._by_zone.setdefault(zone, []).append(item)
+                self._heap_entries += 1
+
+        heapq.heapify(self._all)
+        for heap in self._by_zone.values():
+            heapq.heapify(heap)
+        for heap in self._by_medicine.values():
+            heapq.heapify(heap)
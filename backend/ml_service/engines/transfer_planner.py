@@ -0,0 +1,197 @@
+"""
+Transfer Planner - Patient Transfers Across Hospitals Under Surge
+
+Implementation Mandate: Hybrid Logic
+- Formula: Minimum-cost transportation problem per ward (general, ICU):
+  cost(i -> j) = KM_WEIGHT * road_km(i, j) + HSI_WEIGHT * HSI_j per patient,
+  with overflow at critical hospitals as supply and spare beds below the
+  TARGET_UTILIZATION at calmer hospitals as capacity. An "unplaced" sink at
+  UNPLACED_COST keeps the problem feasible, so as many patients as possible
+  move and the rest are reported
+
+- Rule: Hospitals at HSI >= SOURCE_HSI shed patients down to
+  TARGET_UTILIZATION; only hospitals below RECEIVER_MAX_HSI receive, and no
+  transfer is longer than MAX_TRANSFER_KM
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+
+class TransferPlanner:
+    """Min-cost assignment of overflow patients to hospitals with spare capacity"""
+
+    def __init__(self):
+        self.SOURCE_HSI = 80                # CRITICAL strain level
+        self.RECEIVER_MAX_HSI = 65          # HIGH and above do not receive
+        self.TARGET_UTILIZATION = 0.85      # Shed down to / fill up to this occupancy
+        self.MAX_TRANSFER_KM = 30.0
+        self.ROAD_FACTOR = 1.3              # Road km per straight-line km
+        self.KM_WEIGHT = 1.0
+        self.HSI_WEIGHT = 0.5               # 10 HSI points ~ 5 km detour
+        self.UNPLACED_COST = 1000.0
+
+        self.WARDS = {
+            # ward: (total key, available key, incoming key)
+            'general': ('total_beds', 'available_beds', 'incoming_patients'),
+            'icu': ('icu_total', 'icu_available', 'icu_incoming')
+        }
+
+        # (coordinates key, hospitals x hospitals road-km matrix)
+        self._matrix_cache: Optional[Tuple] = None
+
+    def plan(self, hospitals: List[Dict], hsi_scores: List[float]) -> Dict:
+        """
+        Plan transfers for every ward
+
+        Args:
+            hospitals: [{"hospital_id", "lat", "lng", "total_beds", "available_beds",
+                         "icu_total", "icu_available", "incoming_patients", "icu_incoming"}]
+            hsi_scores: Current HSI per hospital (Hospital Agent)
+
+        Returns:
+            Transfers, per-ward totals and per-hospital outcome
+        """
+        hsi = np.asarray(hsi_scores, dtype=np.float64)
+        distances = self._distance_matrix(hospitals) if hospitals else np.zeros((0, 0))
+
+        transfers = []
+        wards = {}
+        outcome: Dict[int, Dict] = {}
+        for ward, keys in self.WARDS.items():
+            overflow, spare = self._overflow_and_spare(hospitals, hsi, *keys)
+            ward_transfers, unplaced = self._solve(overflow, spare, distances, hsi)
+            wards[ward] = {
+                'overflow_patients': int(overflow.sum()),
+                'spare_beds': int(spare.sum()),
+                'transferred': sum(t[2] for t in ward_transfers),
+                'unplaced': int(unplaced.sum())
+            }
+            for i, j, patients in ward_transfers:
+                transfers.append({
+                    'from_hospital_id': hospitals[i]['hospital_id'],
+                    'to_hospital_id': hospitals[j]['hospital_id'],
+                    'ward': ward,
+                    'patients': patients,
+                    'distance_km': round(float(distances[i, j]), 2),
+                    'receiver_hsi': round(float(hsi[j]), 2)
+                })
+                self._tally(outcome, hospitals, hsi, i, f'{ward}_sent', patients)
+                self._tally(outcome, hospitals, hsi, j, f'{ward}_received', patients)
+            for i in np.flatnonzero(unplaced):
+                self._tally(outcome, hospitals, hsi, i, f'{ward}_unplaced', int(unplaced[i]))
+
+        transfers.sort(key=lambda t: (t['from_hospital_id'], t['ward'], t['distance_km']))
+        moved = sum(t['patients'] for t in transfers)
+        return {
+            'transfers': transfers,
+            'wards': wards,
+            'hospitals': [outcome[i] for i in sorted(outcome, key=lambda i: -hsi[i])],
+            'total_transferred': moved,
+            'total_unplaced': sum(w['unplaced'] for w in wards.values()),
+            'avg_distance_km': round(
+                sum(t['patients'] * t['distance_km'] for t in transfers) / moved, 2
+            ) if moved else 0.0
+        }
+
+    @staticmethod
+    def _tally(outcome, hospitals, hsi, i, field, patients):
+        entry = outcome.setdefault(i, {
+            'hospital_id': hospitals[i]['hospital_id'],
+            'hsi_score': round(float(hsi[i]), 2)
+        })
+        entry[field] = entry.get(field, 0) + patients
+
+    def _overflow_and_spare(self, hospitals, hsi, total_key, available_key, incoming_key):
+        """Patients to move out of critical hospitals / beds free below target elsewhere"""
+        total = np.array([h.get(total_key, 0) or 0 for h in hospitals], dtype=np.float64)
+        available = np.array([h.get(available_key, 0) or 0 for h in hospitals], dtype=np.float64)
+        incoming = np.array([h.get(incoming_key, 0) or 0 for h in hospitals], dtype=np.float64)
+
+        demand = total - available + incoming                 # Occupied after arrivals
+        target = np.floor(self.TARGET_UTILIZATION * total)
+        overflow = np.where(hsi >= self.SOURCE_HSI, np.maximum(demand - target, 0), 0)
+        spare = np.where(hsi < self.RECEIVER_MAX_HSI, np.maximum(target - demand, 0), 0)
+        return overflow.astype(np.int64), spare.astype(np.int64)
+
+    def _solve(self, overflow, spare, distances, hsi):
+        """
+        Transportation LP over allowed (source, receiver) arcs (HiGHS)
+
+        The constraint matrix is totally unimodular, so the optimal vertex
+        is integral for integer supplies and capacities.
+        """
+        sources = np.flatnonzero(overflow)
+        receivers = np.flatnonzero(spare)
+        if not len(sources):
+            return [], overflow
+
+        if len(receivers):
+            within = distances[np.ix_(sources, receivers)] <= self.MAX_TRANSFER_KM
+            arc_s, arc_r = np.nonzero(within)
+        else:
+            arc_s = arc_r = np.empty(0, dtype=np.int64)
+        n_arcs = len(arc_s)
+        n_sources = len(sources)
+
+        # Variables: one per arc, then one "unplaced" per source
+        cost = np.concatenate([
+            self.KM_WEIGHT * distances[sources[arc_s], receivers[arc_r]]
+            + self.HSI_WEIGHT * hsi[receivers[arc_r]],
+            np.full(n_sources, self.UNPLACED_COST)
+        ])
+        columns = np.arange(n_arcs + n_sources)
+        supply = coo_matrix(
+            (np.ones(n_arcs + n_sources), (np.concatenate([arc_s, np.arange(n_sources)]), columns)),
+            shape=(n_sources, n_arcs + n_sources)
+        )
+        capacity = coo_matrix(
+            (np.ones(n_arcs), (arc_r, np.arange(n_arcs))),
+            shape=(len(receivers), n_arcs + n_sources)
+        )
+
+        result = linprog(
+            cost,
+            A_ub=capacity.tocsr() if len(receivers) else None,
+            b_ub=spare[receivers] if len(receivers) else None,
+            A_eq=supply.tocsr(),
+            b_eq=overflow[sources],
+            bounds=(0, None),
+            method="highs-ds"
+        )
+        if result.status != 0:
+            raise RuntimeError(f"Transfer solver failed: {result.message}")
+
+        flow = np.rint(result.x).astype(np.int64)
+        transfers = [
+            (int(sources[arc_s[a]]), int(receivers[arc_r[a]]), int(flow[a]))
+            for a in np.flatnonzero(flow[:n_arcs])
+        ]
+        unplaced = np.zeros_like(overflow)
+        unplaced[sources] = flow[n_arcs:]
+        return transfers, unplaced
+
+    def _distance_matrix(self, hospitals: List[Dict]) -> np.ndarray:
+        """Road-km matrix between hospitals, cached while their coordinates are unchanged"""
+        latlng = np.array([[float(h['lat']), float(h['lng'])] for h in hospitals])
+        key = (len(hospitals), hash(latlng.tobytes()))
+        cached = self._matrix_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        xy = self._project(latlng)
+        matrix = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2)) * self.ROAD_FACTOR
+        self._matrix_cache = (key, matrix)
+        return matrix
+
+    @staticmethod
+    def _project(latlng: np.ndarray) -> np.ndarray:
+        """Equirectangular projection to km around the hospitals' centroid"""
+        lat0, lng0 = latlng.mean(axis=0)
+        x = (latlng[:, 1] - lng0) * 111.32 * math.cos(math.radians(lat0))
+        y = (latlng[:, 0] - lat0) * 110.57
+        return np.column_stack([x, y])
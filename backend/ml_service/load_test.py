@@ -0,0 +1,302 @@
+"""
+Traffic-replay load generator for HealSync ML Service
+
+Replays the Node agent tick schedule against the FastAPI app:
+  HospitalAgent_DB  every 8 s   -> /calculate/hospital_strain  (per hospital)
+  LabAgent_DB       every 10 s  -> /predict/outbreak           (per lab)
+  PharmacyAgent_DB  every 12 s  -> /classify/pharmacy_demand   (per pharmacy)
+  SupplierAgent_DB  every 15 s  -> /prioritize/orders          (per supplier)
+  CityAgent_DB      every 15 s  -> /predict/crisis             (once)
+  diseaseSimulator  every 30 s  -> drifts entity state (no request)
+
+Load is open-loop like setInterval: a tick fires whether or not the previous
+request has returned. Reports throughput, tail latency and error rate per
+window, and with --ramp finds the entity scale at which each endpoint
+saturates.
+
+Usage:
+  python load_test.py                          # in-process via ASGI
+  python load_test.py --target http://localhost:8000
+  python load_test.py --ramp 1,2,4,8 --time-scale 10 --duration 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+DISEASES = ["dengue", "malaria", "typhoid", "influenza", "covid"]
+MEDICINES = ["dengue_medicine", "paracetamol", "antibiotics", "iv_fluids", "malaria_medicine", "oxygen"]
+URGENCIES = ["URGENT", "HIGH", "MEDIUM", "NORMAL", "LOW"]
+
+# (entity kind, endpoint, tick interval in seconds)
+SCHEDULE = [
+    ("hospital", "/calculate/hospital_strain", 8),
+    ("lab", "/predict/outbreak", 10),
+    ("pharmacy", "/classify/pharmacy_demand", 12),
+    ("supplier", "/prioritize/orders", 15),
+    ("city", "/predict/crisis", 15),
+]
+SIMULATOR_INTERVAL = 30
+
+
+class CityState:
+    """Synthetic entity state, drifted by the simulator tick and outbreak bursts"""
+
+    def __init__(self, counts, rng):
+        self.rng = rng
+        self.outbreak = 1.0  # Multiplier on test counts / load during bursts
+        self.hospitals = [self._new_hospital() for _ in range(counts["hospital"])]
+        self.labs = [self._new_lab() for _ in range(counts["lab"])]
+        self.pharmacies = [self._new_pharmacy() for _ in range(counts["pharmacy"])]
+        self.suppliers = [None] * counts["supplier"]
+        self.city = [None] * counts["city"]
+
+    def _new_hospital(self):
+        total = self.rng.randint(80, 400)
+        icu = self.rng.randint(10, 40)
+        return {"total_beds": total, "occupied": self.rng.uniform(0.4, 0.8),
+                "icu_total": icu, "icu_occupied": self.rng.uniform(0.4, 0.8)}
+
+    def _new_lab(self):
+        return {d: {"baseline": self.rng.randint(3, 30), "rate": self.rng.uniform(0.03, 0.2)} for d in DISEASES}
+
+    def _new_pharmacy(self):
+        return {m: {"stock": self.rng.randint(20, 800), "use": self.rng.randint(5, 80)} for m in MEDICINES}
+
+    def drift(self):
+        """diseaseSimulator tick: random walk on occupancy, tests and stock"""
+        for h in self.hospitals:
+            h["occupied"] = min(1.0, max(0.2, h["occupied"] + self.rng.gauss(0, 0.03)))
+            h["icu_occupied"] = min(1.0, max(0.2, h["icu_occupied"] + self.rng.gauss(0, 0.03)))
+        for lab in self.labs:
+            for d in lab.values():
+                d["baseline"] = max(1, d["baseline"] + self.rng.randint(-1, 1))
+        for p in self.pharmacies:
+            for m in p.values():
+                m["stock"] = max(0, m["stock"] + self.rng.randint(-30, 20))
+
+    def payload(self, kind, index):
+        """Build the request body the Node agent would send for one entity"""
+        if kind == "hospital":
+            h = self.hospitals[index]
+            occupied = min(1.0, h["occupied"] * (1 + 0.1 * (self.outbreak - 1)))
+            icu_occupied = min(1.0, h["icu_occupied"] * (1 + 0.1 * (self.outbreak - 1)))
+            return {
+                "total_beds": h["total_beds"],
+                "available_beds": int(h["total_beds"] * (1 - occupied)),
+                "icu_total": h["icu_total"],
+                "icu_available": int(h["icu_total"] * (1 - icu_occupied)),
+                "er_wait_time": int(30 + 90 * occupied * self.outbreak),
+                "incoming_patients": self.rng.randint(0, int(10 * self.outbreak) + 1)
+            }
+        if kind == "lab":
+            lab = self.labs[index]
+            current = {d: int(v["baseline"] * self.outbreak * self.rng.uniform(0.7, 1.5)) + 1 for d, v in lab.items()}
+            return {
+                "current_tests": current,
+                "baseline_tests": {d: v["baseline"] for d, v in lab.items()},
+                "positive_tests": {d: int(current[d] * v["rate"] * self.outbreak) for d, v in lab.items()}
+            }
+        if kind == "pharmacy":
+            p = self.pharmacies[index]
+            return {
+                "medicine_stocks": {m: v["stock"] for m, v in p.items()},
+                "consumption_rates": {m: int(v["use"] * self.outbreak) for m, v in p.items()},
+                "outbreak_alerts": ["dengue"] if self.outbreak > 1 else []
+            }
+        if kind == "supplier":
+            n_orders = self.rng.randint(3, int(10 * self.outbreak) + 3)
+            return {
+                "orders": [
+                    {
+                        "order_id": f"ORD-{index}-{i}",
+                        "requester_id": f"H{self.rng.randint(1, max(1, len(self.hospitals)))}",
+                        "medicine": self.rng.choice(MEDICINES),
+                        "quantity": self.rng.randint(10, 200),
+                        "urgency": self.rng.choice(URGENCIES),
+                        "requester_strain": self.rng.randint(20, 95)
+                    }
+                    for i in range(n_orders)
+                ],
+                "inventory": {m: self.rng.randint(100, 2000) for m in MEDICINES},
+                "delivery_capacity": 4
+            }
+        return {
+            "disease_stats": {d: int(self.rng.randint(5, 60) * self.outbreak) for d in DISEASES},
+            "hospital_capacity": {"utilization_percent": self.rng.randint(50, 95)},
+            "medicine_stock": {m: self.rng.randint(20, 500) for m in MEDICINES},
+            "zone_risks": {f"Zone-{z}": self.rng.choice(["LOW", "MEDIUM", "HIGH"]) for z in range(1, 5)}
+        }
+
+
+class LoadRecorder:
+    """Collects (finish time, endpoint, latency, status) samples"""
+
+    def __init__(self):
+        self.samples = []
+
+    def record(self, endpoint, latency_ms, status):
+        self.samples.append((time.perf_counter(), endpoint, latency_ms, status))
+
+    def summarize(self, start, end):
+        """Per-endpoint throughput, latency percentiles and error rate in [start, end)"""
+        by_endpoint = defaultdict(list)
+        for t, endpoint, latency, status in self.samples:
+            if start <= t < end:
+                by_endpoint[endpoint].append((latency, status))
+
+        window = max(end - start, 1e-9)
+        summary = {}
+        for endpoint, rows in sorted(by_endpoint.items()):
+            latencies = np.array([r[0] for r in rows])
+            errors = sum(1 for r in rows if not 200 <= r[1] < 300)
+            summary[endpoint] = {
+                "requests": len(rows),
+                "rps": round(len(rows) / window, 1),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+                "error_rate": round(errors / len(rows), 4),
+                "shed": sum(1 for r in rows if r[1] == 503)
+            }
+        return summary
+
+
+def print_summary(title, summary):
+    """Print one report table"""
+    print(f"\n{title}")
+    print(f"  {'endpoint':32} {'req':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'shed':>5}")
+    for endpoint, s in summary.items():
+        print(f"  {endpoint:32} {s['requests']:>6} {s['rps']:>7} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+              f"{s['p99_ms']:>8} {s['error_rate'] * 100:>6.2f} {s['shed']:>5}")
+
+
+async def run_phase(client, args, scale, recorder):
+    """Replay the schedule for --duration seconds at the given entity scale"""
+    rng = random.Random(args.seed + scale)
+    counts = {
+        "hospital": args.hospitals * scale,
+        "lab": args.labs * scale,
+        "pharmacy": args.pharmacies * scale,
+        "supplier": args.suppliers * scale,
+        "city": 1,
+    }
+    state = CityState(counts, rng)
+    stop_at = time.perf_counter() + args.duration
+    in_flight = set()
+
+    async def fire(endpoint, body):
+        start = time.perf_counter()
+        try:
+            response = await client.post(endpoint, json=body)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        recorder.record(endpoint, (time.perf_counter() - start) * 1000, status)
+
+    async def entity_loop(kind, endpoint, interval, index):
+        period = interval / args.time_scale
+        await asyncio.sleep(rng.uniform(0, period))  # Agents start at different offsets
+        while time.perf_counter() < stop_at:
+            task = asyncio.create_task(fire(endpoint, state.payload(kind, index)))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            await asyncio.sleep(period * (1 + rng.uniform(-args.jitter, args.jitter)))
+
+    async def simulator_loop():
+        while time.perf_counter() < stop_at:
+            await asyncio.sleep(SIMULATOR_INTERVAL / args.time_scale)
+            state.drift()
+
+    async def burst_loop():
+        if args.burst_at is None:
+            return
+        await asyncio.sleep(args.burst_at)
+        state.outbreak = args.burst_multiplier
+        await asyncio.sleep(args.burst_duration)
+        state.outbreak = 1.0
+
+    async def report_loop(phase_start):
+        window_start = phase_start
+        while time.perf_counter() < stop_at:
+            await asyncio.sleep(args.report_interval)
+            now = time.perf_counter()
+            summary = recorder.summarize(window_start, now)
+            if summary:
+                label = " (outbreak burst)" if state.outbreak > 1 else ""
+                print_summary(f"[scale x{scale}] t={now - phase_start:5.1f}s{label}", summary)
+            window_start = now
+
+    phase_start = time.perf_counter()
+    loops = [
+        entity_loop(kind, endpoint, interval, i)
+        for kind, endpoint, interval in SCHEDULE
+        for i in range(counts[kind])
+    ]
+    await asyncio.gather(*loops, simulator_loop(), burst_loop(), report_loop(phase_start))
+    if in_flight:
+        await asyncio.wait(in_flight, timeout=args.drain_timeout)
+
+    return recorder.summarize(phase_start, time.perf_counter())
+
+
+async def main(args):
+    if args.target == "asgi":
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://ml-service"
+    else:
+        transport = None
+        base_url = args.target
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        saturation = {}
+        for scale in [int(s) for s in args.ramp.split(",")]:
+            recorder = LoadRecorder()
+            summary = await run_phase(client, args, scale, recorder)
+            print_summary(f"=== Phase summary: entity scale x{scale} ===", summary)
+
+            for endpoint, s in summary.items():
+                if endpoint in saturation:
+                    continue
+                if s["p99_ms"] > args.slo_ms or s["error_rate"] > args.max_error_rate:
+                    saturation[endpoint] = scale
+
+        print("\n=== Saturation ===")
+        for _, endpoint, _ in SCHEDULE:
+            scale = saturation.get(endpoint)
+            print(f"  {endpoint:32} {'saturates at x' + str(scale) if scale else 'not saturated'}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay Node agent traffic against the ML service")
+    parser.add_argument("--target", default="asgi", help="'asgi' for in-process, or a base URL")
+    parser.add_argument("--hospitals", type=int, default=10)
+    parser.add_argument("--labs", type=int, default=6)
+    parser.add_argument("--pharmacies", type=int, default=3)
+    parser.add_argument("--suppliers", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per phase")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Compress tick intervals by this factor")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Tick jitter as a fraction of the interval")
+    parser.add_argument("--burst-at", type=float, default=None, help="Start an outbreak burst after N seconds")
+    parser.add_argument("--burst-duration", type=float, default=10)
+    parser.add_argument("--burst-multiplier", type=float, default=3.0)
+    parser.add_argument("--ramp", default="1", help="Comma-separated entity scale factors, one phase each")
+    parser.add_argument("--report-interval", type=float, default=10)
+    parser.add_argument("--slo-ms", type=float, default=500, help="p99 latency that counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -3,10 +3,18 @@ HealSync ML Service - FastAPI Backend
 Provides ML-powered predictions for all healthcare agents
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, conint
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import secrets
 import uvicorn
 
 from agents.lab_agent import LabAgent
@@ -14,6 +22,28 @@ from agents.city_agent import CityAgent
 from agents.hospital_agent import HospitalAgent
 from agents.pharmacy_agent import PharmacyAgent
 from agents.supplier_agent import SupplierAgent
+from agents.schemas import URGENCY_ALIASES, HospitalCapacity, Medicine, SupplierOrder
+from engines.change_detector import ChangeDetector
+from engines.cps_sensitivity import CPSSensitivity
+from engines.delivery_planner import DeliveryPlanner
+from engines.feature_store import FeatureStore
+from engines.heatmap_engine import HeatmapEngine
+from engines.order_book import OrderBook
+from engines.reactive_graph import ReactiveGraph
+from engines.rollup_engine import RollupEngine
+from engines.scan_engine import ScanEngine
+from engines.scenario_engine import ScenarioEngine
+from engines.seir_engine import SEIREngine
+from engines.stock_ledger import StockLedger
+from engines.stockout_index import StockoutIndex
+from engines.transfer_planner import TransferPlanner
+from serving.admission import AdmissionController, AdmissionMiddleware
+from serving.compression import GzipRequestMiddleware
+from serving.conditional import ConditionalMiddleware, ConditionalResponder
+from serving.microbatch import MicroBatcher
+from serving.sharding import CityShardRegistry, ShardRouter, ShardRouterMiddleware, ADMIN_TOKEN_HEADER, FORWARDED_HEADER
+from serving.singleflight import SingleFlight
+from serving.tracing import Tracer, TracingMiddleware
 
 app = FastAPI(
     title="HealSync ML Service",
@@ -21,29 +51,167 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS middleware to allow Node.js backend to call this service
+# Spans per endpoint and agent method; Node agents' traceparent decides sampling
+tracer = Tracer(
+    sample_rate=float(os.environ.get("ML_TRACE_SAMPLE_RATE", "0")),
+    export_path=os.environ.get("ML_TRACE_FILE") or None
+)
+app.router.route_class = tracer.route_class()
+
+app.add_middleware(
+    TracingMiddleware,
+    tracer=tracer,
+    exempt_paths={"/", "/health", "/metrics", "/traces", "/docs", "/openapi.json", "/redoc"}
+)
+
+# Initialize agents (every method, helpers included, gets a span when traced)
+lab_agent = tracer.instrument(LabAgent())
+hospital_agent = tracer.instrument(HospitalAgent())
+pharmacy_agent = tracer.instrument(PharmacyAgent())
+supplier_agent = tracer.instrument(SupplierAgent())
+
+def _city_file(directory: str, city_id: str, extension: str, legacy_suffixes: Tuple[str, ...] = ("",)) -> str:
+    """
+    Per-city file: readable city prefix plus a hash of the exact city_id, so
+    ids that sanitise alike ("pune/1", "pune_1") never share a file. A file
+    under the old unhashed name is renamed on first open
+    """
+    readable = re.sub(r"[^A-Za-z0-9_.-]", "_", city_id)
+    digest = hashlib.blake2b(city_id.encode(), digest_size=6).hexdigest()
+    path = os.path.join(directory, f"{readable[:64]}-{digest}{extension}")
+    legacy = os.path.join(directory, readable + extension)
+    if not os.path.exists(path) and os.path.exists(legacy):
+        for suffix in legacy_suffixes:
+            if os.path.exists(legacy + suffix):
+                os.replace(legacy + suffix, path + suffix)
+    return path
+
+# Durable per-city order books; a city's file is reopened by whichever worker owns it
+ORDER_BOOK_DIR = os.environ.get(
+    "ML_ORDER_BOOK_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "order_books")
+)
+
+def _open_order_book(city_id: str) -> OrderBook:
+    return OrderBook(_city_file(ORDER_BOOK_DIR, city_id, ".db", legacy_suffixes=("", "-wal", "-shm")))
+
+# Per-city pharmacy event logs and checkpoints (stock ledger is rebuilt from them on start)
+LEDGER_DIR = os.environ.get(
+    "ML_LEDGER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "stock_ledgers")
+)
+
+def _open_stock_ledger(city_id: str) -> StockLedger:
+    return StockLedger(_city_file(LEDGER_DIR, city_id, ".jsonl"))
+
+# Seed entities (backend/data) are loaded into this city's feature store
+SEED_CITY = os.environ.get("ML_SEED_CITY", "default")
+SEED_DATA_DIR = os.environ.get(
+    "ML_SEED_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+)
+
+def _open_feature_store(city_id: str) -> FeatureStore:
+    feature_store = FeatureStore()
+    if city_id == SEED_CITY and os.path.isdir(SEED_DATA_DIR):
+        feature_store.load_seed(SEED_DATA_DIR)
+    return feature_store
+
+def _traced(factory: Callable, private: bool = False) -> Callable:
+    """Factory whose instances are instrumented (engines: public methods only)"""
+    return lambda *args: tracer.instrument(factory(*args), private=private)
+
+# Per-city state (CityAgent, heatmap grids), owned by one worker per city
+shard_registry = CityShardRegistry({
+    "city_agent": _traced(CityAgent, private=True),
+    "cps_sensitivity": _traced(CPSSensitivity),
+    "heatmap_engine": _traced(HeatmapEngine),
+    "stock_index": _traced(StockoutIndex),
+    "scan_engine": _traced(ScanEngine),
+    "change_detector": _traced(ChangeDetector),
+    "seir_engine": _traced(SEIREngine),
+    "delivery_planner": _traced(DeliveryPlanner),
+    "transfer_planner": _traced(TransferPlanner),
+    "reactive_graph": _traced(ReactiveGraph),
+    "rollup_engine": _traced(RollupEngine)
+}, city_factories={
+    "order_book": _traced(_open_order_book),
+    "stock_ledger": _traced(_open_stock_ledger),
+    "feature_store": _traced(_open_feature_store)
+})
+
+# What-if runs fan out to one process pool shared by all cities
+scenario_engine = tracer.instrument(ScenarioEngine(), private=False)
+
+# Coalesce concurrent identical agent calls (bypassed for /prioritize/orders)
+single_flight = SingleFlight()
+
+# Priority-aware admission control: queue by class, shed low classes first
+admission_controller = AdmissionController(urgency_weights={
+    **supplier_agent.URGENCY_WEIGHTS,
+    **{alias: supplier_agent.URGENCY_WEIGHTS[level] for alias, level in URGENCY_ALIASES.items()}
+})
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+def _outbreak_batch(labs: List[Dict]) -> List[List[dict]]:
+    """Batched /predict/outbreak: one vectorized call per include_uncertainty value"""
+    results = [None] * len(labs)
+    for flag in (False, True):
+        indices = [i for i, lab in enumerate(labs) if lab["include_uncertainty"] == flag]
+        if indices:
+            batch = lab_agent.predict_outbreak_batch([labs[i] for i in indices], include_uncertainty=flag)
+            for i, predictions in zip(indices, batch):
+                results[i] = predictions
+    return results
+
+# Gather single-entity requests into vectorized agent calls (adaptive window).
+# No more than MAX_CONCURRENT requests are ever admitted, so a batch of that
+# size is full and dispatches without waiting
+micro_batcher = MicroBatcher(max_batch=admission_controller.MAX_CONCURRENT)
+micro_batcher.register("/predict/outbreak", _outbreak_batch)
+micro_batcher.register("/calculate/hospital_strain", hospital_agent.calculate_hospital_strain_batch)
+micro_batcher.register("/classify/pharmacy_demand", pharmacy_agent.classify_medicine_demand_batch)
+
+# ETag / If-None-Match and JSON-patch deltas for polling clients (outermost,
+# so 304s for unchanged inputs never queue)
+conditional_responder = ConditionalResponder(service_version=app.version)
+app.add_middleware(ConditionalMiddleware, responder=conditional_responder)
+
+# Forward each request to the worker owning its city
+shard_router = ShardRouter(shard_registry)
+app.add_middleware(ShardRouterMiddleware, router=shard_router)
+
+# Gzip on the wire (outside all but CORS): responses for clients that accept it,
+# request bodies inflated before any layer reads them
+app.add_middleware(GZipMiddleware, minimum_size=4096, compresslevel=5)
+app.add_middleware(GzipRequestMiddleware)
+
+# CORS middleware to allow Node.js backend to call this service. Added last so
+# it wraps every layer: shed 503/429s, shard router replies and conditional
+# 304s carry the CORS headers too, and browsers can read Retry-After / ETag
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:4000", "http://localhost:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "ETag"],
 )
 
-# Initialize agents
-lab_agent = LabAgent()
-city_agent = CityAgent()
-hospital_agent = HospitalAgent()
-pharmacy_agent = PharmacyAgent()
-supplier_agent = SupplierAgent()
+# Load the seed entities at startup on the worker that owns the seed city
+if shard_router.owner(SEED_CITY) == shard_router.worker_id:
+    shard_registry.get(SEED_CITY, "feature_store")
 
 # ============= PYDANTIC MODELS =============
 
 class OutbreakPredictionRequest(BaseModel):
     """Request model for outbreak prediction"""
-    current_tests: Dict[str, int]  # e.g., {"dengue": 24, "malaria": 5}
-    baseline_tests: Dict[str, int]  # e.g., {"dengue": 8, "malaria": 3}
-    positive_tests: Optional[Dict[str, int]] = None
+    current_tests: Dict[str, conint(ge=0)]  # e.g., {"dengue": 24, "malaria": 5}
+    baseline_tests: Dict[str, conint(ge=0)]  # e.g., {"dengue": 8, "malaria": 3}
+    positive_tests: Optional[Dict[str, conint(ge=0)]] = None
+    include_uncertainty: Optional[bool] = False  # Adds interval + P(outbreak)
+    lab_id: Optional[str] = None  # Set to also record the predictions in the metric rollups
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 class OutbreakPredictionResponse(BaseModel):
     """Response model for outbreak prediction"""
@@ -53,13 +221,60 @@ class OutbreakPredictionResponse(BaseModel):
     predicted_cases_24h: int
     recommendation: str
     trigger_outbreak: bool
+    predicted_cases_interval: Optional[List[int]] = None  # [low, high]
+    interval_level: Optional[float] = None
+    outbreak_probability: Optional[float] = None
+
+class LabTestsInput(BaseModel):
+    """Test counts for one lab in a batch outbreak request"""
+    lab_id: Optional[str] = None
+    current_tests: Dict[str, conint(ge=0)]
+    baseline_tests: Dict[str, conint(ge=0)]
+    positive_tests: Optional[Dict[str, conint(ge=0)]] = None
+
+class LabChangeInput(BaseModel):
+    """Today's test counts for one lab's change detectors"""
+    lab_id: str
+    current_tests: Dict[str, conint(ge=0)]
+    positive_tests: Optional[Dict[str, conint(ge=0)]] = None
+    baseline_tests: Optional[Dict[str, conint(ge=0)]] = None  # Default: detector's learned baseline
+
+class LabChangeRequest(BaseModel):
+    """Request model for streaming lab change detection (one tick)"""
+    labs: List[LabChangeInput]
+    include_state: Optional[bool] = False  # Chart state of every series, not only alarming / changed ones
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class OutbreakBatchRequest(BaseModel):
+    """Request model for batch outbreak prediction"""
+    labs: List[LabTestsInput]
+    include_uncertainty: Optional[bool] = False
+    n_draws: Optional[int] = Field(default=None, ge=1, le=2048)  # Default: agent's UNCERTAINTY_DRAWS
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 class CrisisPredictionRequest(BaseModel):
     """Request model for city crisis prediction"""
     disease_stats: Dict[str, int]
-    hospital_capacity: Dict
+    hospital_capacity: HospitalCapacity
     medicine_stock: Dict[str, int]
     zone_risks: Dict[str, str]
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class CrisisSnapshot(BaseModel):
+    """One city state, as sent to /predict/crisis"""
+    snapshot_id: Optional[str] = None
+    disease_stats: Dict[str, int]
+    hospital_capacity: HospitalCapacity
+    medicine_stock: Dict[str, int]
+    zone_risks: Dict[str, str]
+
+class CPSSensitivityRequest(BaseModel):
+    """Request model for CPS sensitivity over weight / threshold grids"""
+    snapshots: List[CrisisSnapshot]
+    weights: Optional[List[Tuple[float, float, float, float]]] = None  # disease, capacity, medicine, zone; default: simplex grid
+    weight_step: Optional[float] = 0.05  # Simplex grid spacing when weights are omitted
+    thresholds: Optional[List[Tuple[float, float, float]]] = None  # MEDIUM, ELEVATED, CRITICAL; default: City Agent's
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 class HospitalStrainRequest(BaseModel):
     """Request model for hospital strain calculation"""
@@ -69,18 +284,247 @@ class HospitalStrainRequest(BaseModel):
     icu_available: int
     er_wait_time: int
     incoming_patients: Optional[int] = 0
+    hospital_id: Optional[str] = None  # Set to also record HSI in the metric rollups
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 class PharmacyDemandRequest(BaseModel):
     """Request model for pharmacy demand classification"""
     medicine_stocks: Dict[str, int]
     consumption_rates: Dict[str, int]
     outbreak_alerts: Optional[List[str]] = None
+    pharmacy_id: Optional[str] = None  # Set to also feed the stockout index and metric rollups
+    zone: Optional[str] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 class SupplierOrderRequest(BaseModel):
     """Request model for supplier order prioritization"""
-    orders: List[Dict]
-    inventory: Dict[str, int]
+    orders: List[SupplierOrder]
+    inventory: Dict[Medicine, int]
     delivery_capacity: Optional[int] = 4
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class DeliveryPlanRequest(BaseModel):
+    """Request model for multi-cycle delivery route planning"""
+    orders: List[SupplierOrder] = Field(max_length=2000)  # lat/lng per order, or via locations
+    inventory: Dict[Medicine, int]
+    depot: Dict[str, float]  # Supplier warehouse, e.g., {"lat": 19.11, "lng": 72.87}
+    locations: Optional[Dict[str, Dict[str, float]]] = None  # requester_id -> {"lat", "lng"}
+    delivery_capacity: Optional[int] = Field(default=4, ge=1)  # Vehicles per cycle
+    vehicle_capacity: Optional[int] = Field(default=None, ge=1)  # Units per vehicle (default 500)
+    max_cycles: Optional[int] = Field(default=None, ge=1, le=30)  # Cycles to plan ahead (default 3)
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class TransferHospital(BaseModel):
+    """One hospital's location and capacity for transfer planning"""
+    hospital_id: str
+    lat: float
+    lng: float
+    total_beds: int
+    available_beds: int
+    icu_total: int
+    icu_available: int
+    er_wait_time: int
+    incoming_patients: Optional[int] = 0
+    icu_incoming: Optional[int] = 0
+
+class TransferPlanRequest(BaseModel):
+    """Request model for citywide patient transfer planning"""
+    hospitals: List[TransferHospital]  # Every hospital in the city
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class OrderBookRequest(BaseModel):
+    """Request model for queueing orders in the durable order book"""
+    orders: List[SupplierOrder]  # order_id makes resubmission a no-op
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class FulfillmentCycleRequest(BaseModel):
+    """Request model for one fulfillment cycle over the order book"""
+    inventory: Dict[Medicine, int]
+    delivery_capacity: Optional[int] = 4
+    max_orders: Optional[int] = 200  # Orders pulled from the top of the book
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class LedgerEvent(BaseModel):
+    """One pharmacy stock movement"""
+    pharmacy_id: str
+    medicine: str
+    type: Literal["dispense", "restock", "count"]  # count = physical stock count
+    quantity: int
+    timestamp: Optional[float] = None  # Epoch seconds (default: received time)
+
+class LedgerEventsRequest(BaseModel):
+    """Request model for stock ledger event ingestion"""
+    events: List[LedgerEvent]
+    zones: Optional[Dict[str, str]] = None  # pharmacy_id -> zone for the stockout index
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class SEIRZone(BaseModel):
+    """One zone's population and recent daily lab positives"""
+    zone: str
+    population: int = Field(gt=0)
+    positives: Dict[str, List[conint(ge=0)]]  # disease -> daily positives, oldest first
+
+class ZoneMixing(BaseModel):
+    """Share of from_zone's contacts made in to_zone"""
+    from_zone: str
+    to_zone: str
+    fraction: float = Field(ge=0, le=1)
+
+class EpidemicProjectionRequest(BaseModel):
+    """Request model for SEIR projections across zones and diseases"""
+    zones: List[SEIRZone]
+    days: Optional[int] = 30  # Horizon, up to 90
+    mixing: Optional[List[ZoneMixing]] = None  # Sparse inter-zone contacts
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class FeatureEntity(BaseModel):
+    """One entity upsert; omitted features keep their stored value"""
+    entity_id: str
+    entity_type: Literal["hospital", "lab", "pharmacy", "supplier"]
+    zone: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    # Hospital
+    total_beds: Optional[int] = None
+    available_beds: Optional[int] = None
+    icu_total: Optional[int] = None
+    icu_available: Optional[int] = None
+    er_wait_time: Optional[int] = None
+    incoming_patients: Optional[int] = None
+    icu_incoming: Optional[int] = None
+    # Lab
+    current_tests: Optional[Dict[str, int]] = None
+    baseline_tests: Optional[Dict[str, int]] = None
+    positive_tests: Optional[Dict[str, int]] = None
+    test_capacity: Optional[Dict[str, int]] = None
+    # Pharmacy
+    medicine_stocks: Optional[Dict[str, int]] = None
+    consumption_rates: Optional[Dict[str, int]] = None
+    reorder_levels: Optional[Dict[str, int]] = None
+    # Supplier
+    inventory: Optional[Dict[str, int]] = None
+    incoming: Optional[Dict[str, int]] = None
+
+class FeatureUpsertRequest(BaseModel):
+    """Request model for feature store upserts/removals"""
+    entities: Optional[List[FeatureEntity]] = None
+    remove_ids: Optional[List[str]] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class GraphTickRequest(BaseModel):
+    """Request model for one reactive graph tick"""
+    entities: Optional[List[FeatureEntity]] = None  # Merged into the graph's inputs
+    remove_ids: Optional[List[str]] = None
+    from_feature_store: Optional[bool] = False  # Inputs become the city's stored entities
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class FeatureQueryRequest(BaseModel):
+    """Agent call on stored entities: by IDs, by zone, or both (neither = all)"""
+    entity_ids: Optional[List[str]] = None
+    zone: Optional[str] = None
+    outbreak_alerts: Optional[List[str]] = None  # Pharmacy demand
+    include_uncertainty: Optional[bool] = False  # Outbreak prediction
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class OutbreakShock(BaseModel):
+    """Scale a disease's tests/positives and/or seed new positive cases"""
+    disease: str
+    multiplier: Optional[float] = Field(default=1.0, ge=0)
+    seed_positives: Optional[int] = Field(default=0, ge=0)  # Extra daily positives, split across the labs
+    zones: Optional[List[str]] = None  # None = citywide
+
+class BedLoss(BaseModel):
+    """Share of beds (general and ICU) lost; patients stay"""
+    fraction: float = Field(ge=0, le=1)
+    zones: Optional[List[str]] = None
+    hospital_ids: Optional[List[str]] = None  # Neither = every hospital
+
+class SupplierOutage(BaseModel):
+    """Share of supplier inventory and delivery vehicles lost"""
+    fraction: Optional[float] = Field(default=1.0, ge=0, le=1)
+    zones: Optional[List[str]] = None
+    supplier_ids: Optional[List[str]] = None  # Neither = every supplier
+
+class ScenarioVariant(BaseModel):
+    """One what-if: any combination of perturbations of the base snapshot"""
+    name: str
+    outbreak: Optional[OutbreakShock] = None
+    bed_loss: Optional[BedLoss] = None
+    supplier_outage: Optional[SupplierOutage] = None
+
+class ScenarioRunRequest(BaseModel):
+    """Request model for parallel what-if runs"""
+    variants: List[ScenarioVariant] = Field(max_length=32)  # Each is a full simulation run
+    entities: Optional[List[FeatureEntity]] = None  # Base snapshot; default: the city's feature store
+    days: Optional[int] = 14  # Horizon, up to 60
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class LedgerDemandRequest(BaseModel):
+    """Request model for demand classification on ledger state"""
+    pharmacy_ids: List[str]
+    outbreak_alerts: Optional[List[str]] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class RebalanceRequest(BaseModel):
+    """New worker set for the consistent-hash ring"""
+    workers: Dict[str, str]  # e.g., {"w0": "http://127.0.0.1:8000"}
+
+class HeatmapPoint(BaseModel):
+    """One lab or hospital contributing to the disease heatmap"""
+    entity_id: str
+    entity_type: Optional[str] = "lab"  # lab, hospital
+    lat: float
+    lng: float
+    cases: Dict[str, float]  # e.g., {"dengue": 12, "malaria": 3}
+
+class HeatmapPointsRequest(BaseModel):
+    """Request model for heatmap point upserts/removals"""
+    points: Optional[List[HeatmapPoint]] = None
+    remove_ids: Optional[List[str]] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class StockReport(BaseModel):
+    """One pharmacy's stock and/or consumption update"""
+    pharmacy_id: str
+    zone: Optional[str] = None
+    medicine_stocks: Optional[Dict[str, int]] = None
+    consumption_rates: Optional[Dict[str, int]] = None
+
+class StockReportsRequest(BaseModel):
+    """Request model for stockout index updates/removals"""
+    reports: Optional[List[StockReport]] = None
+    remove_ids: Optional[List[str]] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class ScanLab(BaseModel):
+    """One lab's daily test series for the space-time scan"""
+    lab_id: str
+    lat: float
+    lng: float
+    tests: List[conint(ge=0)]  # Daily tests, oldest first, last = latest day
+    positives: List[conint(ge=0)]  # Daily positive tests, aligned with tests
+
+class ScanRequest(BaseModel):
+    """Request model for space-time outbreak cluster detection"""
+    disease: Optional[str] = None
+    labs: List[ScanLab]
+    n_replicates: Optional[int] = Field(default=None, ge=1, le=999)  # Monte Carlo replicates (default 99)
+    max_neighbors: Optional[int] = Field(default=None, ge=1, le=256)  # Largest circle in labs (default 32)
+    max_window_days: Optional[int] = Field(default=None, ge=1, le=90)  # Longest time window (default 14)
+    seed: Optional[int] = None
+    city_id: Optional[str] = "default"  # City/tenant shard key
+
+class MetricPoint(BaseModel):
+    """One metric sample for the rollups"""
+    entity_id: str
+    metric: str
+    value: float
+    timestamp: Optional[float] = None  # Epoch seconds (default: received time)
+
+class MetricPointsRequest(BaseModel):
+    """Request model for recording metric samples"""
+    points: List[MetricPoint]
+    city_id: Optional[str] = "default"  # City/tenant shard key
 
 # ============= API ENDPOINTS =============
 
@@ -99,7 +543,97 @@ async def health_check():
     """Service health check"""
     return {"status": "healthy", "service": "ml_service"}
 
-@app.post("/predict/outbreak", response_model=List[OutbreakPredictionResponse])
+@app.get("/metrics")
+async def get_metrics():
+    """Serving-layer metrics (coalescing, admission control, conditional responses)"""
+    return {
+        "singleflight": single_flight.get_metrics(),
+        "microbatch": micro_batcher.get_metrics(),
+        "admission": admission_controller.get_metrics(),
+        "conditional": conditional_responder.get_metrics(),
+        "sharding": shard_router.get_metrics(),
+        "tracing": tracer.get_metrics()
+    }
+
+@app.get("/traces")
+async def get_traces(name: Optional[str] = None, min_duration_ms: Optional[float] = None, limit: int = 20):
+    """Recent sampled request traces (newest first), filterable by path and duration"""
+    return {"traces": tracer.query(name=name, min_duration_ms=min_duration_ms, limit=limit)}
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All buffered spans of one trace (e.g. the traceparent trace id a Node agent sent)"""
+    spans = tracer.get_trace(trace_id.lower())
+    if not spans:
+        raise HTTPException(status_code=404, detail=f"Trace '{trace_id}' not buffered")
+    return {"trace_id": trace_id.lower(), "spans": spans}
+
+@app.get("/shards")
+async def get_shards():
+    """Ring ownership and per-shard load for this worker"""
+    return shard_router.get_metrics()
+
+@app.post("/shards/rebalance")
+async def rebalance_shards(request: RebalanceRequest, http_request: Request):
+    """
+    Apply a new worker set and propagate it to every old and new worker
+    
+    Requires the shared ML_ADMIN_TOKEN in X-Admin-Token. Each worker evicts
+    the cities it no longer owns; their in-memory state is not transferred
+    """
+    token = http_request.headers.get(ADMIN_TOKEN_HEADER)
+    if shard_router.admin_token is None:
+        raise HTTPException(status_code=403, detail="Rebalancing is disabled: set ML_ADMIN_TOKEN on every worker")
+    if not shard_router.authorized(token):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+    peers = {**shard_router.workers, **request.workers}
+    result = shard_router.rebalance(request.workers)
+    
+    if http_request.headers.get(FORWARDED_HEADER) is None:
+        others = [w for w in peers if w != shard_router.worker_id and peers[w]]
+        responses = await asyncio.gather(*[
+            shard_router.forward(w, "POST", "/shards/rebalance", b"",
+                                 [(b"content-type", b"application/json"),
+                                  (ADMIN_TOKEN_HEADER.encode(), token.encode())],
+                                 request.model_dump_json().encode(), base_url=peers[w])
+            for w in others
+        ], return_exceptions=True)
+        result["peers"] = {
+            w: (r.json() if not isinstance(r, Exception) and r.status_code == 200 else {"error": str(r)})
+            for w, r in zip(others, responses)
+        }
+    return result
+
+# Metric rollup points of agent results (entity_id, metric, value)
+
+def _record_metrics(city_id: str, points: List[tuple]):
+    if points:
+        shard_registry.get(city_id, "rollup_engine").record(points)
+
+def _outbreak_points(lab_id: str, predictions: List[dict]) -> List[tuple]:
+    return [
+        point
+        for prediction in predictions
+        for point in (
+            (lab_id, f"positive_rate:{prediction['disease']}", prediction['positive_rate']),
+            (lab_id, f"predicted_cases:{prediction['disease']}", prediction['predicted_cases_24h'])
+        )
+    ]
+
+def _hospital_points(hospital_id: str, result: Dict) -> List[tuple]:
+    return [(hospital_id, "hsi", result['hsi_score'])]
+
+def _pharmacy_points(pharmacy_id: str, result: Dict) -> List[tuple]:
+    return [(pharmacy_id, f"stock:{c['medicine']}", c['current_stock']) for c in result['classifications']]
+
+def _crisis_points(result: Dict) -> List[tuple]:
+    return [("city", "cps", result['cps_score'])]
+
+@app.post(
+    "/predict/outbreak",
+    response_model=List[OutbreakPredictionResponse],
+    response_model_exclude_none=True
+)
 async def predict_outbreak(request: OutbreakPredictionRequest):
     """
     Lab Agent: Predict disease outbreak using Linear Regression
@@ -109,17 +643,58 @@ async def predict_outbreak(request: OutbreakPredictionRequest):
     where m = (Q_current - Q_baseline) / t
     
     Rule: If Q_future exceeds 2x baseline AND positive cases spike, trigger OUTBREAK DETECTED
+    
+    Set include_uncertainty to also get a 90% prediction interval and
+    P(outbreak) from a negative-binomial bootstrap of the same rule
     """
     try:
-        predictions = lab_agent.predict_outbreak(
-            current_tests=request.current_tests,
-            baseline_tests=request.baseline_tests,
-            positive_tests=request.positive_tests or {}
+        predictions = await single_flight.run(
+            "/predict/outbreak",
+            request.model_dump(),
+            micro_batcher.submit,
+            "/predict/outbreak",
+            {
+                "current_tests": request.current_tests,
+                "baseline_tests": request.baseline_tests,
+                "positive_tests": request.positive_tests or {},
+                "include_uncertainty": bool(request.include_uncertainty)
+            }
         )
+        if request.lab_id:
+            _record_metrics(request.city_id, _outbreak_points(request.lab_id, predictions))
         return predictions
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/outbreak/batch")
+async def predict_outbreak_batch(request: OutbreakBatchRequest):
+    """
+    Lab Agent: Outbreak prediction for many labs in one call
+    
+    With include_uncertainty, all labs x diseases are bootstrapped in a
+    single vectorized pass
+    """
+    try:
+        results = await single_flight.run(
+            "/predict/outbreak/batch",
+            request.model_dump(),
+            lab_agent.predict_outbreak_batch,
+            labs=[lab.model_dump() for lab in request.labs],
+            include_uncertainty=bool(request.include_uncertainty),
+            n_draws=request.n_draws
+        )
+        _record_metrics(request.city_id, [
+            point
+            for lab, predictions in zip(request.labs, results) if lab.lab_id
+            for point in _outbreak_points(lab.lab_id, predictions)
+        ])
+        return [
+            {"lab_id": lab.lab_id, "predictions": predictions}
+            for lab, predictions in zip(request.labs, results)
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/predict/crisis")
 async def predict_crisis(request: CrisisPredictionRequest):
     """
@@ -129,16 +704,42 @@ async def predict_crisis(request: CrisisPredictionRequest):
     Rule: If CPS is ELEVATED, trigger Gemini API call for advisory
     """
     try:
-        prediction = city_agent.predict_crisis(
+        prediction = await single_flight.run(
+            "/predict/crisis",
+            request.model_dump(),
+            shard_registry.get(request.city_id, "city_agent").predict_crisis,
             disease_stats=request.disease_stats,
             hospital_capacity=request.hospital_capacity,
             medicine_stock=request.medicine_stock,
             zone_risks=request.zone_risks
         )
+        _record_metrics(request.city_id, _crisis_points(prediction))
         return prediction
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/cps_sensitivity")
+async def analyze_cps_sensitivity(request: CPSSensitivityRequest):
+    """
+    City Agent: How fragile each snapshot's CPS severity is
+    
+    Formula: CPS = W @ S^T for every weight vector x snapshot, tiered under
+    every threshold set; reports tier-flip boundaries and the smallest weight
+    change to the nearest tier change per snapshot
+    """
+    try:
+        return await single_flight.run(
+            "/analyze/cps_sensitivity",
+            request.model_dump(),
+            shard_registry.get(request.city_id, "cps_sensitivity").analyze,
+            [snapshot.model_dump() for snapshot in request.snapshots],
+            weights=request.weights,
+            thresholds=request.thresholds,
+            weight_step=request.weight_step
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/calculate/hospital_strain")
 async def calculate_hospital_strain(request: HospitalStrainRequest):
     """
@@ -148,14 +749,22 @@ async def calculate_hospital_strain(request: HospitalStrainRequest):
     Rule: If HSI is ELEVATED, send resource request to Supplier Agent
     """
     try:
-        result = hospital_agent.calculate_hospital_strain(
-            total_beds=request.total_beds,
-            available_beds=request.available_beds,
-            icu_total=request.icu_total,
-            icu_available=request.icu_available,
-            er_wait_time=request.er_wait_time,
-            incoming_patients=request.incoming_patients
+        result = await single_flight.run(
+            "/calculate/hospital_strain",
+            request.model_dump(),
+            micro_batcher.submit,
+            "/calculate/hospital_strain",
+            {
+                "total_beds": request.total_beds,
+                "available_beds": request.available_beds,
+                "icu_total": request.icu_total,
+                "icu_available": request.icu_available,
+                "er_wait_time": request.er_wait_time,
+                "incoming_patients": request.incoming_patients
+            }
         )
+        if request.hospital_id:
+            _record_metrics(request.city_id, _hospital_points(request.hospital_id, result))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -169,11 +778,26 @@ async def classify_pharmacy_demand(request: PharmacyDemandRequest):
     Rule: If demand is SURGE, place pre-emptive order to Supplier
     """
     try:
-        result = pharmacy_agent.classify_medicine_demand(
-            medicine_stocks=request.medicine_stocks,
-            consumption_rates=request.consumption_rates,
-            outbreak_alerts=request.outbreak_alerts
+        if request.pharmacy_id:
+            shard_registry.get(request.city_id, "stock_index").report(
+                request.pharmacy_id,
+                request.medicine_stocks,
+                request.consumption_rates,
+                zone=request.zone
+            )
+        result = await single_flight.run(
+            "/classify/pharmacy_demand",
+            request.model_dump(),
+            micro_batcher.submit,
+            "/classify/pharmacy_demand",
+            {
+                "medicine_stocks": request.medicine_stocks,
+                "consumption_rates": request.consumption_rates,
+                "outbreak_alerts": request.outbreak_alerts
+            }
         )
+        if request.pharmacy_id:
+            _record_metrics(request.city_id, _pharmacy_points(request.pharmacy_id, result))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -187,18 +811,735 @@ async def prioritize_orders(request: SupplierOrderRequest):
     Rule: Fulfill strictly by Priority Score (highest first)
     """
     try:
-        result = supplier_agent.prioritize_orders(
+        result = await single_flight.run(
+            "/prioritize/orders",
+            None,
+            supplier_agent.prioritize_orders,
             orders=request.orders,
             inventory=request.inventory,
-            delivery_capacity=request.delivery_capacity
+            delivery_capacity=request.delivery_capacity,
+            validate=False  # Already validated against SupplierOrder
         )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _plan_deliveries(planner: DeliveryPlanner, request: DeliveryPlanRequest) -> Dict:
+    """Allocate stock by Priority Score, then route every allocated order"""
+    allocation = supplier_agent.prioritize_orders(
+        orders=request.orders,
+        inventory=request.inventory,
+        delivery_capacity=len(request.orders),  # Vehicles are the planner's concern
+        validate=False
+    )
+    plan = planner.plan(
+        allocation['fulfilled_orders'],
+        depot=request.depot,
+        vehicles=request.delivery_capacity,
+        vehicle_capacity=request.vehicle_capacity,
+        max_cycles=request.max_cycles,
+        locations=request.locations
+    )
+    return {
+        **plan,
+        'stock_pending_orders': allocation['pending_orders'],
+        'inventory_status': allocation['inventory_status']
+    }
+
+@app.post("/plan/deliveries")
+async def plan_deliveries(request: DeliveryPlanRequest):
+    """
+    Supplier Agent + Delivery Planner: Multi-order vehicle routes across cycles
+    
+    Savings-algorithm routes under the vehicle capacity, improved with 2-opt;
+    orders that do not fit this cycle are spread over the next ones
+    """
+    try:
+        planner = shard_registry.get(request.city_id, "delivery_planner")
+        return await single_flight.run(
+            "/plan/deliveries",
+            request.model_dump(),
+            _plan_deliveries,
+            planner,
+            request
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _plan_transfers(planner: TransferPlanner, hospitals: List[Dict]) -> Dict:
+    """Score every hospital's HSI in one batch, then solve the transfers"""
+    strain = hospital_agent.calculate_hospital_strain_batch(hospitals)
+    return planner.plan(hospitals, [result["hsi_score"] for result in strain])
+
+@app.post("/plan/transfers")
+async def plan_transfers(request: TransferPlanRequest):
+    """
+    Hospital Agent + Transfer Planner: Move overflow patients out of
+    CRITICAL hospitals
+    
+    Min-cost assignment (general and ICU) weighted by distance and the
+    receiving hospital's HSI
+    """
+    try:
+        planner = shard_registry.get(request.city_id, "transfer_planner")
+        return await single_flight.run(
+            "/plan/transfers",
+            request.model_dump(),
+            _plan_transfers,
+            planner,
+            [hospital.model_dump() for hospital in request.hospitals]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= ORDER BOOK ENDPOINTS =============
+
+@app.post("/orders/book")
+async def submit_orders(request: OrderBookRequest):
+    """
+    Order Book: Queue orders durably for upcoming fulfillment cycles
+    
+    Orders already in the book (same order_id) are reported as duplicates
+    """
+    try:
+        order_book = shard_registry.get(request.city_id, "order_book")
+        return await single_flight.run(
+            "/orders/book",
+            None,
+            order_book.submit,
+            request.orders,
+            supplier_agent.score_orders(request.orders),
+            bypass=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/orders/cycle")
+async def run_fulfillment_cycle(request: FulfillmentCycleRequest):
+    """
+    Order Book + Supplier Agent: Fulfill the top of the book
+    
+    Orders are ranked by aged priority (Priority Score + points per hour
+    waited); whatever is not delivered stays in the book
+    """
+    def fulfill(orders: List[Dict]) -> Dict[str, int]:
+        result.update(supplier_agent.prioritize_orders(
+            orders=orders,
+            inventory=request.inventory,
+            delivery_capacity=request.delivery_capacity,
+            validate=False,  # Validated on submission
+            priority_scores=[order['aged_priority'] for order in orders]
+        ))
+        return {o['order_id']: o['allocated_quantity'] for o in result['fulfilled_orders']}
+
+    try:
+        order_book = shard_registry.get(request.city_id, "order_book")
+        result = {}
+        outcome = await single_flight.run(
+            "/orders/cycle",
+            None,
+            order_book.run_cycle,
+            request.max_orders,
+            fulfill,
+            bypass=True
+        )
+        result['order_book'] = {
+            'pulled': len(outcome['orders']),
+            'fulfilled': outcome['fulfilled'],
+            'partial': outcome['partial'],
+            'pending': outcome['pending']
+        }
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/orders/book")
+async def get_order_book(limit: int = 20, city_id: Optional[str] = "default"):
+    """Order Book: Top pending orders by aged priority, plus queue stats"""
+    try:
+        order_book = shard_registry.get(city_id, "order_book")
+        return {"orders": order_book.top(limit), **order_book.get_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= HEATMAP ENDPOINTS =============
+
+@app.post("/heatmap/points")
+async def update_heatmap_points(request: HeatmapPointsRequest):
+    """
+    Heatmap Engine: Upsert or remove lab/hospital case points
+    
+    Only grid cells within the neighbor cutoff of changed entities are
+    recomputed unless many entities changed at once
+    """
+    try:
+        heatmap_engine = shard_registry.get(request.city_id, "heatmap_engine")
+        result = {}
+        if request.remove_ids:
+            result = heatmap_engine.remove_points(request.remove_ids)
+        if request.points:
+            result = heatmap_engine.upsert_points([p.model_dump() for p in request.points])
+        return result or {"changed_entities": 0, "version": heatmap_engine.version}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/heatmap/{disease}")
+async def get_heatmap_info(disease: str, city_id: Optional[str] = "default"):
+    """Heatmap Engine: Grid bounds, tile layout and scale for a disease"""
+    info = shard_registry.get(city_id, "heatmap_engine").get_grid_info(disease.lower())
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"No heatmap for '{disease}'")
+    return info
+
+@app.get("/heatmap/{disease}/tiles/{row}/{col}")
+async def get_heatmap_tile(disease: str, row: int, col: int, city_id: Optional[str] = "default"):
+    """
+    Heatmap Engine: One IDW-interpolated tile
+    
+    Cells are uint8 (0-255 of the disease-wide max), row-major, base64-encoded
+    """
+    tile = shard_registry.get(city_id, "heatmap_engine").get_tile(disease.lower(), row, col)
+    if tile is None:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return tile
+
+# ============= STOCKOUT INDEX ENDPOINTS =============
+
+@app.post("/stock/reports")
+async def update_stock_reports(request: StockReportsRequest):
+    """
+    Stockout Index: Apply pharmacy stock/consumption reports
+    
+    Only the reported (pharmacy, medicine) pairs are re-ranked
+    """
+    try:
+        stock_index = shard_registry.get(request.city_id, "stock_index")
+        removed = 0
+        updated = 0
+        if request.remove_ids:
+            removed = stock_index.remove_pharmacies(request.remove_ids)["removed"]
+        for report in request.reports or []:
+            updated += stock_index.report(
+                report.pharmacy_id,
+                report.medicine_stocks,
+                report.consumption_rates,
+                zone=report.zone
+            )["updated"]
+        stats = stock_index.get_stats()
+        return {
+            "updated": updated,
+            "removed": removed,
+            "indexed": stats["indexed"],
+            "version": stats["version"]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stock/runs_out_first")
+async def get_runs_out_first(
+    k: int = 10,
+    zone: Optional[str] = None,
+    medicine: Optional[str] = None,
+    max_days: Optional[float] = None,
+    city_id: Optional[str] = "default"
+):
+    """
+    Stockout Index: Medicines that will stock out first across the city
+    
+    Filter by zone and/or medicine; O(k log n) per query
+    """
+    try:
+        stock_index = shard_registry.get(city_id, "stock_index")
+        return {
+            "items": stock_index.runs_out_first(k, zone=zone, medicine=medicine, max_days=max_days),
+            "version": stock_index.version
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= STOCK LEDGER ENDPOINTS =============
+
+def _ingest_ledger_events(city_id: str, events: List[Dict], zones: Optional[Dict[str, str]]) -> Dict:
+    """Apply events, then re-rank the touched pharmacies in the stockout index"""
+    stock_ledger = shard_registry.get(city_id, "stock_ledger")
+    stock_index = shard_registry.get(city_id, "stock_index")
+    result = stock_ledger.ingest(events)
+    zones = zones or {}
+    for pharmacy_id, snapshot in stock_ledger.snapshot(result["pharmacies"]).items():
+        stock_index.report(
+            pharmacy_id,
+            snapshot["medicine_stocks"],
+            snapshot["consumption_rates"],
+            zone=zones.get(pharmacy_id)
+        )
+    return {
+        "applied": result["applied"],
+        "rejected": result["rejected"],
+        "pharmacies_updated": len(result["pharmacies"]),
+        "version": result["version"]
+    }
+
+@app.post("/ledger/events")
+async def ingest_ledger_events(request: LedgerEventsRequest):
+    """
+    Stock Ledger: Ingest dispense / restock / count events
+    
+    Stock and EWMA daily consumption are updated in O(1) per event and the
+    stockout index follows
+    """
+    try:
+        return await single_flight.run(
+            "/ledger/events",
+            None,
+            _ingest_ledger_events,
+            request.city_id,
+            [event.model_dump() for event in request.events],
+            request.zones,
+            bypass=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _classify_ledger_demand(city_id: str, pharmacy_ids: List[str], outbreak_alerts: Optional[List[str]]) -> Dict:
+    """Pharmacy Agent classification with stock and consumption from the ledger"""
+    snapshots = shard_registry.get(city_id, "stock_ledger").snapshot(pharmacy_ids)
+    found = [pharmacy_id for pharmacy_id in pharmacy_ids if pharmacy_id in snapshots]
+    results = pharmacy_agent.classify_medicine_demand_batch([
+        {
+            "medicine_stocks": snapshots[pharmacy_id]["medicine_stocks"],
+            "consumption_rates": snapshots[pharmacy_id]["consumption_rates"],
+            "outbreak_alerts": outbreak_alerts
+        }
+        for pharmacy_id in found
+    ])
+    return {
+        "pharmacies": [
+            {"pharmacy_id": pharmacy_id, **result, "estimates": snapshots[pharmacy_id]["estimates"]}
+            for pharmacy_id, result in zip(found, results)
+        ],
+        "unknown_pharmacies": [pharmacy_id for pharmacy_id in pharmacy_ids if pharmacy_id not in snapshots]
+    }
+
+@app.post("/ledger/classify")
+async def classify_ledger_demand(request: LedgerDemandRequest):
+    """
+    Pharmacy Agent on Stock Ledger state: Classify demand without client snapshots
+    
+    Formula: Classification Rule-Set on ledger stock and EWMA consumption
+    Rule: If demand is SURGE, place pre-emptive order to Supplier
+    """
+    try:
+        return await single_flight.run(
+            "/ledger/classify",
+            request.model_dump(),
+            _classify_ledger_demand,
+            request.city_id,
+            request.pharmacy_ids,
+            request.outbreak_alerts
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/ledger/pharmacies/{pharmacy_id}")
+async def get_ledger_pharmacy(pharmacy_id: str, city_id: Optional[str] = "default"):
+    """Stock Ledger: Current stock and consumption estimates of one pharmacy"""
+    stock_ledger = shard_registry.get(city_id, "stock_ledger")
+    snapshot = stock_ledger.snapshot([pharmacy_id]).get(pharmacy_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Pharmacy '{pharmacy_id}' has no ledger events")
+    return {"pharmacy_id": pharmacy_id, **snapshot, "ledger": stock_ledger.get_stats()}
+
+# ============= EPIDEMIC PROJECTION ENDPOINTS =============
+
+@app.post("/project/epidemic")
+async def project_epidemic(request: EpidemicProjectionRequest):
+    """
+    SEIR Engine: 14-30+ day projections for every zone x disease
+    
+    Formula: SEIRS compartments integrated with RK4, beta fitted from the
+    recent growth of lab positives; optional sparse inter-zone mixing
+    """
+    try:
+        return await single_flight.run(
+            "/project/epidemic",
+            request.model_dump(),
+            shard_registry.get(request.city_id, "seir_engine").project,
+            [zone.model_dump() for zone in request.zones],
+            days=request.days,
+            mixing=[link.model_dump() for link in request.mixing] if request.mixing else None
+        )
+    except ValueError as e:     # Mixing fractions of a zone sum to more than 1
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= FEATURE STORE ENDPOINTS =============
+
+@app.post("/features/entities")
+async def upsert_feature_entities(request: FeatureUpsertRequest):
+    """
+    Feature Store: Bulk upsert/remove entity state
+    
+    Only the fields sent are written; per-disease / per-medicine dicts merge.
+    A request with an invalid entity is rejected (400) before anything changes
+    """
+    try:
+        # Validated in full, then removals and upserts apply as one write
+        return shard_registry.get(request.city_id, "feature_store").apply(
+            (entity.model_dump(exclude_none=True) for entity in request.entities or []),
+            request.remove_ids or []
+        )
+    except ValueError as e:     # Feature not defined for the entity type
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/features/entities/{entity_id}")
+async def get_feature_entity(entity_id: str, city_id: Optional[str] = "default"):
+    """Feature Store: Stored state of one entity"""
+    entity = shard_registry.get(city_id, "feature_store").get(entity_id)
+    if entity is None:
+        raise HTTPException(status_code=404, detail=f"Entity '{entity_id}' not found")
+    return entity
+
+@app.get("/features/zones")
+async def get_feature_zones(zone: Optional[str] = None, city_id: Optional[str] = "default"):
+    """
+    Feature Store: Zone totals (beds, ICU, tests, medicine stock and cover, supply)
+    
+    All zones are aggregated in one vectorized pass
+    """
+    try:
+        feature_store = shard_registry.get(city_id, "feature_store")
+        return {"zones": feature_store.zone_summary(zone), "version": feature_store.version}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _stored_entities(request: FeatureQueryRequest, entity_type: str):
+    """(ids, agent kwargs, missing ids) for the selected rows"""
+    ids, _, records, missing = shard_registry.get(request.city_id, "feature_store").read(
+        entity_type, request.entity_ids, request.zone
+    )
+    return ids, records, missing
+
+def _stored_hospital_strain(request: FeatureQueryRequest) -> Dict:
+    ids, hospitals, missing = _stored_entities(request, "hospital")
+    results = hospital_agent.calculate_hospital_strain_batch(hospitals)
+    _record_metrics(request.city_id, [p for i, result in zip(ids, results) for p in _hospital_points(i, result)])
+    return {
+        "hospitals": [{"hospital_id": i, **result} for i, result in zip(ids, results)],
+        "unknown_ids": missing
+    }
+
+def _stored_outbreak(request: FeatureQueryRequest) -> Dict:
+    ids, labs, missing = _stored_entities(request, "lab")
+    predictions = lab_agent.predict_outbreak_batch(labs, include_uncertainty=request.include_uncertainty)
+    _record_metrics(request.city_id, [p for i, lab_predictions in zip(ids, predictions) for p in _outbreak_points(i, lab_predictions)])
+    return {
+        "labs": [{"lab_id": i, "predictions": p} for i, p in zip(ids, predictions)],
+        "unknown_ids": missing
+    }
+
+def _stored_pharmacy_demand(request: FeatureQueryRequest) -> Dict:
+    ids, pharmacies, missing = _stored_entities(request, "pharmacy")
+    results = pharmacy_agent.classify_medicine_demand_batch([
+        {
+            "medicine_stocks": pharmacy["medicine_stocks"],
+            "consumption_rates": pharmacy["consumption_rates"],
+            "outbreak_alerts": request.outbreak_alerts
+        }
+        for pharmacy in pharmacies
+    ])
+    _record_metrics(request.city_id, [p for i, result in zip(ids, results) for p in _pharmacy_points(i, result)])
+    return {
+        "pharmacies": [{"pharmacy_id": i, **result} for i, result in zip(ids, results)],
+        "unknown_ids": missing
+    }
+
+@app.post("/features/hospital_strain")
+async def stored_hospital_strain(request: FeatureQueryRequest):
+    """
+    Hospital Agent on stored hospitals: HSI by hospital IDs and/or zone
+    
+    Formula: HSI = (Bed_Utilization * 0.4) + (ICU_Risk * 0.3) + (ER_Wait * 0.3)
+    """
+    try:
+        return await single_flight.run("/features/hospital_strain", request.model_dump(), _stored_hospital_strain, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/features/outbreak")
+async def stored_outbreak(request: FeatureQueryRequest):
+    """
+    Lab Agent on stored labs: outbreak predictions by lab IDs and/or zone
+    
+    Formula: Q_future = Q_current + m * t (linear growth from baseline)
+    """
+    try:
+        return await single_flight.run("/features/outbreak", request.model_dump(), _stored_outbreak, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/features/pharmacy_demand")
+async def stored_pharmacy_demand(request: FeatureQueryRequest):
+    """
+    Pharmacy Agent on stored pharmacies: demand classes by pharmacy IDs and/or zone
+    
+    Formula: Classification Rule-Set (Low, Medium, High, Surge)
+    """
+    try:
+        return await single_flight.run("/features/pharmacy_demand", request.model_dump(), _stored_pharmacy_demand, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= REACTIVE GRAPH ENDPOINTS =============
+
+def _graph_tick(request: GraphTickRequest) -> Dict:
+    graph = shard_registry.get(request.city_id, "reactive_graph")
+    if request.from_feature_store:
+        result = graph.sync(_scenario_entities(request.city_id))
+    else:
+        result = graph.update(
+            [entity.model_dump(exclude_none=True) for entity in request.entities or []],
+            remove_ids=request.remove_ids or []
+        )
+    changed = result["changed"]
+    _record_metrics(request.city_id, [
+        *(p for i, predictions in changed["lab"].items() for p in _outbreak_points(i, predictions)),
+        *(p for i, strain in changed["hospital"].items() for p in _hospital_points(i, strain)),
+        *(p for i, demand in changed["pharmacy"].items() for p in _pharmacy_points(i, demand)),
+        *_crisis_points(result["city"])
+    ])
+    return result
+
+@app.post("/graph/tick")
+async def graph_tick(request: GraphTickRequest):
+    """
+    Reactive Graph: Apply entity changes and recompute only what they affect
+    
+    Changed inputs mark the Lab/Hospital/Pharmacy results, zone alerts,
+    SURGE orders, supply and city CPS downstream of them dirty; returns the
+    city crisis, the results that changed and recompute vs full-recompute
+    counts for the tick
+    """
+    try:
+        return await single_flight.run("/graph/tick", None, _graph_tick, request, bypass=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/graph/results")
+async def get_graph_results(entity_ids: Optional[str] = None, city_id: Optional[str] = "default"):
+    """Reactive Graph: Current memoized results (comma-separated entity_ids, default all)"""
+    try:
+        graph = shard_registry.get(city_id, "reactive_graph")
+        return graph.results(entity_ids.split(",") if entity_ids else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/graph/stats")
+async def get_graph_stats(city_id: Optional[str] = "default"):
+    """Reactive Graph: Recompute counts per tick and in total vs full recomputes"""
+    try:
+        return shard_registry.get(city_id, "reactive_graph").get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= METRIC ROLLUP ENDPOINTS =============
+
+@app.post("/rollups/points")
+async def record_rollup_points(request: MetricPointsRequest):
+    """
+    Rollup Engine: Record metric samples not produced by an agent endpoint
+    
+    Agent endpoints called with an entity ID record their own results
+    (HSI, CPS, stock per medicine, positive rate and predicted cases per disease)
+    """
+    try:
+        return shard_registry.get(request.city_id, "rollup_engine").record(
+            (p.entity_id, p.metric, p.value, p.timestamp) for p in request.points
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/rollups/series")
+async def get_rollup_series(entity_id: Optional[str] = None, city_id: Optional[str] = "default"):
+    """Rollup Engine: Recorded metrics per entity, plus tier retention"""
+    try:
+        rollup_engine = shard_registry.get(city_id, "rollup_engine")
+        return {"metrics": rollup_engine.series(entity_id), **rollup_engine.get_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/rollups/query")
+async def query_rollups(
+    entity_id: str,
+    metric: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    resolution: Optional[str] = None,
+    city_id: Optional[str] = "default"
+):
+    """
+    Rollup Engine: min / max / mean / last of one metric over [start, end]
+    
+    resolution is 1m, 1h or 1d (default: finest tier covering the range);
+    only the ring slots of the requested buckets are read
+    """
+    try:
+        result = shard_registry.get(city_id, "rollup_engine").query(entity_id, metric, start, end, resolution)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No '{metric}' series for '{entity_id}'")
+    return result
+
+# ============= SCAN STATISTIC ENDPOINTS =============
+
+@app.post("/scan/outbreak_clusters")
+async def scan_outbreak_clusters(request: ScanRequest):
+    """
+    Scan Engine: Space-time clusters of positive tests across nearby labs
+    
+    Catches outbreaks spread over several labs that each stay under the
+    per-lab Lab Agent rule; p-values come from Monte Carlo replicates
+    """
+    try:
+        scan_engine = shard_registry.get(request.city_id, "scan_engine")
+        result = await single_flight.run(
+            "/scan/outbreak_clusters",
+            request.model_dump(),
+            scan_engine.scan,
+            [lab.model_dump() for lab in request.labs],
+            n_replicates=request.n_replicates,
+            max_neighbors=request.max_neighbors,
+            max_window_days=request.max_window_days,
+            seed=request.seed
+        )
+        return {"disease": request.disease, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _detect_lab_changes(city_id: str, labs: List[Dict], include_state: bool = False) -> List[Dict]:
+    """Tick the city's detectors, then attach their state to the Lab Agent tiers"""
+    reports = shard_registry.get(city_id, "change_detector").observe(labs, full=include_state)
+    predictions = lab_agent.predict_outbreak_batch([
+        {**lab, "baseline_tests": lab.get("baseline_tests") or report["baseline_tests"]}
+        for lab, report in zip(labs, reports)
+    ])
+    _record_metrics(city_id, [p for lab, lab_predictions in zip(labs, predictions) for p in _outbreak_points(lab["lab_id"], lab_predictions)])
+    results = []
+    for lab, report, lab_predictions in zip(labs, reports, predictions):
+        for prediction in lab_predictions:
+            prediction["detectors"] = report["detectors"].get(prediction["disease"])
+        results.append({
+            "lab_id": lab["lab_id"],
+            "predictions": lab_predictions,
+            "alarms": [
+                {
+                    "disease": disease,
+                    "metric": metric,
+                    "chart": chart,
+                    "run_length": state[f"{chart}_alarm_ticks"]
+                }
+                for disease, metrics in report["detectors"].items()
+                for metric, state in metrics.items()
+                for chart in ("cusum", "ewma")
+                if state[f"{chart}_alarm"]
+            ]
+        })
+    return results
+
+@app.post("/detect/lab_changes")
+async def detect_lab_changes(request: LabChangeRequest):
+    """
+    Change Detector: One tick of CUSUM / EWMA charts per lab x disease
+    
+    Test counts and positive rate are charted against each series' learned
+    baseline; alarms and run lengths are returned alongside the Lab Agent
+    risk tier. Chart state is attached only to series that are alarming or
+    changed state this tick unless include_state is set
+    """
+    try:
+        return await single_flight.run(
+            "/detect/lab_changes",
+            None,
+            _detect_lab_changes,
+            request.city_id,
+            [lab.model_dump() for lab in request.labs],
+            request.include_state,
+            bypass=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= SCENARIO ENDPOINTS =============
+
+def _scenario_entities(city_id: str) -> List[Dict]:
+    """Every stored entity of the city, in feature store upsert shape"""
+    feature_store = shard_registry.get(city_id, "feature_store")
+    entities = []
+    for entity_type in feature_store.SCALAR_FEATURES:
+        ids, zones, records, _ = feature_store.read(entity_type)
+        for entity_id, zone, record in zip(ids, zones, records):
+            entities.append({"entity_id": entity_id, "entity_type": entity_type, "zone": zone, **record})
+    return entities
+
+def _run_scenarios(request: ScenarioRunRequest) -> Dict:
+    if request.entities is not None:
+        entities = [entity.model_dump(exclude_none=True) for entity in request.entities]
+    else:
+        entities = _scenario_entities(request.city_id)
+    return scenario_engine.run(
+        entities,
+        [variant.model_dump(exclude_none=True) for variant in request.variants],
+        days=request.days
+    )
+
+@app.post("/scenarios/run")
+async def run_scenarios(request: ScenarioRunRequest):
+    """
+    Scenario Engine: What-if variants of the city run side by side
+    
+    Each variant perturbs the base snapshot (outbreak size, bed loss,
+    supplier outage) and steps Lab -> Hospital/Pharmacy -> Supplier -> City
+    daily; variants run in parallel across a process pool and return CPS,
+    HSI and stockout trajectories next to the unperturbed base run
+    """
+    try:
+        return await single_flight.run("/scenarios/run", request.model_dump(), _run_scenarios, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============= RUN SERVER =============
 
+def _run_worker(worker_id: str, port: int, workers_spec: str):
+    """Start one shard worker process (imports main fresh with its env)"""
+    os.environ["ML_WORKER_ID"] = worker_id
+    os.environ["ML_WORKERS"] = workers_spec
+    uvicorn.run("main:app", host="0.0.0.0", port=port, log_level="info")
+
 if __name__ == "__main__":
-    print("🚀 Starting HealSync ML Service on http://localhost:8000")
-    print("📚 API Documentation: http://localhost:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    parser = argparse.ArgumentParser(description="HealSync ML Service")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Shard worker processes (ports port..port+N-1)")
+    args = parser.parse_args()
+    
+    print(f"🚀 Starting HealSync ML Service on http://localhost:{args.port}")
+    print(f"📚 API Documentation: http://localhost:{args.port}/docs")
+    
+    if args.workers <= 1:
+        uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="info")
+    else:
+        ports = {f"w{i}": args.port + i for i in range(args.workers)}
+        spec = ",".join(f"{w}=http://127.0.0.1:{p}" for w, p in ports.items())
+        print(f"🧩 Sharding cities across {args.workers} workers: {spec}")
+        if not os.environ.get("ML_ADMIN_TOKEN"):
+            print("🔒 ML_ADMIN_TOKEN is not set: POST /shards/rebalance is disabled")
+        # Workers started together share a fresh secret for signing forwards
+        os.environ.setdefault("ML_SHARD_SECRET", secrets.token_hex(32))
+        ctx = multiprocessing.get_context("spawn")
+        processes = [ctx.Process(target=_run_worker, args=(w, p, spec)) for w, p in ports.items()]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1 @@
+# HealSync ML Service - Serving Layer
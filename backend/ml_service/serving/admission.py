@@ -0,0 +1,293 @@
+"""
+Admission Control - Priority Classes and Load Shedding
+
+Every request is classified (CRITICAL, HIGH, NORMAL, LOW) from its endpoint
+and payload: supplier order urgency (SupplierAgent.URGENCY_WEIGHTS) and
+requester strain, hospital bed/ICU utilization, active outbreak alerts.
+
+At most MAX_CONCURRENT requests execute at once; the rest wait in bounded
+per-class queues and are granted slots strictly by class. A request is shed
+early with 503 + Retry-After when its class queue is full or its expected
+wait exceeds the class latency limit.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class AdmissionController:
+    """Bounded per-class queues with strict-priority slot hand-off"""
+    
+    PRIORITY_CLASSES = ["CRITICAL", "HIGH", "NORMAL", "LOW"]  # Highest first
+    
+    def __init__(self, urgency_weights: Dict[str, int], max_concurrent: int = 8):
+        self.URGENCY_WEIGHTS = urgency_weights
+        self.MAX_CONCURRENT = max_concurrent
+        
+        self.QUEUE_LIMITS = {
+            'CRITICAL': 256,
+            'HIGH': 128,
+            'NORMAL': 64,
+            'LOW': 32
+        }
+        
+        # Max expected queue wait (ms) before shedding; None = never by latency
+        self.LATENCY_LIMITS_MS = {
+            'CRITICAL': None,
+            'HIGH': 2000,
+            'NORMAL': 1000,
+            'LOW': 250
+        }
+        
+        self.ENDPOINT_CLASSES = {
+            '/predict/crisis': 'HIGH',
+            '/analyze/cps_sensitivity': 'NORMAL',
+            '/plan/transfers': 'HIGH',
+            '/predict/outbreak': 'NORMAL',
+            '/predict/outbreak/batch': 'NORMAL',
+            '/scan/outbreak_clusters': 'NORMAL',
+            '/detect/lab_changes': 'NORMAL',
+            '/project/epidemic': 'NORMAL',
+            '/scenarios/run': 'NORMAL',
+            '/orders/cycle': 'NORMAL',
+            '/ledger/events': 'NORMAL',
+            '/features/entities': 'NORMAL',
+            '/graph/tick': 'NORMAL',
+            '/rollups/points': 'NORMAL',
+            '/features/hospital_strain': 'HIGH',
+            '/features/outbreak': 'NORMAL',
+            '/classify/pharmacy_demand': 'LOW'
+        }
+        
+        # Request paths and methods that are never queued or shed
+        self.EXEMPT_PATHS = {'/', '/health', '/metrics', '/docs', '/openapi.json', '/redoc'}
+        self.EXEMPT_METHODS = {'OPTIONS'}  # CORS preflights
+        
+        self.SERVICE_TIME_ALPHA = 0.1  # EWMA smoothing for service time
+        
+        self._active = 0
+        self._queues = {c: deque() for c in self.PRIORITY_CLASSES}
+        self._service_ms = 10.0
+        self._stats = {c: {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_latency": 0}
+                       for c in self.PRIORITY_CLASSES}
+    
+    # ============= CLASSIFICATION =============
+    
+    def classify(self, path: str, body: bytes) -> str:
+        """
+        Determine the priority class of a request
+        
+        A payload that cannot be scored (e.g. a non-numeric strain) gets the
+        endpoint's default class; validation and its 422 are the endpoint's job
+        """
+        try:
+            return self._classify(path, body)
+        except (TypeError, ValueError, AttributeError):
+            return self.ENDPOINT_CLASSES.get(path, 'LOW')
+    
+    def _classify(self, path: str, body: bytes) -> str:
+        if path in ('/prioritize/orders', '/orders/book'):
+            return self._classify_orders(self._parse(body))
+        if path == '/calculate/hospital_strain':
+            return self._classify_hospital(self._parse(body))
+        if path in ('/classify/pharmacy_demand', '/ledger/classify', '/features/pharmacy_demand'):
+            payload = self._parse(body)
+            return 'NORMAL' if payload.get('outbreak_alerts') else 'LOW'
+        return self.ENDPOINT_CLASSES.get(path, 'LOW')
+    
+    def _classify_orders(self, payload: Dict) -> str:
+        """Most urgent order decides: mean of urgency weight and requester strain"""
+        score = 0.0
+        for order in payload.get('orders') or []:
+            if not isinstance(order, dict):
+                continue
+            urgency = self.URGENCY_WEIGHTS.get(str(order.get('urgency', 'NORMAL')).upper(), 25)
+            strain = min(100, max(0, float(order.get('requester_strain', 50) or 0)))
+            score = max(score, (urgency + strain) / 2)
+        return self._score_to_class(score)
+    
+    def _classify_hospital(self, payload: Dict) -> str:
+        """Bed or ICU utilization, whichever is worse"""
+        def utilization(total, available):
+            total = float(payload.get(total) or 0)
+            return (total - float(payload.get(available) or 0)) / total * 100 if total > 0 else 0
+        
+        score = max(
+            utilization('total_beds', 'available_beds'),
+            utilization('icu_total', 'icu_available')
+        )
+        return self._score_to_class(score)
+    
+    def _score_to_class(self, score: float) -> str:
+        """Map a 0-100 urgency/strain score to a priority class"""
+        if score >= 90:
+            return 'CRITICAL'
+        elif score >= 70:
+            return 'HIGH'
+        elif score >= 40:
+            return 'NORMAL'
+        else:
+            return 'LOW'
+    
+    @staticmethod
+    def _parse(body: bytes) -> Dict:
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+    
+    # ============= SLOTS =============
+    
+    def expected_wait_ms(self, priority_class: str) -> float:
+        """Queue wait estimate: requests ahead of this class x service time / slots"""
+        rank = self.PRIORITY_CLASSES.index(priority_class)
+        ahead = sum(len(self._queues[c]) for c in self.PRIORITY_CLASSES[:rank + 1])
+        if self._active < self.MAX_CONCURRENT and ahead == 0:
+            return 0.0
+        return (ahead + 1) * self._service_ms / self.MAX_CONCURRENT
+    
+    async def acquire(self, priority_class: str) -> Optional[float]:
+        """
+        Wait for an execution slot
+        
+        Returns:
+            None when admitted, otherwise the Retry-After seconds for a shed request
+        """
+        stats = self._stats[priority_class]
+        waiting = any(self._queues[c] for c in self.PRIORITY_CLASSES)
+        
+        if self._active < self.MAX_CONCURRENT and not waiting:
+            self._active += 1
+            stats["admitted"] += 1
+            return None
+        
+        expected = self.expected_wait_ms(priority_class)
+        limit = self.LATENCY_LIMITS_MS[priority_class]
+        if len(self._queues[priority_class]) >= self.QUEUE_LIMITS[priority_class]:
+            stats["shed_queue_full"] += 1
+            return self._retry_after(expected)
+        if limit is not None and expected > limit:
+            stats["shed_latency"] += 1
+            return self._retry_after(expected)
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority_class].append(waiter)
+        stats["queued"] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Slot was handed over just as we were cancelled
+            else:
+                self._queues[priority_class].remove(waiter)
+            raise
+        
+        stats["admitted"] += 1
+        return None
+    
+    def release(self, service_ms: Optional[float] = None):
+        """Return a slot, handing it straight to the highest waiting class"""
+        if service_ms is not None:
+            a = self.SERVICE_TIME_ALPHA
+            self._service_ms = (1 - a) * self._service_ms + a * service_ms
+        
+        for priority_class in self.PRIORITY_CLASSES:
+            queue = self._queues[priority_class]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(True)  # Slot transfers; _active unchanged
+                    return
+        self._active -= 1
+    
+    def _retry_after(self, expected_ms: float) -> int:
+        return max(1, math.ceil(expected_ms / 1000))
+    
+    def get_metrics(self) -> Dict:
+        """Queue depths, shed counters and service-time estimate"""
+        return {
+            "active": self._active,
+            "max_concurrent": self.MAX_CONCURRENT,
+            "service_time_ms": round(self._service_ms, 2),
+            "classes": {
+                c: {
+                    "queue_depth": len(self._queues[c]),
+                    "queue_limit": self.QUEUE_LIMITS[c],
+                    "expected_wait_ms": round(self.expected_wait_ms(c), 2),
+                    **self._stats[c]
+                }
+                for c in self.PRIORITY_CLASSES
+            }
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that classifies, queues or sheds each HTTP request"""
+    
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.controller.EXEMPT_PATHS
+            or scope["method"] in self.controller.EXEMPT_METHODS
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        # Buffer the body so the payload can be classified, then replay it
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        
+        priority_class = self.controller.classify(scope["path"], body)
+        retry_after = await self.controller.acquire(priority_class)
+        if retry_after is not None:
+            await self._send_shed(send, priority_class, retry_after)
+            return
+        
+        replayed = False
+        
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, replay_receive, send)
+        finally:
+            self.controller.release((time.perf_counter() - start) * 1000)
+    
+    @staticmethod
+    async def _send_shed(send, priority_class: str, retry_after: int):
+        body = json.dumps({
+            "detail": "Service overloaded, request shed",
+            "priority_class": priority_class,
+            "retry_after": retry_after
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,78 @@
+"""
+Compression - Gzip Request Bodies
+
+Clients may send large batch payloads gzip-compressed (Content-Encoding:
+gzip). The body is inflated here, before the shard router, conditional
+responder and admission controller read it, so every layer behind sees
+plain JSON. Responses are gzip-compressed for clients that accept it by
+Starlette's GZipMiddleware.
+"""
+
+import json
+import zlib
+
+
+class GzipRequestMiddleware:
+    """ASGI middleware inflating gzip-encoded request bodies"""
+
+    def __init__(self, app, max_size: int = 64 * 2 ** 20):
+        self.app = app
+        self.MAX_SIZE = max_size        # Inflated bytes allowed (bounds gzip bombs)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = scope.get("headers", [])
+        encoding = next((v for k, v in headers if k.lower() == b"content-encoding"), None)
+        if encoding is None or encoding.strip().lower() != b"gzip":
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        compressed = b"".join(chunks)
+
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(compressed, self.MAX_SIZE)
+            if inflater.unconsumed_tail:
+                raise ValueError(f"Inflated body exceeds {self.MAX_SIZE} bytes")
+        except (zlib.error, ValueError) as e:
+            await self._send_error(send, f"Invalid gzip request body: {e}")
+            return
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in headers if k.lower() not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    @staticmethod
+    async def _send_error(send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
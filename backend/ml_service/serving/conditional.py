@@ -0,0 +1,298 @@
+"""
+Conditional Responses - ETags, 304s and JSON-Patch Deltas
+
+The version tag of a prediction is a hash of the endpoint and its canonical
+(key-sorted) JSON input, so it is known before any agent runs:
+- If-None-Match matches the input version -> 304, agent never called,
+  unless the request also writes state (an entity ID records rollup
+  samples, a pharmacy_id updates the stockout index, every crisis
+  prediction records the city CPS); those always run and can only get the
+  304 below
+- Result identical to the body of the client's version -> 304 + new ETag
+- Client sends A-IM: json-patch and its version is still cached ->
+  226 IM Used with an RFC 6902 patch against that version (RFC 3229)
+
+Cached bodies are bounded by count and total bytes; bodies larger than
+MAX_BODY_BYTES are never cached (those requests always get a full 200)
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def json_patch_diff(old: Any, new: Any, path: str = "") -> List[Dict]:
+    """
+    Minimal RFC 6902 patch turning old into new
+
+    Dicts are diffed per key and equal-length lists per index, so a
+    pharmacy medicine that changed tier yields only replace ops for that
+    medicine's fields. Lists that changed length are replaced whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(json_patch_diff(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(json_patch_diff(a, b, f"{path}/{i}"))
+        return ops
+
+    if type(old) is type(new) and old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _escape(key: Any) -> str:
+    """RFC 6901 JSON-pointer token escaping"""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+class ConditionalResponder:
+    """Input-derived version tags plus a bounded cache of recent bodies"""
+
+    def __init__(
+        self,
+        paths=None,
+        cache_size: int = 2048,
+        cache_bytes: int = 64 << 20,
+        max_body_bytes: int = 1 << 20,
+        service_version: str = "1.0.0"
+    ):
+        self.PATHS = set(paths or [
+            "/predict/outbreak",
+            "/predict/outbreak/batch",
+            "/predict/crisis",
+            "/calculate/hospital_strain",
+            "/classify/pharmacy_demand",
+            "/project/epidemic",
+            "/analyze/cps_sensitivity"
+        ])
+        # Body field that makes a request write state when set ("*": every
+        # request, "labs.lab_id": set on any item of labs); such requests
+        # always reach the endpoint
+        self.STATEFUL_FIELDS = {
+            "/predict/outbreak": "lab_id",                  # Rollup samples
+            "/predict/outbreak/batch": "labs.lab_id",       # Rollup samples
+            "/predict/crisis": "*",                         # City CPS rollup
+            "/calculate/hospital_strain": "hospital_id",    # Rollup samples
+            "/classify/pharmacy_demand": "pharmacy_id"      # Stockout index report, rollups
+        }
+        self.CACHE_SIZE = cache_size
+        self.CACHE_BYTES = cache_bytes          # Total cached body bytes
+        self.MAX_BODY_BYTES = max_body_bytes    # Larger bodies are never cached
+        self.SERVICE_VERSION = service_version
+
+        self._bodies: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {
+            "requests": 0,
+            "not_modified_input": 0,
+            "not_modified_result": 0,
+            "deltas": 0,
+            "full": 0,
+            "bytes_saved": 0
+        }
+
+    def version_for(self, path: str, body: bytes) -> Optional[str]:
+        """Quoted ETag for a request body, or None if it is not JSON"""
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return None
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.blake2b(
+            f"{self.SERVICE_VERSION}|{path}|{canonical}".encode(), digest_size=12
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def is_stateful(self, path: str, body: bytes) -> bool:
+        """True when the request has side effects beyond computing its result"""
+        field = self.STATEFUL_FIELDS.get(path)
+        if field is None:
+            return False
+        if field == "*":
+            return True
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return False
+        if not isinstance(payload, dict):
+            return False
+        items, _, item_field = field.rpartition(".")
+        if items:
+            values = payload.get(items)
+            return isinstance(values, list) and any(
+                isinstance(item, dict) and bool(item.get(item_field)) for item in values
+            )
+        return bool(payload.get(field))
+
+    def remember(self, etag: str, body: bytes):
+        """Cache a response body under its version (LRU bounded by count and bytes)"""
+        previous = self._bodies.pop(etag, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        if len(body) > self.MAX_BODY_BYTES:
+            return
+        self._bodies[etag] = body
+        self._bytes += len(body)
+        while len(self._bodies) > self.CACHE_SIZE or self._bytes > self.CACHE_BYTES:
+            _, evicted = self._bodies.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def cached_body(self, etag: str) -> Optional[bytes]:
+        body = self._bodies.get(etag)
+        if body is not None:
+            self._bodies.move_to_end(etag)
+        return body
+
+    def record(self, outcome: str, bytes_saved: int = 0):
+        self._stats[outcome] += 1
+        self._stats["bytes_saved"] += max(0, bytes_saved)
+
+    def get_metrics(self) -> Dict:
+        return {**self._stats, "cached_versions": len(self._bodies), "cached_bytes": self._bytes}
+
+
+class ConditionalMiddleware:
+    """ASGI middleware applying ConditionalResponder to prediction endpoints"""
+
+    def __init__(self, app, responder: ConditionalResponder):
+        self.app = app
+        self.responder = responder
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.responder.PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        etag = self.responder.version_for(scope["path"], body)
+        if etag is None:
+            await self.app(scope, replay_receive, send)
+            return
+
+        headers = self._headers(scope)
+        client_tags = self._parse_tags(headers.get("if-none-match", ""))
+        wants_patch = "json-patch" in headers.get("a-im", "").lower()
+        self.responder.record("requests")
+
+        # Same inputs as the client's copy: skip the agent entirely (stateless only)
+        if (
+            etag in client_tags
+            and self.responder.cached_body(etag) is not None
+            and not self.responder.is_stateful(scope["path"], body)
+        ):
+            self.responder.record("not_modified_input", len(self.responder.cached_body(etag)))
+            await self._send(send, 304, etag, b"")
+            return
+
+        # Run the endpoint and capture its response
+        start_message = {}
+        parts = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                parts.append(message.get("body", b""))
+
+        await self.app(scope, replay_receive, capture_send)
+        new_body = b"".join(parts)
+        status = start_message.get("status", 500)
+
+        if status != 200:
+            await self._send(send, status, None, new_body, start_message.get("headers", []))
+            return
+
+        self.responder.remember(etag, new_body)
+        base_tag = next((t for t in client_tags if self.responder.cached_body(t) is not None), None)
+
+        if base_tag is not None:
+            base_body = self.responder.cached_body(base_tag)
+            if base_body == new_body:
+                self.responder.record("not_modified_result", len(new_body))
+                await self._send(send, 304, etag, b"", start_message.get("headers", []))
+                return
+
+            if wants_patch:
+                patch = json.dumps(
+                    json_patch_diff(json.loads(base_body), json.loads(new_body)),
+                    ensure_ascii=False,
+                    separators=(",", ":")
+                ).encode()
+                if len(patch) < len(new_body):
+                    self.responder.record("deltas", len(new_body) - len(patch))
+                    await self._send(send, 226, etag, patch, [
+                        *start_message.get("headers", []),
+                        (b"content-type", b"application/json-patch+json"),
+                        (b"im", b"json-patch"),
+                        (b"delta-base", base_tag.encode())
+                    ])
+                    return
+
+        self.responder.record("full")
+        await self._send(send, 200, etag, new_body, start_message.get("headers", []))
+
+    @staticmethod
+    def _headers(scope) -> Dict[str, str]:
+        return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+    @staticmethod
+    def _parse_tags(value: str) -> List[str]:
+        """If-None-Match list; weak validators compare equal to strong ones"""
+        tags = []
+        for part in value.split(","):
+            part = part.strip()
+            if part.startswith("W/"):
+                part = part[2:]
+            if part:
+                tags.append(part)
+        return tags
+
+    @staticmethod
+    async def _send(send, status: int, etag: Optional[str], body: bytes, headers=None):
+        # Endpoint headers carry over (minus those describing the replaced body)
+        dropped = {b"content-length", b"etag"}
+        if status in (226, 304):
+            dropped |= {b"content-type", b"content-encoding"}
+        out = [(k, v) for k, v in (headers or []) if k.lower() not in dropped]
+        if etag is not None:
+            out.append((b"etag", etag.encode()))
+        if status != 304:
+            out.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": out})
+        await send({"type": "http.response.body", "body": body if status != 304 else b""})
@@ -0,0 +1,143 @@
+"""
+Micro-Batching - Adaptive Batching of Single-Entity Requests
+
+Legacy callers send one hospital / lab / pharmacy per request. Requests for
+the same endpoint that arrive within a short window are gathered (up to
+MAX_BATCH) and run through one vectorized agent call; each caller gets its
+own slice of the result.
+
+The window adapts to load: it is derived from an EWMA of inter-arrival
+gaps and is zero whenever requests arrive further apart than
+MAX_WINDOW_MS, so a lone request is dispatched on the next event-loop turn
+and low-load latency does not regress.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class MicroBatcher:
+    """Gather concurrent single-entity calls into vectorized batch calls"""
+
+    def __init__(self, max_batch: int = 32, max_window_ms: float = 2.0, gap_alpha: float = 0.2):
+        self.MAX_BATCH = max_batch
+        self.MAX_WINDOW_MS = max_window_ms
+        self.GAP_ALPHA = gap_alpha          # EWMA weight of the newest inter-arrival gap
+
+        self._handlers: Dict[str, Callable[[List[Any]], List[Any]]] = {}
+        self._queues: Dict[str, List[Tuple[Any, asyncio.Future]]] = defaultdict(list)
+        self._timers: Dict[str, asyncio.Handle] = {}
+        self._gap_ms: Dict[str, float] = {}
+        self._last_arrival: Dict[str, float] = {}
+        self._stats = defaultdict(lambda: {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "fallbacks": 0
+        })
+
+    def register(self, endpoint: str, batch_fn: Callable[[List[Any]], List[Any]]):
+        """batch_fn(items) must return one result per item, in order"""
+        self._handlers[endpoint] = batch_fn
+
+    def window_ms(self, endpoint: str) -> float:
+        """Current gathering window: time to fill the batch at the observed rate"""
+        gap = self._gap_ms.get(endpoint)
+        if gap is None or gap >= self.MAX_WINDOW_MS:
+            return 0.0
+        remaining = self.MAX_BATCH - len(self._queues[endpoint])
+        return min(self.MAX_WINDOW_MS, gap * max(remaining, 0))
+
+    async def submit(self, endpoint: str, item: Any) -> Any:
+        """Queue one item and wait for its result from the next batch"""
+        loop = asyncio.get_running_loop()
+        self._observe_arrival(endpoint)
+        self._stats[endpoint]["requests"] += 1
+
+        future = loop.create_future()
+        queue = self._queues[endpoint]
+        queue.append((item, future))
+
+        if len(queue) >= self.MAX_BATCH:
+            self._flush(endpoint)
+        elif endpoint not in self._timers:
+            window = self.window_ms(endpoint)
+            if window <= 0:
+                # Still coalesces requests that arrived in the same loop turn
+                self._timers[endpoint] = loop.call_soon(self._flush, endpoint)
+            else:
+                self._timers[endpoint] = loop.call_later(window / 1000, self._flush, endpoint)
+
+        return await future
+
+    def _observe_arrival(self, endpoint: str):
+        now = time.perf_counter()
+        last = self._last_arrival.get(endpoint)
+        self._last_arrival[endpoint] = now
+        if last is None:
+            return
+        gap = (now - last) * 1000
+        previous = self._gap_ms.get(endpoint)
+        self._gap_ms[endpoint] = gap if previous is None else (
+            self.GAP_ALPHA * gap + (1 - self.GAP_ALPHA) * previous
+        )
+
+    def _flush(self, endpoint: str):
+        """Dispatch up to MAX_BATCH queued items as one batch"""
+        timer = self._timers.pop(endpoint, None)
+        if timer is not None:
+            timer.cancel()
+
+        queue = self._queues[endpoint]
+        batch, self._queues[endpoint] = queue[:self.MAX_BATCH], queue[self.MAX_BATCH:]
+        if self._queues[endpoint]:
+            self._timers[endpoint] = asyncio.get_running_loop().call_soon(self._flush, endpoint)
+        if batch:
+            asyncio.ensure_future(self._execute(endpoint, batch))
+
+    async def _execute(self, endpoint: str, batch: List[Tuple[Any, asyncio.Future]]):
+        stats = self._stats[endpoint]
+        stats["batches"] += 1
+        stats["max_batch_size"] = max(stats["max_batch_size"], len(batch))
+        batch_fn = self._handlers[endpoint]
+
+        try:
+            results = await run_in_threadpool(batch_fn, [item for item, _ in batch])
+            outcomes = list(zip(batch, results, [None] * len(batch)))
+        except Exception:
+            # Re-run one by one so a bad item only fails its own caller
+            stats["fallbacks"] += 1
+            outcomes = []
+            for entry in batch:
+                try:
+                    outcomes.append((entry, (await run_in_threadpool(batch_fn, [entry[0]]))[0], None))
+                except Exception as e:
+                    outcomes.append((entry, None, e))
+
+        for (_, future), result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def get_metrics(self) -> Dict:
+        """Per-endpoint batch counts, sizes and the current window"""
+        endpoints = {}
+        for endpoint, stats in self._stats.items():
+            endpoints[endpoint] = {
+                **stats,
+                "avg_batch_size": round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0,
+                "window_ms": round(self.window_ms(endpoint), 3),
+                "queued": len(self._queues[endpoint])
+            }
+        return {
+            "max_batch": self.MAX_BATCH,
+            "max_window_ms": self.MAX_WINDOW_MS,
+            "endpoints": endpoints
+        }
@@ -0,0 +1,327 @@
+"""
+Multi-City Sharding - Consistent-Hash Partitioning Across Workers
+
+Each request carries a city/tenant key ("city_id" in the JSON body, or the
+?city_id= query parameter on GETs) - the same field the endpoints read. A consistent-hash ring with virtual nodes maps cities to
+worker processes; any worker accepts a request and forwards it to the
+owner, which keeps that city's state (CityAgent, heatmap grids). When the
+worker set changes only the cities whose owner moved are evicted.
+
+Eviction does not hand state over. Order books and stock ledgers are files
+the new owner reopens (workers share a filesystem); everything else held
+in memory for an evicted city (heatmap cells, change-detector baselines,
+rollups, the reactive graph, stockout entries, feature-store upserts) is
+dropped and rebuilt on the new owner from the requests that follow.
+
+Workers are configured with ML_WORKER_ID and ML_WORKERS
+("w0=http://127.0.0.1:8000,w1=http://127.0.0.1:8001"); with a single
+worker the router is a pass-through. Rebalancing requires the shared
+ML_ADMIN_TOKEN, sent in the X-Admin-Token header; without it configured,
+rebalancing is disabled.
+
+A forwarded request carries X-Shard-Forwarded: "<worker>:<HMAC of worker,
+method and path>" keyed with the shared ML_SHARD_SECRET (ML_ADMIN_TOKEN if
+unset). The owner serves a request with a valid tag without routing it
+again; a tag that does not verify (e.g. sent by a client) is stripped at
+ingress and the request is routed like any other.
+"""
+
+import bisect
+import hashlib
+import hmac
+import json
+import os
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+DEFAULT_CITY = "default"
+FORWARDED_HEADER = "x-shard-forwarded"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+class ConsistentHashRing:
+    """Hash ring with virtual nodes for even city -> worker spread"""
+
+    def __init__(self, nodes: List[str], vnodes: int = 128):
+        self.VNODES = vnodes
+        self.nodes: List[str] = []
+        self._keys: List[int] = []
+        self._owners: List[str] = []
+        self.set_nodes(nodes)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def set_nodes(self, nodes: List[str]):
+        """Rebuild the ring for a new node set"""
+        points = sorted(
+            (self._hash(f"{node}#{v}"), node)
+            for node in sorted(set(nodes))
+            for v in range(self.VNODES)
+        )
+        self.nodes = sorted(set(nodes))
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning a key: first ring point clockwise of its hash"""
+        if not self._keys:
+            return None
+        i = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._owners[i]
+
+    def ownership(self) -> Dict[str, float]:
+        """Fraction of the hash space owned by each node"""
+        if not self._keys:
+            return {}
+        space = 2 ** 64
+        share = defaultdict(float)
+        for i, key in enumerate(self._keys):
+            prev = self._keys[i - 1] if i else self._keys[-1] - space
+            share[self._owners[i]] += (key - prev) / space
+        return {node: round(share[node], 4) for node in self.nodes}
+
+
+class CityShardRegistry:
+    """Per-city state owned by this worker, created lazily on first use"""
+
+    def __init__(self, factories: Dict[str, Callable], city_factories: Optional[Dict[str, Callable]] = None):
+        self.FACTORIES = factories  # e.g. {"city_agent": CityAgent, "heatmap_engine": HeatmapEngine}
+        self.CITY_FACTORIES = city_factories or {}  # Called with the city_id (e.g. per-city files)
+        self._cities: Dict[str, Dict] = {}
+        self.requests = defaultdict(int)
+
+    def get(self, city_id: Optional[str], component: str):
+        """Component instance for a city"""
+        city_id = city_id or DEFAULT_CITY
+        self.requests[city_id] += 1
+        state = self._cities.get(city_id)
+        if state is None:
+            state = self._cities[city_id] = {}
+        if component not in state:
+            if component in self.CITY_FACTORIES:
+                state[component] = self.CITY_FACTORIES[component](city_id)
+            else:
+                state[component] = self.FACTORIES[component]()
+        return state[component]
+
+    def cities(self) -> List[str]:
+        return sorted(self._cities)
+
+    def evict(self, city_ids: List[str]) -> Dict[str, List[str]]:
+        """Drop cities' state; returns the components evicted per city"""
+        evicted = {}
+        for city_id in city_ids:
+            state = self._cities.pop(city_id, {})
+            for component in state.values():
+                if hasattr(component, "close"):
+                    component.close()  # Release files so the new owner can take over
+            self.requests.pop(city_id, None)
+            evicted[city_id] = sorted(state)
+        return evicted
+
+
+class ShardRouter:
+    """Owner lookup, forwarding and rebalancing for this worker"""
+
+    def __init__(self, registry: CityShardRegistry, worker_id: str = None, workers: Dict[str, str] = None,
+                 admin_token: str = None, shard_secret: str = None):
+        self.registry = registry
+        self.worker_id = worker_id or os.environ.get("ML_WORKER_ID", "w0")
+        self.workers = workers or self._parse_workers(os.environ.get("ML_WORKERS", ""))
+        self.admin_token = admin_token or os.environ.get("ML_ADMIN_TOKEN") or None
+        # Signs forwarded requests; without one, peers route forwards again
+        self.shard_secret = shard_secret or os.environ.get("ML_SHARD_SECRET") or self.admin_token
+        self.workers.setdefault(self.worker_id, "")
+        self.ring = ConsistentHashRing(list(self.workers))
+
+        self.local = defaultdict(int)
+        self.forwarded = defaultdict(int)
+        self.forward_errors = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _parse_workers(spec: str) -> Dict[str, str]:
+        """'w0=http://host:8000,w1=http://host:8001' -> {id: url}"""
+        workers = {}
+        for item in spec.split(","):
+            if "=" in item:
+                worker_id, url = item.split("=", 1)
+                workers[worker_id.strip()] = url.strip().rstrip("/")
+        return workers
+
+    def owner(self, city_id: Optional[str]) -> str:
+        return self.ring.owner(city_id or DEFAULT_CITY)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Constant-time check of an admin token against ML_ADMIN_TOKEN"""
+        if not self.admin_token or not token:
+            return False
+        return hmac.compare_digest(token.encode(), self.admin_token.encode())
+
+    def forward_tag(self, method: str, path: str) -> Optional[str]:
+        """X-Shard-Forwarded value for a request this worker forwards (None without a secret)"""
+        if not self.shard_secret:
+            return None
+        digest = hmac.new(
+            self.shard_secret.encode(), f"{self.worker_id}|{method}|{path}".encode(), hashlib.sha256
+        ).hexdigest()
+        return f"{self.worker_id}:{digest}"
+
+    def trusted_forward(self, tag: Optional[bytes], method: str, path: str) -> bool:
+        """True when tag was produced by a peer holding the shard secret"""
+        if not self.shard_secret or not tag:
+            return False
+        worker, _, digest = tag.decode("latin-1").partition(":")
+        expected = hmac.new(
+            self.shard_secret.encode(), f"{worker}|{method}|{path}".encode(), hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(digest.encode(), expected.encode())
+
+    def rebalance(self, workers: Dict[str, str]) -> Dict:
+        """
+        Apply a new worker set
+
+        Cities this worker no longer owns are evicted so their state is
+        rebuilt on the new owner; everything else stays warm. In-memory
+        state of an evicted city is not transferred (see module docstring).
+        A worker left out of the set is drained: it forwards every city to
+        the others.
+        """
+        before = {c: self.owner(c) for c in self.registry.cities()}
+        self.workers = {k: v.rstrip("/") for k, v in workers.items()}
+        self.ring.set_nodes(list(self.workers))
+
+        moved = [c for c, old in before.items() if self.owner(c) != old]
+        evicted = self.registry.evict([c for c in moved if self.owner(c) != self.worker_id])
+        return {
+            "worker_id": self.worker_id,
+            "workers": sorted(self.workers),
+            "moved_cities": moved,
+            "evicted": evicted,
+            "ownership": self.ring.ownership()
+        }
+
+    async def forward(self, worker: str, method: str, path: str, query: bytes, headers, body: bytes,
+                      base_url: str = None) -> httpx.Response:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=30)
+        url = f"{base_url or self.workers[worker]}{path}" + (f"?{query.decode()}" if query else "")
+        forward_headers = [
+            (k, v) for k, v in headers
+            if k.lower() not in (b"host", b"content-length", b"connection", FORWARDED_HEADER.encode())
+        ]
+        tag = self.forward_tag(method, path)
+        if tag is not None:
+            forward_headers.append((FORWARDED_HEADER.encode(), tag.encode()))
+        return await self._client.request(method, url, content=body, headers=forward_headers)
+
+    def get_metrics(self) -> Dict:
+        """Per-shard load: local requests per city, forwards per worker"""
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "ownership": self.ring.ownership(),
+            "local_cities": {c: self.registry.requests[c] for c in self.registry.cities()},
+            "handled_locally": dict(self.local),
+            "forwarded": dict(self.forwarded),
+            "forward_errors": self.forward_errors
+        }
+
+
+class ShardRouterMiddleware:
+    """ASGI middleware forwarding requests to the worker owning their city"""
+
+    EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/openapi.json", "/redoc", "/shards", "/shards/rebalance"}
+
+    def __init__(self, app, router: ShardRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forwarded = False
+        headers = scope.get("headers", [])
+        tag = next((v for k, v in headers if k.lower() == FORWARDED_HEADER.encode()), None)
+        if tag is not None:
+            forwarded = self.router.trusted_forward(tag, scope["method"], scope["path"])
+            if not forwarded:   # Forged or stale: endpoints must not see it
+                scope = dict(scope, headers=[(k, v) for k, v in headers if k.lower() != FORWARDED_HEADER.encode()])
+
+        if scope["path"] in self.EXEMPT_PATHS or self.router.ring.nodes == [self.router.worker_id]:
+            await self.app(scope, receive, send)
+            return
+
+        if forwarded:
+            self.router.local[scope["path"]] += 1
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        owner = self.router.owner(self._city_id(scope, body))
+        if owner == self.router.worker_id:
+            self.router.local[scope["path"]] += 1
+            replayed = False
+
+            async def replay_receive():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            await self.app(scope, replay_receive, send)
+            return
+
+        self.router.forwarded[owner] += 1
+        try:
+            response = await self.router.forward(
+                owner, scope["method"], scope["path"], scope.get("query_string", b""),
+                scope.get("headers", []), body
+            )
+        except httpx.HTTPError as e:
+            self.router.forward_errors += 1
+            payload = json.dumps({"detail": f"Shard {owner} unavailable: {e}"}).encode()
+            await send({"type": "http.response.start", "status": 502,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(payload)).encode())]})
+            await send({"type": "http.response.body", "body": payload})
+            return
+
+        out_headers = [
+            (k.encode(), v.encode()) for k, v in response.headers.items()
+            if k.lower() not in ("content-length", "transfer-encoding", "connection", "content-encoding")
+        ]
+        out_headers.append((b"content-length", str(len(response.content)).encode()))
+        await send({"type": "http.response.start", "status": response.status_code, "headers": out_headers})
+        await send({"type": "http.response.body", "body": response.content})
+
+    @staticmethod
+    def _city_id(scope, body: bytes) -> str:
+        """City key from ?city_id= or the JSON body"""
+        query = parse_qs(scope.get("query_string", b"").decode())
+        if query.get("city_id"):
+            return query["city_id"][0]
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return DEFAULT_CITY
+        if isinstance(payload, dict) and payload.get("city_id"):
+            return str(payload["city_id"])
+        return DEFAULT_CITY
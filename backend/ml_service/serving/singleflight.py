@@ -0,0 +1,105 @@
+"""
+Single-Flight - Request Coalescing for Identical Predictions
+
+Concurrent requests with the same canonical key (endpoint + sorted JSON
+payload) await one in-flight agent computation and share its result.
+Non-idempotent endpoints (e.g. /prioritize/orders) always bypass.
+"""
+
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """Coalesce concurrent identical agent calls into one execution"""
+    
+    def __init__(self, bypass_endpoints=None):
+        # Endpoints whose calls change state or must run once per request
+        self.BYPASS_ENDPOINTS = set(bypass_endpoints or ["/prioritize/orders"])
+        
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = defaultdict(lambda: {
+            "requests": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "errors": 0
+        })
+    
+    @staticmethod
+    def make_key(endpoint: str, payload: Any) -> str:
+        """Canonical key: endpoint + hash of the key-sorted JSON payload"""
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{endpoint}:{hashlib.blake2b(body.encode(), digest_size=16).hexdigest()}"
+    
+    async def run(
+        self,
+        endpoint: str,
+        payload: Any,
+        fn: Callable,
+        *args,
+        bypass: bool = False,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs) in the threadpool (or await it, if fn is a
+        coroutine function), sharing the result with any concurrent caller
+        that has the same endpoint + payload
+        
+        The shared result object is handed to every caller as-is, so
+        callers must treat it as read-only.
+        """
+        stats = self._stats[endpoint]
+        stats["requests"] += 1
+        
+        if bypass or endpoint in self.BYPASS_ENDPOINTS:
+            stats["bypassed"] += 1
+            return await self._call(fn, *args, **kwargs)
+        
+        key = self.make_key(endpoint, payload)
+        task = self._inflight.get(key)
+        
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executions"] += 1
+            # Own task so a disconnecting leader does not cancel followers
+            task = asyncio.ensure_future(self._call(fn, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key, s=stats: self._finish(k, t, s))
+        
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    def _call(fn: Callable, *args, **kwargs):
+        if asyncio.iscoroutinefunction(fn):
+            return fn(*args, **kwargs)
+        return run_in_threadpool(fn, *args, **kwargs)
+    
+    def _finish(self, key: str, task: asyncio.Future, stats: Dict):
+        """Drop the in-flight entry and record failures"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            stats["errors"] += 1
+    
+    def get_metrics(self) -> Dict:
+        """Per-endpoint coalescing counters"""
+        endpoints = {}
+        for endpoint, stats in self._stats.items():
+            deduplicable = stats["requests"] - stats["bypassed"]
+            endpoints[endpoint] = {
+                **stats,
+                "coalesce_rate": round(stats["coalesced"] / deduplicable, 3) if deduplicable else 0.0
+            }
+        
+        return {
+            "in_flight": len(self._inflight),
+            "bypass_endpoints": sorted(self.BYPASS_ENDPOINTS),
+            "endpoints": endpoints
+        }
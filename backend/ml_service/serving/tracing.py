@@ -0,0 +1,318 @@
+"""
+Request Tracing - Spans from Endpoint Down to Agent Helpers
+
+Each sampled request gets a root span (method + path) with children:
+- validate: request entry to the endpoint function (routing, body parsing,
+  pydantic validation)
+- the endpoint function, and under it every instrumented agent/engine
+  method it calls, nested as they call each other
+- serialize: endpoint return to the response start (response encoding)
+
+W3C traceparent headers from the Node agents are honored: their trace id is
+kept, their span becomes the parent, and their sampled flag decides whether
+the request is recorded. Requests without one are sampled at SAMPLE_RATE.
+Finished spans go to an in-memory ring buffer (queried via /traces) and,
+optionally, to a JSONL file.
+
+When a request is not sampled, the middleware passes it straight through
+and each instrumented method costs one ContextVar lookup.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi.routing import APIRoute
+
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; children find it through the current context"""
+
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start", "start_ns", "end_ns", "status", "_token", "marks")
+
+    def __init__(self, tracer: "Tracer", trace_id: str, parent_id: Optional[str], name: str, attributes: Dict):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self.marks: Dict[str, int] = {}   # Root span only: endpoint start/end
+        self._token = None
+
+    def child(self, name: str, **attributes) -> "Span":
+        return Span(self.tracer, self.trace_id, self.span_id, name, attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.finish()
+        return False
+
+    def finish(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.perf_counter_ns()
+        self.tracer.export(self)
+
+    def as_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class Tracer:
+    """Sampling, span export and queries over the ring buffer"""
+
+    def __init__(self, sample_rate: float = 0.0, ring_size: int = 20000, export_path: Optional[str] = None):
+        self.SAMPLE_RATE = sample_rate      # For requests without a traceparent
+        self.RING_SIZE = ring_size          # Spans kept in memory
+        self.EXPORT_PATH = export_path      # Optional JSONL file of finished spans
+
+        self._spans: deque = deque(maxlen=ring_size)
+        self._file = open(export_path, "a", buffering=1) if export_path else None
+        self._file_lock = threading.Lock()
+        self.sampled = 0
+        self.unsampled = 0
+
+    # ============= SPANS =============
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    def start_request(self, name: str, traceparent: Optional[str], **attributes) -> Optional[Span]:
+        """Root span for a request, or None when it is not sampled"""
+        parent = TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if parent is not None:
+            trace_id, parent_id, flags = parent.groups()
+            sampled = int(flags, 16) & 1
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.SAMPLE_RATE > 0 and random.random() < self.SAMPLE_RATE
+        if not sampled:
+            self.unsampled += 1
+            return None
+        self.sampled += 1
+        return Span(self, trace_id, parent_id, name, attributes)
+
+    def export(self, span: Span):
+        self._spans.append(span)
+        if self._file is not None:
+            line = json.dumps(span.as_dict(), default=str)
+            with self._file_lock:
+                self._file.write(line + "\n")
+
+    # ============= INSTRUMENTATION =============
+
+    def wrap(self, fn: Callable, name: str) -> Callable:
+        """Run fn in a child span of the current span (no-op outside a trace)"""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def traced_async(*args, **kwargs):
+                parent = _current_span.get()
+                if parent is None:
+                    return await fn(*args, **kwargs)
+                with parent.child(name):
+                    return await fn(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(fn)
+        def traced(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return fn(*args, **kwargs)
+            with parent.child(name):
+                return fn(*args, **kwargs)
+        return traced
+
+    def instrument(self, obj: Any, methods: Optional[Iterable[str]] = None, private: bool = True) -> Any:
+        """
+        Trace an agent/engine instance's methods, named Class.method
+
+        Wrapped bound methods are set on the instance, so the object's own
+        self._helper(...) calls are traced too. Generator functions are
+        skipped (their span would only cover creating the generator).
+        """
+        cls = type(obj)
+        if methods is None:
+            methods = [
+                name for name, attr in vars(cls).items()
+                if inspect.isfunction(attr)
+                and not name.startswith("__")
+                and (private or not name.startswith("_"))
+                and not inspect.isgeneratorfunction(attr)
+            ]
+        for name in methods:
+            setattr(obj, name, self.wrap(getattr(obj, name), f"{cls.__name__}.{name}"))
+        return obj
+
+    def route_class(self) -> type:
+        """APIRoute subclass that traces the endpoint function and marks its bounds"""
+        tracer = self
+
+        class TracedRoute(APIRoute):
+            def __init__(self, path: str, endpoint: Callable, **kwargs):
+                super().__init__(path, tracer._wrap_endpoint(endpoint), **kwargs)
+
+        return TracedRoute
+
+    def _wrap_endpoint(self, endpoint: Callable) -> Callable:
+        name = f"endpoint {endpoint.__name__}"
+        if not inspect.iscoroutinefunction(endpoint):
+            return self.wrap(endpoint, name)
+
+        @functools.wraps(endpoint)
+        async def traced_endpoint(*args, **kwargs):
+            root = _current_span.get()
+            if root is None:
+                return await endpoint(*args, **kwargs)
+            root.marks["endpoint_start"] = time.perf_counter_ns()
+            try:
+                with root.child(name):
+                    return await endpoint(*args, **kwargs)
+            finally:
+                root.marks["endpoint_end"] = time.perf_counter_ns()
+        return traced_endpoint
+
+    # ============= QUERIES =============
+
+    def get_trace(self, trace_id: str) -> List[Dict]:
+        """All buffered spans of one trace, in start order"""
+        spans = [s.as_dict() for s in list(self._spans) if s.trace_id == trace_id]
+        return sorted(spans, key=lambda s: s["start"])
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        min_duration_ms: Optional[float] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        Recent request traces, newest first
+
+        Args:
+            name: Substring of the root span name (e.g. "/predict/crisis")
+            min_duration_ms: Only traces whose root took at least this long
+            limit: Maximum traces returned
+        """
+        spans = list(self._spans)
+        by_trace: Dict[str, List[Span]] = {}
+        for span in spans:
+            by_trace.setdefault(span.trace_id, []).append(span)
+
+        traces = []
+        for span in reversed(spans):
+            if len(traces) >= limit:
+                break
+            if not span.attributes.get("http.root"):
+                continue
+            duration = (span.end_ns - span.start_ns) / 1e6
+            if name and name not in span.name:
+                continue
+            if min_duration_ms is not None and duration < min_duration_ms:
+                continue
+            members = by_trace[span.trace_id]
+            traces.append({
+                "trace_id": span.trace_id,
+                "name": span.name,
+                "start": round(span.start, 6),
+                "duration_ms": round(duration, 3),
+                "status": span.attributes.get("http.status_code"),
+                "span_count": len(members),
+                "spans": sorted((s.as_dict() for s in members), key=lambda s: s["start"])
+            })
+        return traces
+
+    def get_metrics(self) -> Dict:
+        return {
+            "sample_rate": self.SAMPLE_RATE,
+            "sampled_requests": self.sampled,
+            "unsampled_requests": self.unsampled,
+            "buffered_spans": len(self._spans),
+            "ring_size": self.RING_SIZE,
+            "export_path": self.EXPORT_PATH
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span and the validate/serialize spans"""
+
+    def __init__(self, app, tracer: Tracer, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.tracer = tracer
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = self.tracer.start_request(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            **{"http.root": True, "http.method": scope["method"], "http.path": scope["path"]}
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                self._phase_spans(root, time.perf_counter_ns())
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, traced_send)
+
+    @staticmethod
+    def _phase_spans(root: Span, response_start_ns: int):
+        """validate / serialize spans from the endpoint bounds the route recorded"""
+        start, end = root.marks.get("endpoint_start"), root.marks.get("endpoint_end")
+        if start is None or end is None:
+            return
+        validate = root.child("validate")
+        validate.start = root.start
+        validate.start_ns = root.start_ns
+        validate.finish(start)
+        serialize = root.child("serialize")
+        serialize.start = root.start + (end - root.start_ns) / 1e9
+        serialize.start_ns = end
+        serialize.finish(response_start_ns)
@@ -1,13 +1,23 @@
 """
 Test script for HealSync ML Service
 Tests all 5 agents independently before integration
+
+Calls go through client.MLClient: one pooled keep-alive session for the
+whole run, with retries when the service sheds load
 """
 
-import requests
 import json
+import os
 from datetime import datetime
 
-ML_SERVICE_URL = "http://localhost:8000"
+import requests
+
+from client.base import MLServiceError
+from client.sync_client import MLClient
+
+ML_SERVICE_URL = os.environ.get("ML_SERVICE_URL", "http://localhost:8000")
+
+ml = MLClient(ML_SERVICE_URL)
 
 def print_section(title):
     """Print formatted section header"""
@@ -18,10 +28,9 @@ def print_section(title):
 def test_health_check():
     """Test ML service health"""
     print_section("1. HEALTH CHECK")
-    response = requests.get(f"{ML_SERVICE_URL}/health")
-    print(f"Status: {response.status_code}")
-    print(json.dumps(response.json(), indent=2))
-    return response.status_code == 200
+    result = ml.health()
+    print(json.dumps(result, indent=2))
+    return result.get("status") == "healthy"
 
 def test_lab_agent():
     """Test Lab Agent outbreak prediction"""
@@ -45,13 +54,7 @@ def test_lab_agent():
         }
     }
     
-    response = requests.post(
-        f"{ML_SERVICE_URL}/predict/outbreak",
-        json=test_data
-    )
-    
-    print(f"Status: {response.status_code}")
-    predictions = response.json()
+    predictions = ml.predict_outbreak(**test_data)
     
     for pred in predictions:
         print(f"\n🔬 {pred['disease'].upper()}:")
@@ -61,7 +64,7 @@ def test_lab_agent():
         print(f"   Trigger Outbreak: {'🚨 YES' if pred['trigger_outbreak'] else '✅ NO'}")
         print(f"   Recommendation: {pred['recommendation']}")
     
-    return response.status_code == 200
+    return True
 
 def test_city_agent():
     """Test City Agent crisis prediction"""
@@ -90,13 +93,7 @@ def test_city_agent():
         }
     }
     
-    response = requests.post(
-        f"{ML_SERVICE_URL}/predict/crisis",
-        json=test_data
-    )
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
+    result = ml.predict_crisis(**test_data)
     
     print(f"\n🌆 CITYWIDE CRISIS ANALYSIS:")
     print(f"   CPS Score: {result['cps_score']}")
@@ -107,7 +104,7 @@ def test_city_agent():
         print(f"     - {key}: {value}")
     print(f"\n   Advisory: {result['advisory']}")
     
-    return response.status_code == 200
+    return True
 
 def test_hospital_agent():
     """Test Hospital Agent HSI calculation"""
@@ -122,13 +119,7 @@ def test_hospital_agent():
         "incoming_patients": 15
     }
     
-    response = requests.post(
-        f"{ML_SERVICE_URL}/calculate/hospital_strain",
-        json=test_data
-    )
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
+    result = ml.hospital_strain(**test_data)
     
     print(f"\n🏥 HOSPITAL STRAIN ANALYSIS:")
     print(f"   HSI Score: {result['hsi_score']}")
@@ -145,7 +136,7 @@ def test_hospital_agent():
         print(f"     - Urgency: {result['resource_request']['urgency']}")
         print(f"     - Items: {len(result['resource_request']['requested_items'])}")
     
-    return response.status_code == 200
+    return True
 
 def test_pharmacy_agent():
     """Test Pharmacy Agent demand classification"""
@@ -169,13 +160,7 @@ def test_pharmacy_agent():
         "outbreak_alerts": ["dengue"]
     }
     
-    response = requests.post(
-        f"{ML_SERVICE_URL}/classify/pharmacy_demand",
-        json=test_data
-    )
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
+    result = ml.pharmacy_demand(**test_data)
     
     print(f"\n💊 PHARMACY DEMAND ANALYSIS:")
     print(f"   Inventory Health: {result['inventory_health']['status']} ({result['inventory_health']['score']})")
@@ -192,7 +177,7 @@ def test_pharmacy_agent():
         for order in result['preemptive_orders']:
             print(f"     📦 {order['medicine']}: {order['order_quantity']} units ({order['urgency']})")
     
-    return response.status_code == 200
+    return True
 
 def test_supplier_agent():
     """Test Supplier Agent order prioritization"""
@@ -234,13 +219,7 @@ def test_supplier_agent():
         "delivery_capacity": 4
     }
     
-    response = requests.post(
-        f"{ML_SERVICE_URL}/prioritize/orders",
-        json=test_data
-    )
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
+    result = ml.prioritize_orders(**test_data)
     
     print(f"\n🚚 SUPPLIER ORDER PRIORITIZATION:")
     print(f"   Total Orders: {result['metrics']['total_orders']}")
@@ -254,7 +233,16 @@ def test_supplier_agent():
         status_icon = "✅" if any(f['order_id'] == order['order_id'] for f in result['fulfilled_orders']) else "⏳"
         print(f"     {status_icon} {order['order_id']}: {order['medicine']} (Priority: {order['priority_score']})")
     
-    return response.status_code == 200
+    return True
+
+def run_test(test):
+    """Run one agent test; an error response fails it without stopping the run"""
+    try:
+        return test()
+    except MLServiceError as e:
+        print(f"Status: {e.status_code}")
+        print(f"   Error: {e.detail}")
+        return False
 
 def run_all_tests():
     """Run all agent tests"""
@@ -266,12 +254,12 @@ def run_all_tests():
     print("="*60)
     
     results = {
-        "Health Check": test_health_check(),
-        "Lab Agent": test_lab_agent(),
-        "City Agent": test_city_agent(),
-        "Hospital Agent": test_hospital_agent(),
-        "Pharmacy Agent": test_pharmacy_agent(),
-        "Supplier Agent": test_supplier_agent()
+        "Health Check": run_test(test_health_check),
+        "Lab Agent": run_test(test_lab_agent),
+        "City Agent": run_test(test_city_agent),
+        "Hospital Agent": run_test(test_hospital_agent),
+        "Pharmacy Agent": run_test(test_pharmacy_agent),
+        "Supplier Agent": run_test(test_supplier_agent)
     }
     
     print_section("TEST SUMMARY")
@@ -291,9 +279,11 @@ if __name__ == "__main__":
         exit(0 if success else 1)
     except requests.exceptions.ConnectionError:
         print("\n❌ ERROR: Cannot connect to ML Service")
-        print("   Make sure the service is running on http://localhost:8000")
+        print(f"   Make sure the service is running on {ML_SERVICE_URL}")
         print("   Run: python main.py")
         exit(1)
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
         exit(1)
+    finally:
+        ml.close()